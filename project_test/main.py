@@ -1,7 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from src.routes import auth, update, delete, user_data, posts, comments, registration
+from src.routes import (
+    auth,
+    update,
+    delete,
+    user_data,
+    posts,
+    comments,
+    comment_stream,
+    registration,
+    monitoring,
+    health,
+    search,
+    autocomplete,
+    feed,
+)
+from src.database.connect import close_databases
+from src.middleware.admission import AdmissionControlMiddleware
+from src.middleware.metrics import MetricsMiddleware
+from src.middleware.query_accounting import QueryAccountingMiddleware
+from src.utils.settings import get_settings
+from src.utils.warmup import run_warmup
+from src.utils.background import background_tasks
+from src.utils.comment_broker import close_on_exit_signals, comment_broker
+from src.utils.search_index import run_search_index_sync
+from src.utils.autocomplete import run_autocomplete_sync
+from src.utils.trending import run_trending_sync, save_trending
+from src.journal.retention import compact_after_days, run_journal_compaction
 from src.journal import (
     journal,
     journal_username,
@@ -9,7 +36,53 @@ from src.journal import (
     journal_email,
 )
 
-app = FastAPI()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /health/live answers while /health/ready reports progress
+    warmup_task = asyncio.create_task(run_warmup(app))
+    # Picks up writes made by other worker processes once warmup has loaded the index
+    search_sync_task = asyncio.create_task(run_search_index_sync(
+        settings.getfloat("search", "refresh_seconds", fallback=5),
+        settings.getfloat("search", "rebuild_seconds", fallback=3600),
+    ))
+    autocomplete_sync_task = asyncio.create_task(run_autocomplete_sync(
+        settings.getfloat("autocomplete", "refresh_seconds", fallback=5),
+        settings.getfloat("autocomplete", "rebuild_seconds", fallback=3600),
+    ))
+    trending_sync_task = asyncio.create_task(run_trending_sync(
+        settings.getfloat("trending", "refresh_seconds", fallback=5),
+        settings.getfloat("trending", "persist_seconds", fallback=600),
+    ))
+    compaction_hours = settings.getfloat("journal", "compact_interval_hours", fallback=0)
+    if compaction_hours > 0:
+        # Fails the start instead of every periodic run
+        compact_after_days()
+    compaction_task = (
+        asyncio.create_task(run_journal_compaction(compaction_hours * 3600)) if compaction_hours > 0 else None
+    )
+    # Comment streams never finish on their own; end them when shutdown starts so uvicorn does not
+    # hold its graceful timeout waiting for them
+    restore_signals = close_on_exit_signals(comment_broker)
+    yield
+    restore_signals()
+    comment_broker.close()
+    # In-flight requests have finished; let auto-replies complete before closing the pool
+    warmup_task.cancel()
+    search_sync_task.cancel()
+    autocomplete_sync_task.cancel()
+    trending_sync_task.cancel()
+    if compaction_task:
+        compaction_task.cancel()
+    await background_tasks.drain(settings.getfloat("server", "background_drain_timeout", fallback=10))
+    # Auto-replies have been counted; save the ranking so the next start does not replay history
+    await save_trending()
+    await close_databases()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Include routers for different endpoints
 app.include_router(auth.router)
@@ -23,6 +96,26 @@ app.include_router(journal_email.router)
 app.include_router(journal_password.router)
 app.include_router(posts.router)
 app.include_router(comments.router)
+app.include_router(comment_stream.router)
+app.include_router(monitoring.router)
+app.include_router(health.router)
+app.include_router(search.router)
+app.include_router(autocomplete.router)
+app.include_router(feed.router)
+
+# Shed load per route group before requests pile up behind a slow database
+app.add_middleware(AdmissionControlMiddleware)
+
+# Attribute Mongo queries to requests and flag N+1 patterns (development / staging)
+if settings.getboolean("debug", "query_accounting", fallback=False):
+    app.add_middleware(
+        QueryAccountingMiddleware,
+        query_budget=settings.getint("debug", "query_budget", fallback=10),
+        repeated_threshold=settings.getint("debug", "repeated_query_threshold", fallback=3),
+    )
+
+# Record per-route latency and status codes, including shed requests
+app.add_middleware(MetricsMiddleware)
 
 # Configure CORS (Cross-Origin Resource Sharing) middleware
 origins = ["*"]
@@ -35,5 +128,7 @@ app.add_middleware(
 )
 
 if __name__ == "__main__":
-    # Run the FastAPI application using Uvicorn server
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Run the FastAPI application with the production launcher settings
+    from src.launcher import main
+
+    main()
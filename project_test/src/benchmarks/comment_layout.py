@@ -0,0 +1,156 @@
+"""
+Read I/O of the flat and bucketed comment layouts.
+
+Seeds one busy post with the same comments in both layouts
+(`src.database.comment_store`) and, for each layout, reports the stored
+documents and BSON bytes a read of the post's comments has to load, plus
+the time to list the comments, to read the first thread page and to delete
+them (as the account-deletion cascade does).
+
+Usage (from the project_test directory):
+
+    python -m src.benchmarks.comment_layout
+    python -m src.benchmarks.comment_layout --comments 100000 --bucket-size 200
+    python -m src.benchmarks.comment_layout --storage mongo    # writes to the configured deployment
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import bson
+from bson import ObjectId
+
+SEED = 1234
+
+
+def _comments(post_id: ObjectId, count: int) -> List[dict]:
+    from src.utils.threads import thread_fields
+
+    rng = random.Random(SEED)
+    start = datetime.utcnow() - timedelta(days=1)
+    comments = []
+    for number in range(count):
+        comment_id = ObjectId()
+        # A third of the comments reply to an earlier one
+        parent = comments[rng.randrange(len(comments))] if comments and rng.random() < 0.33 else None
+        created_at = start + timedelta(milliseconds=number)
+        comments.append({
+            "_id": comment_id,
+            "post_id": post_id,
+            "content": "".join(rng.choice(string.ascii_lowercase + " ") for _ in range(rng.randint(20, 200))),
+            "author_id": ObjectId(),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "blocked": rng.random() < 0.02,
+            **thread_fields(comment_id, parent),
+        })
+    return comments
+
+
+async def _timed(func, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+async def measure_layout(database, layout: str, comments: List[dict], bucket_size: int, rounds: int) -> dict:
+    """
+    Stores the comments in one layout and measures reading and deleting them.
+
+    Args:
+        database (Database): Connected database handle.
+        layout (str): Comment layout.
+        comments (List[dict]): Comments of one post.
+        bucket_size (int): Comments per bucket for the bucketed layout.
+        rounds (int): Timed rounds per read; the fastest one is reported.
+
+    Returns:
+        dict: Stored documents and bytes read per listing, and timings in milliseconds.
+    """
+    from src.database.comment_store import BUCKETED_LAYOUT, BucketedCommentStore, layout_store
+    from src.utils.threads import subtree_query
+
+    store = BucketedCommentStore(database, bucket_size) if layout == BUCKETED_LAYOUT else layout_store(database, layout)
+    post_id = comments[0]["post_id"]
+    start = time.perf_counter()
+    for comment in comments:
+        await store.insert(comment)
+    insert_ms = (time.perf_counter() - start) * 1000
+
+    # What a read of the post's comments loads from storage
+    stored = await store.collection.find({"post_id": post_id}).to_list(length=None)
+    query = {"post_id": post_id, "blocked": False}
+
+    async def list_comments():
+        return [comment async for comment in store.find(query)]
+
+    async def thread_page():
+        return await store.find(subtree_query(str(post_id)), sort=[("path", 1)], limit=1000).to_list(length=None)
+
+    report = {
+        "documents_read": len(stored),
+        "bytes_read": sum(len(bson.encode(document)) for document in stored),
+        "insert_us_per_comment": round(insert_ms * 1000 / len(comments), 1),
+        "list_ms": await _timed(list_comments, rounds),
+        "thread_page_ms": await _timed(thread_page, rounds),
+        "listed": len(await list_comments()),
+    }
+    start = time.perf_counter()
+    await store.delete_for_post(post_id)
+    report["delete_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return report
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, dict]:
+    from src.utils.settings import get_settings
+
+    settings = get_settings()
+    if args.storage:
+        if not settings.has_section("storage"):
+            settings.add_section("storage")
+        settings.set("storage", "backend", args.storage)
+
+    from src.database.comment_store import LAYOUTS
+    from src.database.connect import close_databases, connect_to_database_mongo, get_mongo_url
+    from src.database.indexes import ensure_indexes
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    try:
+        await ensure_indexes(database)
+        comments = _comments(ObjectId(), args.comments)
+        return {
+            layout: await measure_layout(database, layout, comments, args.bucket_size, args.rounds)
+            for layout in LAYOUTS
+        }
+    finally:
+        await close_databases()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare read I/O of the comment storage layouts")
+    parser.add_argument("--comments", type=int, default=20000, help="Comments on the benchmarked post")
+    parser.add_argument("--bucket-size", type=int, default=200, help="Comments per bucket")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per read")
+    parser.add_argument("--storage", choices=("mongo", "memory"), default="memory",
+                        help="Storage backend (default: memory)")
+    args = parser.parse_args(argv)
+    if args.comments < 1 or args.bucket_size < 1 or args.rounds < 1:
+        parser.error("--comments, --bucket-size and --rounds must be at least 1")
+
+    print(json.dumps(asyncio.run(run_benchmark(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
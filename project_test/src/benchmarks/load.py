@@ -0,0 +1,383 @@
+"""
+End-to-end load generator for the posts & comments API.
+
+Drives the application with a weighted mix of register, login, post, comment,
+listing and analytics calls at a target request rate (open loop: requests are
+started on schedule whether or not earlier ones have finished) and reports
+latency percentiles, throughput and error rates per endpoint as JSON.
+
+Usage (from the project_test directory):
+
+    python -m src.benchmarks.load --host http://127.0.0.1:8000 --rps 50 --duration 30
+    python -m src.benchmarks.load --in-process --rps 200 --duration 10 --output build.json
+    python -m src.benchmarks.load --in-process --storage memory --rps 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import string
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_MIX = {
+    "register": 1,
+    "login": 2,
+    "create_post": 2,
+    "create_comment": 6,
+    "list_posts": 8,
+    "get_post": 10,
+    "list_comments": 10,
+    "analytics": 1,
+}
+
+# Status codes counted as successful per operation
+EXPECTED_STATUS = {
+    "register": {200},
+    "login": {200},
+    "create_post": {200},
+    "create_comment": {200},
+    "list_posts": {200},
+    "get_post": {200, 304},
+    "list_comments": {200, 304, 404},
+    "analytics": {200},
+}
+
+
+def string_generator(size: int = 6, chars: str = string.ascii_uppercase + string.digits) -> str:
+    """
+    Generate a random string of a given size.
+
+    Args:
+        size (int): The length of the generated string.
+        chars (str): The set of characters to choose from.
+
+    Returns:
+        str: A randomly generated string of the specified size.
+    """
+    return "".join(random.choice(chars) for _ in range(size))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (List[float]): Values in ascending order.
+        fraction (float): Percentile as a fraction (0.95 for p95).
+
+    Returns:
+        Optional[float]: The percentile, or None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parses an operation mix such as `get_post=10,create_comment=2`.
+
+    Args:
+        text (str): Comma-separated `operation=weight` pairs.
+
+    Returns:
+        Dict[str, float]: Weight per operation.
+
+    Raises:
+        ValueError: If an operation is unknown or a weight is negative.
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation '{name}'")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Negative weight for '{name}'")
+    return mix
+
+
+class LoadGenerator:
+    """
+    Open-loop load generator keeping per-operation latency samples.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], max_in_flight: int = 1000):
+        self.client = client
+        self.operations = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.operations]
+        self.max_in_flight = max_in_flight
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.skipped = 0
+        self.users: List[dict] = []
+        self.tokens: List[str] = []
+        self.post_ids: List[str] = []
+
+    # Operations ---------------------------------------------------------
+
+    def _new_user(self) -> dict:
+        return {
+            "username": string_generator(8) + " " + string_generator(8),
+            "email": string_generator(18).lower() + "@test.com",
+            "password": "123" + string_generator(4).lower() + "AAA!",
+        }
+
+    def _auth(self) -> dict:
+        return {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+
+    async def op_register(self) -> httpx.Response:
+        user = self._new_user()
+        response = await self.client.post("/registration/", json=user)
+        if response.status_code == 200:
+            self.users.append(user)
+        return response
+
+    async def op_login(self) -> httpx.Response:
+        user = random.choice(self.users)
+        response = await self.client.post(
+            "/login/", json={"email": user["email"], "password": user["password"]}
+        )
+        if response.status_code == 200:
+            self.tokens.append(response.json()["access_token"])
+        return response
+
+    async def op_create_post(self) -> httpx.Response:
+        response = await self.client.post(
+            "/posts/",
+            json={
+                "title": "Load test " + string_generator(6),
+                "content": "Load test content " + string_generator(64),
+                "auto_reply_enabled": False,
+                "auto_reply_delay": 30,
+            },
+            headers=self._auth(),
+        )
+        if response.status_code == 200:
+            self.post_ids.append(response.json()["_id"])
+        return response
+
+    async def op_create_comment(self) -> httpx.Response:
+        return await self.client.post(
+            f"/posts/{random.choice(self.post_ids)}/comments/",
+            json={"content": "Load test comment " + string_generator(32)},
+            headers=self._auth(),
+        )
+
+    async def op_list_posts(self) -> httpx.Response:
+        return await self.client.get("/posts/")
+
+    async def op_get_post(self) -> httpx.Response:
+        return await self.client.get(f"/posts/{random.choice(self.post_ids)}")
+
+    async def op_list_comments(self) -> httpx.Response:
+        return await self.client.get(f"/posts/{random.choice(self.post_ids)}/comments/")
+
+    async def op_analytics(self) -> httpx.Response:
+        return await self.client.get(
+            "/api/comments-daily-breakdown",
+            params={
+                "date_from": (date.today() - timedelta(days=7)).isoformat(),
+                "date_to": date.today().isoformat(),
+            },
+        )
+
+    # Driver -------------------------------------------------------------
+
+    async def run_operation(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            response = await getattr(self, f"op_{name}")()
+        except Exception:
+            self.latencies[name].append(time.perf_counter() - start)
+            self.errors[name] += 1
+            self.statuses[name][0] += 1
+            return
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][response.status_code] += 1
+        if response.status_code not in EXPECTED_STATUS[name]:
+            self.errors[name] += 1
+
+    async def seed(self, users: int, posts: int) -> None:
+        """
+        Creates the users, tokens and posts the mixed workload operates on.
+
+        Args:
+            users (int): Number of users to register and log in.
+            posts (int): Number of posts to create.
+
+        Raises:
+            RuntimeError: If the application cannot be seeded.
+        """
+        for _ in range(users):
+            await self.op_register()
+        for _ in range(len(self.users)):
+            await self.op_login()
+        if not self.tokens:
+            raise RuntimeError("Seeding failed: no user could register and log in")
+        for _ in range(posts):
+            await self.op_create_post()
+        if not self.post_ids:
+            raise RuntimeError("Seeding failed: no post could be created")
+
+    async def run(self, rps: float, duration: float) -> float:
+        """
+        Issues operations at the target rate for the given duration.
+
+        Args:
+            rps (float): Target requests per second.
+            duration (float): Length of the measured phase in seconds.
+
+        Returns:
+            float: Wall-clock seconds until every started request completed.
+        """
+        interval = 1.0 / rps
+        in_flight = set()
+        start = time.perf_counter()
+        next_at = start
+        while next_at - start < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_at += interval
+            if len(in_flight) >= self.max_in_flight:
+                # The system under test cannot keep up; record instead of queuing unboundedly
+                self.skipped += 1
+                continue
+            name = random.choices(self.operations, self.weights)[0]
+            task = asyncio.create_task(self.run_operation(name))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float, rps: float, duration: float) -> dict:
+        """
+        Summarizes the measured phase.
+
+        Args:
+            elapsed (float): Wall-clock duration of the measured phase.
+            rps (float): Target requests per second.
+            duration (float): Requested duration of the measured phase.
+
+        Returns:
+            dict: JSON-serializable report.
+        """
+        endpoints = {}
+        total = 0
+        total_errors = 0
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+            count = len(samples)
+            total += count
+            total_errors += self.errors[name]
+            endpoints[name] = {
+                "count": count,
+                "throughput_rps": round(count / elapsed, 2),
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / count, 4) if count else 0.0,
+                "statuses": {str(code): n for code, n in sorted(self.statuses[name].items())},
+                "latency_ms": {
+                    "p50": _ms(percentile(samples, 0.50)),
+                    "p95": _ms(percentile(samples, 0.95)),
+                    "p99": _ms(percentile(samples, 0.99)),
+                    "mean": _ms(sum(samples) / count if count else None),
+                    "max": _ms(samples[-1] if samples else None),
+                },
+            }
+        return {
+            "target_rps": rps,
+            "duration_s": duration,
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "skipped": self.skipped,
+            "endpoints": endpoints,
+        }
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 3)
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    """
+    Seeds the application, runs the measured phase and returns the report.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments.
+
+    Returns:
+        dict: JSON-serializable report.
+    """
+    if args.in_process:
+        if args.storage:
+            from src.utils.settings import get_settings
+
+            settings = get_settings()
+            if not settings.has_section("storage"):
+                settings.add_section("storage")
+            settings.set("storage", "backend", args.storage)
+
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.host, timeout=args.timeout)
+
+    async with client:
+        generator = LoadGenerator(client, parse_mix(args.mix), args.max_in_flight)
+        await generator.seed(args.seed_users, args.seed_posts)
+        elapsed = await generator.run(args.rps, args.duration)
+        report = generator.report(elapsed, args.rps, args.duration)
+        report["target"] = "in-process" if args.in_process else args.host
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load benchmark for the posts & comments API")
+    parser.add_argument("--host", default="http://127.0.0.1:8000", help="Base URL of a running server")
+    parser.add_argument("--in-process", action="store_true", help="Drive the ASGI app in this process")
+    parser.add_argument("--storage", choices=("mongo", "memory"),
+                        help="Storage backend for --in-process runs (default: settings.ini)")
+    parser.add_argument("--rps", type=float, default=50, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Measured phase in seconds")
+    parser.add_argument(
+        "--mix",
+        default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+        help="Weighted operation mix, e.g. get_post=10,create_comment=2",
+    )
+    parser.add_argument("--seed-users", type=int, default=10)
+    parser.add_argument("--seed-posts", type=int, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.storage and not args.in_process:
+        parser.error("--storage requires --in-process")
+
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    return 0 if report["requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
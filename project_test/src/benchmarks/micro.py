@@ -0,0 +1,306 @@
+"""
+Micro-benchmarks for the CPU-bound functions on the request path.
+
+Each benchmark times one function over a realistic, seeded input
+distribution and is compared against the baseline stored in
+`baselines.json`. The run fails (exit code 1) when any benchmark is slower
+than its baseline by more than the allowed percentage.
+
+Usage (from the project_test directory):
+
+    python -m src.benchmarks.micro                      # compare against baselines
+    python -m src.benchmarks.micro --threshold 15       # stricter regression gate
+    python -m src.benchmarks.micro --update-baselines   # record new baselines
+    python -m src.benchmarks.micro --only profanity     # run a subset
+"""
+import argparse
+import json
+import math
+import pathlib
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from bson import ObjectId
+
+BASELINES_FILE = pathlib.Path(__file__).parent / "baselines.json"
+DEFAULT_THRESHOLD = 25.0
+SEED = 1234
+# Fast functions are looped over their inputs until a round lasts at least this long
+MIN_ROUND_NS = 50_000_000
+
+
+class Benchmark(NamedTuple):
+    """
+    A function under test and the inputs it is called with.
+
+    Attributes:
+        name (str): Stable identifier used as the baseline key.
+        func (Callable): Function called once per input.
+        inputs (List): Inputs cycled through on every round.
+        rounds (int): Number of timed rounds; the fastest one is reported.
+    """
+
+    name: str
+    func: Callable
+    inputs: List
+    rounds: int = 9
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+        for _ in range(count)
+    )
+
+
+def _comment(rng: random.Random, size: int) -> str:
+    text = _words(rng, max(1, size // 6))
+    return text[:size]
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """
+    Creates the benchmark cases with seeded input distributions.
+
+    Returns:
+        List[Benchmark]: Benchmarks in reporting order.
+    """
+    from better_profanity import profanity
+    from src.models.models import CommentResponse, PostInDB
+    from src.routes.registration import is_valid_email, is_valid_password
+    from src.security.security import Hashing
+    from src.utils.jwt_utils import create_access_token, decode_access_token
+    from src.utils.autocomplete import PrefixIndex, Suggestion
+    from src.utils.search_index import SearchIndex
+
+    rng = random.Random(SEED)
+    profanity.load_censor_words()
+
+    # The profanity filter costs milliseconds per call, so its input sets stay small
+    short_comments = [_comment(rng, rng.randint(20, 280)) for _ in range(30)]
+    long_comments = [_comment(rng, 10 * 1024) for _ in range(2)]
+    # A realistic share of flagged content
+    for index in range(0, len(short_comments), 10):
+        short_comments[index] += " shit"
+
+    token_payloads = [
+        {"sub": f"user{i}@test.com", "username": _words(rng, 2), "id": str(ObjectId())}
+        for i in range(100)
+    ]
+    tokens = [create_access_token(payload) for payload in token_payloads]
+
+    emails = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 20))) + "@test.com"
+        for _ in range(100)
+    ] + ["not-an-email", "a@b", "x" * 190 + "@test.com"] * 5
+    passwords = [
+        "123" + "".join(rng.choice(string.ascii_lowercase) for _ in range(4)) + "AAA!"
+        for _ in range(100)
+    ] + ["short", "nouppercase1!", "NoSpecial123"] * 5
+
+    now = datetime.utcnow()
+    post_documents = [
+        {
+            "_id": str(ObjectId()),
+            "title": _words(rng, 6),
+            "content": _comment(rng, rng.choice([200, 2000, 10 * 1024])),
+            "author_id": str(ObjectId()),
+            "auto_reply_enabled": False,
+            "auto_reply_delay": 60,
+            "created_at": now,
+            "updated_at": now,
+            "blocked": False,
+        }
+        for _ in range(100)
+    ]
+    comment_documents = [
+        {
+            "id": str(ObjectId()),
+            "post_id": str(ObjectId()),
+            "content": _comment(rng, rng.randint(20, 280)),
+            "author_id": str(ObjectId()),
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+            "blocked": False,
+        }
+        for i in range(100)
+    ]
+
+    # Search over a corpus of posts and comments drawn from a small vocabulary, so terms repeat
+    vocabulary = _words(rng, 2000).split()
+
+    def sentence(count: int) -> str:
+        return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+    search_corpus = SearchIndex()
+    search_corpus.rebuild(
+        [{"_id": str(ObjectId()), "title": sentence(6), "content": sentence(80), "created_at": now, "blocked": False}
+         for _ in range(2000)],
+        [{"_id": str(ObjectId()), "post_id": str(ObjectId()), "content": sentence(30), "created_at": now,
+          "blocked": False} for _ in range(5000)],
+    )
+    search_queries = (
+        [rng.choice(vocabulary) for _ in range(20)]
+        + [" ".join(rng.sample(vocabulary, 2)) for _ in range(20)]
+        + [rng.choice(vocabulary)[:3] + "*" for _ in range(10)]
+        + ['"' + sentence(2) + '"' for _ in range(10)]
+    )
+    indexed_posts = [
+        {"_id": str(ObjectId()), "title": sentence(6), "content": sentence(80), "created_at": now, "blocked": False}
+        for _ in range(200)
+    ]
+
+    # Usernames of two words; lookups of 3-6 typed characters miss the short-prefix cache
+    usernames = PrefixIndex()
+    usernames.load([Suggestion(str(i), _words(rng, 2), rng.randint(0, 500)) for i in range(50000)])
+    typed_prefixes = [_words(rng, 1)[:rng.randint(3, 6)] for _ in range(100)]
+
+    return [
+        Benchmark("profanity.contains_profanity[short]", profanity.contains_profanity, short_comments, 3),
+        Benchmark("profanity.contains_profanity[10kb]", profanity.contains_profanity, long_comments, 2),
+        Benchmark("jwt_utils.create_access_token", create_access_token, token_payloads),
+        Benchmark("jwt_utils.decode_access_token", decode_access_token, tokens),
+        Benchmark("registration.is_valid_email", is_valid_email, emails),
+        Benchmark("registration.is_valid_password", is_valid_password, passwords),
+        Benchmark("models.PostInDB", lambda document: PostInDB(**document), post_documents),
+        Benchmark("models.CommentResponse", lambda document: CommentResponse(**document), comment_documents),
+        Benchmark("security.Hashing.get_password_hash", Hashing.get_password_hash, passwords[:2], 2),
+        Benchmark("search_index.search[7k docs]", search_corpus.search, search_queries),
+        Benchmark("search_index.add_post", search_corpus.add_post, indexed_posts),
+        Benchmark("autocomplete.suggest[50k users]", usernames.suggest, typed_prefixes),
+    ]
+
+
+def run_benchmark(benchmark: Benchmark) -> float:
+    """
+    Times a benchmark.
+
+    Every round calls the function on each input, looping fast functions so
+    that a round is long enough to time reliably. The fastest round is kept
+    because it is the least disturbed by unrelated system activity.
+
+    Args:
+        benchmark (Benchmark): Benchmark to run.
+
+    Returns:
+        float: Mean nanoseconds per call in the fastest round.
+    """
+    func = benchmark.func
+    inputs = benchmark.inputs
+
+    # The first pass warms caches and lazy initialization and calibrates the loop count
+    start = time.perf_counter_ns()
+    for item in inputs:
+        func(item)
+    loops = max(1, math.ceil(MIN_ROUND_NS / max(1, time.perf_counter_ns() - start)))
+
+    best = float("inf")
+    for _ in range(benchmark.rounds):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            for item in inputs:
+                func(item)
+        best = min(best, (time.perf_counter_ns() - start) / (loops * len(inputs)))
+    return best
+
+
+def load_baselines() -> Dict[str, float]:
+    """
+    Reads the stored baselines.
+
+    Returns:
+        Dict[str, float]: Nanoseconds per call keyed by benchmark name.
+    """
+    if not BASELINES_FILE.exists():
+        return {}
+    return json.loads(BASELINES_FILE.read_text())["benchmarks"]
+
+
+def save_baselines(results: Dict[str, float]) -> None:
+    """
+    Writes new baselines, keeping entries of benchmarks that were not run.
+
+    Args:
+        results (Dict[str, float]): Nanoseconds per call keyed by benchmark name.
+    """
+    baselines = load_baselines()
+    baselines.update({name: round(value, 1) for name, value in results.items()})
+    BASELINES_FILE.write_text(
+        json.dumps(
+            {"unit": "ns/call", "python": sys.version.split()[0], "benchmarks": baselines},
+            indent=2,
+            sort_keys=True,
+        )
+        + "\n"
+    )
+
+
+def compare(results: Dict[str, float], baselines: Dict[str, float], threshold: float) -> List[dict]:
+    """
+    Compares results against baselines.
+
+    Args:
+        results (Dict[str, float]): Nanoseconds per call keyed by benchmark name.
+        baselines (Dict[str, float]): Stored nanoseconds per call keyed by benchmark name.
+        threshold (float): Allowed slowdown in percent.
+
+    Returns:
+        List[dict]: One row per benchmark with its change and verdict.
+    """
+    rows = []
+    for name, value in results.items():
+        baseline = baselines.get(name)
+        change = None if not baseline else (value - baseline) / baseline * 100
+        rows.append({
+            "name": name,
+            "ns_per_call": round(value, 1),
+            "baseline": baseline,
+            "change_pct": None if change is None else round(change, 1),
+            "regressed": change is not None and change > threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with regression thresholds")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown against the baseline, in percent")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="Store the measured values as the new baselines")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    benchmarks = [
+        benchmark for benchmark in build_benchmarks()
+        if not args.only or args.only in benchmark.name
+    ]
+    results = {benchmark.name: run_benchmark(benchmark) for benchmark in benchmarks}
+
+    if args.update_baselines:
+        save_baselines(results)
+        print(f"Baselines written to {BASELINES_FILE}")
+        return 0
+
+    rows = compare(results, load_baselines(), args.threshold)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for row in rows:
+            change = "   new" if row["change_pct"] is None else f"{row['change_pct']:+6.1f}%"
+            verdict = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{row['name']:<42} {row['ns_per_call']:>14,.1f} ns  {change}  {verdict}")
+
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,563 @@
+"""
+Storage layouts for comments.
+
+`flat` (the default) stores one document per comment in `comments`.
+`bucketed` groups the comments of a post into documents of up to
+`[storage] COMMENT_BUCKET_SIZE` comments and `COMMENT_BUCKET_BYTES` bytes
+of comments in `comment_buckets`, so listing or
+deleting the comments of a busy post reads a few large documents instead of
+one per comment. Both layouts take the same comment-level queries; the
+bucketed one unwinds the buckets of the matching posts server-side.
+
+Either layout can be partitioned across databases by post
+(`src.database.partitions`): queries on one post go to its partition, and
+site-wide queries run on every partition concurrently and are merged.
+
+To switch the layout of existing data, or to move comments after changing
+the number of partitions, stop writers and run (from the project_test
+directory):
+
+    python -m src.database.comment_store --to bucketed
+    python -m src.database.comment_store --rebalance-from 2
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import sys
+from itertools import islice
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import BSON
+
+from src.database.connect import close_databases, connect_to_database_mongo, get_mongo_url
+from src.database.documents import run_pipeline, sort_order
+from src.database.indexes import ensure_indexes
+from src.database.partitions import (
+    PARTITIONED_COLLECTIONS,
+    comment_partition_count,
+    partition_databases,
+    partition_of,
+)
+from src.utils.ids import ref, ref_in
+from src.utils.settings import get_settings
+from src.utils.threads import PATH_SEPARATOR, thread_fields
+
+FLAT_LAYOUT = "flat"
+BUCKETED_LAYOUT = "bucketed"
+LAYOUTS = (FLAT_LAYOUT, BUCKETED_LAYOUT)
+DEFAULT_BUCKET_SIZE = 200
+# Well below the 16 MB document limit, leaving room for the bucket fields and reply counts
+DEFAULT_BUCKET_BYTES = 4 * 1024 * 1024
+# Stages that can run on each partition before the results are merged
+PER_DOCUMENT_STAGES = ("$match", "$project", "$unwind", "$replaceRoot", "$addFields", "$set")
+# $group accumulators whose per-partition results combine with the same operator
+COMBINABLE_ACCUMULATORS = ("$sum", "$min", "$max")
+
+logger = logging.getLogger(__name__)
+
+
+def comment_layout() -> str:
+    """
+    Returns the configured comment layout (`[storage] COMMENT_LAYOUT` in settings.ini).
+
+    Raises:
+        ValueError: If the configured layout is unknown.
+    """
+    layout = get_settings().get("storage", "comment_layout", fallback=FLAT_LAYOUT).strip().lower()
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown comment layout '{layout}', expected one of {', '.join(LAYOUTS)}")
+    return layout
+
+
+class CommentStore:
+    """
+    Comment operations used by the routes, independent of the storage layout.
+
+    Queries, projections and sorts are written against comment documents.
+    `find` and `aggregate` return cursors supporting `to_list` and `async for`.
+    """
+
+    def find(self, query: dict, projection: Optional[dict] = None, sort=None, limit: int = 0): ...
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None, sort=None) -> Optional[dict]:
+        comments = await self.find(query, projection, sort, 1).to_list(length=1)
+        return comments[0] if comments else None
+
+    def aggregate(self, pipeline: List[dict]): ...
+
+    async def insert(self, comment: dict) -> None: ...
+
+    async def add_reply(self, parent: dict) -> None:
+        """
+        Counts a reply on `parent`, a comment holding at least `_id` and `post_id`.
+        """
+
+    async def delete_for_post(self, post_id) -> None: ...
+
+    async def delete_for_posts(self, post_ids: List) -> None: ...
+
+    async def backfill_paths(self) -> int:
+        """
+        Makes comments stored before threading top-level comments; returns how many were updated.
+        """
+
+
+class FlatCommentStore(CommentStore):
+    """
+    One document per comment in `comments`.
+    """
+
+    def __init__(self, database):
+        self.collection = database.comments_collection
+
+    def find(self, query: dict, projection: Optional[dict] = None, sort=None, limit: int = 0):
+        cursor = self.collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    def aggregate(self, pipeline: List[dict]):
+        return self.collection.aggregate(pipeline)
+
+    async def insert(self, comment: dict) -> None:
+        await self.collection.insert_one(comment)
+
+    async def add_reply(self, parent: dict) -> None:
+        await self.collection.update_one({"_id": parent["_id"]}, {"$inc": {"reply_count": 1}})
+
+    async def delete_for_post(self, post_id) -> None:
+        await self.collection.delete_many({"post_id": ref(post_id)})
+
+    async def delete_for_posts(self, post_ids: List) -> None:
+        await self.collection.delete_many({"post_id": ref_in(post_ids)})
+
+    async def backfill_paths(self) -> int:
+        # One pipeline update computes every path from the comment's own `_id` on the server
+        result = await self.collection.update_many(
+            {"path": {"$exists": False}},
+            [{"$set": {
+                "parent_id": None,
+                "path": {"$concat": [{"$toString": "$_id"}, PATH_SEPARATOR]},
+                "depth": 0,
+                "reply_count": 0,
+            }}],
+        )
+        return result.modified_count
+
+
+class BucketedCommentStore(CommentStore):
+    """
+    Comments of a post grouped into fixed-size buckets in `comment_buckets`.
+
+    A bucket holds `post_id`, `count`, `bytes` (BSON size of its comments),
+    `first_at`, `last_at` and the `comments` array. Inserting is one upsert
+    that pushes onto a bucket of the post with room left for one more
+    comment of that size, or creates a new bucket when all are full.
+    Concurrent inserts may both create a bucket; both stay under the limits.
+    """
+
+    def __init__(self, database, bucket_size: Optional[int] = None, bucket_bytes: Optional[int] = None):
+        self.collection = database.comment_buckets_collection
+        settings = get_settings()
+        self.bucket_size = bucket_size or settings.getint(
+            "storage", "comment_bucket_size", fallback=DEFAULT_BUCKET_SIZE
+        )
+        self.bucket_bytes = bucket_bytes or settings.getint(
+            "storage", "comment_bucket_bytes", fallback=DEFAULT_BUCKET_BYTES
+        )
+
+    @staticmethod
+    def _bucket_filter(query: dict) -> dict:
+        # Conditions the buckets can be selected by through their indexes
+        bucket_filter = {}
+        if "post_id" in query:
+            bucket_filter["post_id"] = query["post_id"]
+        comment_id = query.get("_id")
+        if comment_id is not None and (not isinstance(comment_id, dict) or set(comment_id) == {"$in"}):
+            # Point lookups read only the bucket holding the comment
+            bucket_filter["comments._id"] = comment_id
+        created_at = query.get("created_at")
+        if isinstance(created_at, dict):
+            lower = {op: value for op, value in created_at.items() if op in ("$gt", "$gte")}
+            if lower:
+                bucket_filter["last_at"] = lower
+        return bucket_filter
+
+    def _unwound(self, query: dict) -> List[dict]:
+        return [
+            {"$match": self._bucket_filter(query)},
+            {"$sort": {"post_id": 1, "_id": 1}},
+            {"$unwind": "$comments"},
+            {"$replaceRoot": {"newRoot": "$comments"}},
+        ]
+
+    def find(self, query: dict, projection: Optional[dict] = None, sort=None, limit: int = 0):
+        pipeline = self._unwound(query) + [{"$match": query}]
+        if sort:
+            pipeline.append({"$sort": dict(sort)})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if projection:
+            pipeline.append({"$project": projection})
+        return self.collection.aggregate(pipeline)
+
+    def aggregate(self, pipeline: List[dict]):
+        stages = list(pipeline)
+        query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+        return self.collection.aggregate(self._unwound(query) + [{"$match": query}] + stages)
+
+    async def insert(self, comment: dict) -> None:
+        size = len(BSON.encode(comment))
+        await self.collection.update_one(
+            # Buckets written before `bytes` was tracked lack the field and receive no more comments
+            {"post_id": comment["post_id"], "count": {"$lt": self.bucket_size},
+             "bytes": {"$lt": self.bucket_bytes - size}},
+            {
+                "$push": {"comments": comment},
+                "$inc": {"count": 1, "bytes": size},
+                "$max": {"last_at": comment["created_at"]},
+                "$setOnInsert": {"first_at": comment["created_at"]},
+            },
+            upsert=True,
+        )
+
+    async def add_reply(self, parent: dict) -> None:
+        await self.collection.update_one(
+            {"post_id": ref(parent["post_id"]), "comments._id": parent["_id"]},
+            {"$inc": {"comments.$.reply_count": 1}},
+        )
+
+    async def delete_for_post(self, post_id) -> None:
+        await self.collection.delete_many({"post_id": ref(post_id)})
+
+    async def delete_for_posts(self, post_ids: List) -> None:
+        await self.collection.delete_many({"post_id": ref_in(post_ids)})
+
+    async def backfill_paths(self) -> int:
+        backfilled = 0
+        async for bucket in self.collection.find(
+            {"comments": {"$elemMatch": {"path": {"$exists": False}}}}, {"comments": 1}
+        ):
+            # Comments are only ever appended to a bucket, so positions stay valid under concurrent inserts
+            missing = [position for position, comment in enumerate(bucket["comments"]) if "path" not in comment]
+            fields = {
+                f"comments.{position}.{field}": value
+                for position in missing
+                for field, value in thread_fields(str(bucket["comments"][position]["_id"])).items()
+            }
+            await self.collection.update_one({"_id": bucket["_id"]}, {"$set": fields})
+            backfilled += len(missing)
+        return backfilled
+
+
+class _GatheredCursor:
+    """
+    Cursor over results merged from several partitions, fetched on first use.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[dict]]]):
+        self._fetch = fetch
+        self._results: Optional[List[dict]] = None
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        if self._results is None:
+            self._results = await self._fetch()
+        return self._results if length is None else self._results[:length]
+
+    async def __aiter__(self):
+        for document in await self.to_list():
+            yield document
+
+
+def _post_ids(condition) -> Optional[List]:
+    # Posts a `post_id` condition is limited to, or None if it may match any post
+    if condition is None:
+        return None
+    if not isinstance(condition, dict):
+        return [condition]
+    if set(condition) == {"$in"}:
+        return list(condition["$in"])
+    return None
+
+
+def _window(stages: List[dict]) -> Optional[int]:
+    # Number of sorted documents the leading $skip/$limit stages read, or None if all may be needed
+    skipped = 0
+    for stage in stages:
+        if "$skip" in stage:
+            skipped += stage["$skip"]
+        elif "$limit" in stage:
+            return skipped + stage["$limit"]
+        else:
+            return None
+    return None
+
+
+class PartitionedCommentStore(CommentStore):
+    """
+    Comments spread over partitions by post, each partition stored in the configured layout.
+
+    Queries and pipelines whose leading `post_id` condition names posts go
+    to their partitions only; others run on every partition concurrently.
+    Sorted reads are sorted and limited on each partition, and the sorted
+    results are merged (k-way) up to the limit. A pipeline runs its leading
+    per-document stages on the partitions, followed by a `$sort` (with the
+    `$limit` covering a following `$skip`/`$limit`) or by a `$group` whose
+    accumulators combine (`$sum`, `$min`, `$max`); the remaining stages run
+    in process over the merged results.
+
+    Attributes:
+        partitions (List[CommentStore]): Store of each partition, in partition order.
+    """
+
+    def __init__(self, partitions: List[CommentStore]):
+        self.partitions = partitions
+
+    def _route(self, post_id) -> CommentStore:
+        return self.partitions[partition_of(post_id, len(self.partitions))]
+
+    def _targets(self, query: dict) -> List[CommentStore]:
+        post_ids = _post_ids(query.get("post_id"))
+        if post_ids is None:
+            return self.partitions
+        targets = []
+        for post_id in post_ids:
+            target = self._route(post_id)
+            if target not in targets:
+                targets.append(target)
+        return targets
+
+    def find(self, query: dict, projection: Optional[dict] = None, sort=None, limit: int = 0):
+        targets = self._targets(query)
+        if len(targets) == 1:
+            return targets[0].find(query, projection, sort, limit)
+        return _GatheredCursor(lambda: self._gather_find(targets, query, projection, sort, limit))
+
+    @staticmethod
+    async def _gather_find(targets: List[CommentStore], query: dict, projection: Optional[dict],
+                           sort, limit: int) -> List[dict]:
+        sort = list(sort or [])
+        added = []
+        if projection and any(value for field, value in projection.items() if field != "_id"):
+            # The merge sorts on the sort fields, so an inclusion projection must return them
+            added = [field for field, _ in sort if field not in projection and field != "_id"]
+            projection = {**projection, **{field: 1 for field in added}}
+        results = await asyncio.gather(*(
+            target.find(query, projection, sort, limit).to_list(length=None) for target in targets
+        ))
+        # Each partition returns its own first `limit` documents in order; merging them keeps the order
+        merged = heapq.merge(*results, key=sort_order(sort)) if sort else (
+            document for result in results for document in result
+        )
+        documents = list(islice(merged, limit) if limit else merged)
+        for document in documents:
+            for field in added:
+                document.pop(field, None)
+        return documents
+
+    def aggregate(self, pipeline: List[dict]):
+        query = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else {}
+        targets = self._targets(query)
+        if len(targets) == 1:
+            return targets[0].aggregate(pipeline)
+        return _GatheredCursor(lambda: self._gather_aggregate(targets, pipeline))
+
+    @staticmethod
+    async def _gather_aggregate(targets: List[CommentStore], pipeline: List[dict]) -> List[dict]:
+        split = next(
+            (index for index, stage in enumerate(pipeline) if next(iter(stage)) not in PER_DOCUMENT_STAGES),
+            len(pipeline),
+        )
+        pushed, merged = list(pipeline[:split]), list(pipeline[split:])
+        if merged and "$group" in merged[0]:
+            group = merged[0]["$group"]
+            accumulators = {field: next(iter(spec)) for field, spec in group.items() if field != "_id"}
+            if all(operator in COMBINABLE_ACCUMULATORS for operator in accumulators.values()):
+                pushed.append(merged.pop(0))
+                merged.insert(0, {"$group": {
+                    "_id": "$_id", **{field: {operator: f"${field}"} for field, operator in accumulators.items()},
+                }})
+        sort = None
+        if merged and "$sort" in merged[0]:
+            # Each partition sorts, and returns no more than the following $skip/$limit can use
+            sort = list(merged.pop(0)["$sort"].items())
+            window = _window(merged)
+            pushed.append({"$sort": dict(sort)})
+            if window is not None:
+                pushed.append({"$limit": window})
+        results = await asyncio.gather(*(target.aggregate(pushed).to_list(length=None) for target in targets))
+        if sort is None:
+            return run_pipeline([document for result in results for document in result], merged)
+        documents = heapq.merge(*results, key=sort_order(sort))
+        return run_pipeline(list(documents), merged)
+
+    async def insert(self, comment: dict) -> None:
+        await self._route(comment["post_id"]).insert(comment)
+
+    async def add_reply(self, parent: dict) -> None:
+        await self._route(parent["post_id"]).add_reply(parent)
+
+    async def delete_for_post(self, post_id) -> None:
+        await self._route(post_id).delete_for_post(post_id)
+
+    async def delete_for_posts(self, post_ids: List) -> None:
+        by_partition: Dict[int, List] = {}
+        for post_id in post_ids:
+            by_partition.setdefault(partition_of(post_id, len(self.partitions)), []).append(post_id)
+        await asyncio.gather(*(
+            self.partitions[index].delete_for_posts(ids) for index, ids in by_partition.items()
+        ))
+
+    async def backfill_paths(self) -> int:
+        return sum(await asyncio.gather(*(partition.backfill_paths() for partition in self.partitions)))
+
+
+def layout_store(database, layout: Optional[str] = None) -> CommentStore:
+    """
+    Creates the comment store of one database for a layout, ignoring partitioning.
+
+    Args:
+        database (Database): Connected database handle.
+        layout (Optional[str]): Layout name; defaults to the configured one.
+
+    Returns:
+        CommentStore: Store for the layout.
+    """
+    if (layout or comment_layout()) == BUCKETED_LAYOUT:
+        return BucketedCommentStore(database)
+    return FlatCommentStore(database)
+
+
+def comment_store(database, layout: Optional[str] = None, partitions: Optional[int] = None) -> CommentStore:
+    """
+    Creates the comment store of a database handle for the configured layout and partitions.
+
+    Args:
+        database (Database): Connected database handle.
+        layout (Optional[str]): Layout name; defaults to the configured one.
+        partitions (Optional[int]): Number of partitions; defaults to `[comment_partitions] COUNT`.
+
+    Returns:
+        CommentStore: Store for the layout, partitioned if partitions are configured.
+    """
+    partitions = comment_partition_count() if partitions is None else partitions
+    if partitions <= 0:
+        return layout_store(database, layout)
+    return PartitionedCommentStore([
+        layout_store(partition, layout) for partition in partition_databases(database, partitions)
+    ])
+
+
+async def convert_layout(database, target: str) -> int:
+    """
+    Moves every comment into the `target` layout, one post at a time.
+
+    Comments are written to the target before they are removed from the
+    source, so an interrupted run is completed by running it again; it must
+    not run while comments are being written.
+
+    Args:
+        database (Database): Connected database handle.
+        target (str): Layout to convert to.
+
+    Returns:
+        int: Number of moved comments.
+    """
+    source = comment_store(database, FLAT_LAYOUT if target == BUCKETED_LAYOUT else BUCKETED_LAYOUT)
+    destination = comment_store(database, target)
+    moved = 0
+    for post_id in await _commented_posts(source):
+        moved += await _move_post(source, destination, post_id)
+    return moved
+
+
+async def rebalance_partitions(database, from_count: int, to_count: Optional[int] = None) -> int:
+    """
+    Moves the comments of every post to its partition under a new number of partitions.
+
+    Only posts whose partition changes are moved, one post at a time, in
+    the same way as `convert_layout`: an interrupted run is completed by
+    running it again, and it must not run while comments are being written.
+
+    Args:
+        database (Database): Connected handle of the main database.
+        from_count (int): Number of partitions the comments are spread over; 0 for the main database.
+        to_count (Optional[int]): New number of partitions; defaults to the configured one.
+
+    Returns:
+        int: Number of moved comments.
+    """
+    to_count = comment_partition_count() if to_count is None else to_count
+    sources = partition_databases(database, from_count)
+    destinations = partition_databases(database, to_count)
+    if to_count > 0:
+        for partition in destinations:
+            await ensure_indexes(partition, PARTITIONED_COLLECTIONS)
+
+    moved = 0
+    for partition in sources:
+        source = layout_store(partition)
+        for post_id in await _commented_posts(source):
+            destination = destinations[partition_of(post_id, len(destinations))]
+            if destination is not partition:
+                moved += await _move_post(source, layout_store(destination), post_id)
+    return moved
+
+
+async def _commented_posts(store: CommentStore) -> List:
+    rows = await store.aggregate([{"$match": {}}, {"$group": {"_id": "$post_id"}}]).to_list(length=None)
+    return [row["_id"] for row in rows]
+
+
+async def _move_post(source: CommentStore, destination: CommentStore, post_id) -> int:
+    # Comments already copied by an interrupted run are not inserted twice
+    present = {
+        str(comment["_id"])
+        for comment in await destination.find({"post_id": post_id}, {"_id": 1}).to_list(length=None)
+    }
+    moved = 0
+    async for comment in source.find({"post_id": post_id}, sort=[("_id", 1)]):
+        if str(comment["_id"]) not in present:
+            await destination.insert(comment)
+            moved += 1
+    await source.delete_for_post(post_id)
+    logger.info(f"Moved the comments of post {post_id}")
+    return moved
+
+
+async def convert(target: Optional[str], rebalance_from: Optional[int] = None,
+                  partitions: Optional[int] = None) -> int:
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    try:
+        if target is None:
+            return await rebalance_partitions(database, rebalance_from, partitions)
+        return await convert_layout(database, target)
+    finally:
+        await close_databases()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Move comments to another storage layout or partitioning")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--to", choices=LAYOUTS, help="Target layout")
+    action.add_argument("--rebalance-from", type=int, metavar="N",
+                        help="Number of partitions the comments are spread over now (0: main database)")
+    parser.add_argument("--partitions", type=int, default=None,
+                        help="Target number of partitions for --rebalance-from (default: [comment_partitions] COUNT)")
+    args = parser.parse_args(argv)
+    if any(count is not None and count < 0 for count in (args.rebalance_from, args.partitions)):
+        parser.error("--rebalance-from and --partitions must not be negative")
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps({"moved": asyncio.run(convert(args.to, args.rebalance_from, args.partitions))}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,128 @@
-import aiofiles
 import asyncio
-import configparser
 import logging
-import pathlib
-from typing import Union
+from typing import Dict, Optional, Tuple, Union
 from motor.motor_asyncio import (
-    AsyncIOMotorClient,
     AsyncIOMotorDatabase,
     AsyncIOMotorCollection,
 )
+from pymongo.errors import DuplicateKeyError
 from pymongo.results import InsertOneResult
+from src.database.storage import StorageClient, create_client, storage_backend
+from src.database.profiles import DatabaseProfile, TimeLimitedCollection, database_profile
+from src.utils.settings import get_settings
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO)
 
+DEFAULT_DB_NAME = "TestDemoDataBase"
+
 
 class Database:
     """
     Represents a MongoDB database connection using AsyncIO with motor.
 
+    The client comes from the configured storage backend (`[storage] BACKEND`):
+    Motor for a real MongoDB deployment or the in-memory engine.
+
+    A handle bound to a database profile (`src.database.profiles`, see
+    `with_profile`) shares the client and applies the profile's read
+    preference, concerns and time limit to its collections.
+
     Attributes:
-        client (AsyncIOMotorClient): AsyncIO MongoDB client.
+        client (StorageClient): AsyncIO MongoDB client or in-memory client.
+        profile (Optional[DatabaseProfile]): Profile applied to the operations, if any.
         db (AsyncIOMotorDatabase): MongoDB database instance.
         users_collection (AsyncIOMotorCollection): Collection for user data.
         posts_collection (AsyncIOMotorCollection): Collection for posts data.
         comments_collection (AsyncIOMotorCollection): Collection for comments data.
+        comment_buckets_collection (AsyncIOMotorCollection): Comments grouped per post, used by
+            the bucketed comment layout (`src.database.comment_store`).
         journal_username_collection (AsyncIOMotorCollection): Collection for journal username data.
         journal_email_collection (AsyncIOMotorCollection): Collection for journal email data.
         journal_password_collection (AsyncIOMotorCollection): Collection for journal password data.
         user_notifications_collection (AsyncIOMotorCollection): Collection for user notifications data.
+        follows_collection (AsyncIOMotorCollection): Collection of follower -> followee relations.
+        trending_collection (AsyncIOMotorCollection): Persisted trending posts ranking.
     """
 
-    def __init__(self, url: str):
+    def __init__(self, url: str, client: StorageClient = None, shared: bool = False,
+                 profile: Optional[DatabaseProfile] = None, name: str = DEFAULT_DB_NAME):
         """
         Initializes the Database instance.
 
         Args:
             url (str): MongoDB connection URL.
+            client (StorageClient): Client to use instead of one for the configured backend.
+            shared (bool): Whether the instance is the process-wide pooled handle,
+                which `close()` leaves open.
+            profile (Optional[DatabaseProfile]): Profile applied to the operations.
+            name (str): Name of the database in the deployment.
+        """
+        self.url = url
+        self.name = name
+        self.client: StorageClient = client or create_client(url)
+        self.shared = shared
+        self.profile = profile
+        self._profiles: Dict[str, Database] = {}
+        self._named: Dict[str, Database] = {}
+        self.db: AsyncIOMotorDatabase = self.client.get_database(
+            name, **(profile.options() if profile else {})
+        )
+        self.users_collection: AsyncIOMotorCollection = self._collection("users")
+        self.posts_collection: AsyncIOMotorCollection = self._collection("posts")
+        self.comments_collection: AsyncIOMotorCollection = self._collection("comments")
+        self.comment_buckets_collection: AsyncIOMotorCollection = self._collection("comment_buckets")
+        self.journal_username_collection: AsyncIOMotorCollection = self._collection("journal_username")
+        self.journal_email_collection: AsyncIOMotorCollection = self._collection("journal_email")
+        self.journal_password_collection: AsyncIOMotorCollection = self._collection("journal_password")
+        self.user_notifications_collection: AsyncIOMotorCollection = self._collection("user_notifications")
+        self.follows_collection: AsyncIOMotorCollection = self._collection("follows")
+        self.trending_collection: AsyncIOMotorCollection = self._collection("trending")
+
+    def _collection(self, name: str) -> AsyncIOMotorCollection:
+        collection = self.db[name]
+        if self.profile and self.profile.max_time_ms:
+            return TimeLimitedCollection(collection, self.profile.max_time_ms)
+        return collection
+
+    def with_profile(self, name: str) -> "Database":
+        """
+        Returns a handle sharing this client with the options of a database profile.
+
+        Args:
+            name (str): Profile name, a `[db_profile:<name>]` section of settings.ini.
+
+        Returns:
+            Database: Shared handle for the profile, created on first use.
+
+        Raises:
+            ValueError: If the profile is not defined or invalid.
         """
-        self.client: AsyncIOMotorClient = AsyncIOMotorClient(url)
-        self.db: AsyncIOMotorDatabase = self.client["TestDemoDataBase"]
-        self.users_collection: AsyncIOMotorCollection = self.db["users"]
-        self.posts_collection: AsyncIOMotorCollection = self.db["posts"]
-        self.comments_collection: AsyncIOMotorCollection = self.db["comments"]
-        self.journal_username_collection: AsyncIOMotorCollection = self.db["journal_username"]
-        self.journal_email_collection: AsyncIOMotorCollection = self.db["journal_email"]
-        self.journal_password_collection: AsyncIOMotorCollection = self.db["journal_password"]
-        self.user_notifications_collection: AsyncIOMotorCollection = self.db["user_notifications"]
+        database = self._profiles.get(name)
+        if database is None:
+            database = Database(
+                self.url, client=self.client, shared=True, profile=database_profile(name), name=self.name
+            )
+            self._profiles[name] = database
+        return database
+
+    def named(self, name: str) -> "Database":
+        """
+        Returns a handle on another database of the same deployment, with the same profile.
+
+        Args:
+            name (str): Database name.
+
+        Returns:
+            Database: Shared handle, created on first use.
+        """
+        if name == self.name:
+            return self
+        database = self._named.get(name)
+        if database is None:
+            database = Database(self.url, client=self.client, shared=True, profile=self.profile, name=name)
+            self._named[name] = database
+        return database
 
     async def __aenter__(self):
         """
@@ -60,14 +136,22 @@ class Database:
         """
         await self.close()
 
-    async def close(self):
+    async def close(self, force: bool = False):
         """
         Closes the MongoDB client connection.
+
+        The pooled handle returned by `connect_to_database_mongo` is shared by
+        all requests, so it is only closed when `force` is set (on shutdown).
+
+        Args:
+            force (bool): Close the client even if it is shared.
         """
+        if self.shared and not force:
+            return
         try:
             if self.client:
                 logging.info("Closing the client...")
-                await self.client.close()
+                self.client.close()
                 logging.info("Client closed.")
             else:
                 logging.warning("No client to close.")
@@ -83,35 +167,99 @@ class Database:
 
         Returns:
             Union[bool, str]: Inserted ID if successful, False if failed.
+
+        Raises:
+            DuplicateKeyError: If a user with the same email already exists.
         """
         try:
             insert_result: InsertOneResult = await self.users_collection.insert_one(
                 user_data
             )
             return insert_result.inserted_id
+        except DuplicateKeyError:
+            # The unique email index rejected the insert; callers report it
+            raise
         except Exception as e:
             logging.error("Error while saving user data: %s", e)
             return False
 
 
-async def connect_to_database_mongo(url: str) -> Union[None, Database]:
+# Pooled Database handles keyed by (backend, url); one client per process
+_databases: Dict[Tuple[str, str], Database] = {}
+_connect_lock = asyncio.Lock()
+
+
+async def connect_to_database_mongo(url: str, profile: Optional[str] = None) -> Union[None, Database]:
     """
     Connects to MongoDB using the provided URL.
 
+    The first call creates the client, resolves the deployment and pings it;
+    later calls return the same pooled handle without a round trip.
+
     Args:
         url (str): MongoDB connection URL.
+        profile (Optional[str]): Database profile the operations are made with
+            (`src.database.profiles`); the URL's defaults if None.
 
     Returns:
         Union[None, Database]: Database instance if successful, None if failed.
+
+    Raises:
+        ValueError: If the profile is not defined or invalid.
     """
-    try:
-        database = Database(url)
-        await database.client.admin.command("ping")
-        logging.info("Connected to MongoDB. Ping successful!")
-        return database
-    except Exception as e:
-        logging.error("Failed to connect to MongoDB: %s", e)
+    database = _databases.get((storage_backend(), url)) or await _connect(url)
+    if database is None:
         return None
+    return database.with_profile(profile) if profile else database
+
+
+async def _connect(url: str) -> Union[None, Database]:
+    key = (storage_backend(), url)
+    async with _connect_lock:
+        database = _databases.get(key)
+        if database is not None:
+            return database
+        try:
+            database = Database(url, shared=True)
+            await database.client.admin.command("ping")
+            logging.info("Connected to MongoDB. Ping successful!")
+        except Exception as e:
+            logging.error("Failed to connect to MongoDB: %s", e)
+            if database is not None:
+                await database.close(force=True)
+            return None
+        _databases[key] = database
+        return database
+
+
+def pooled_database(url: str) -> Database:
+    """
+    Returns the pooled handle of a deployment, creating it without a ping.
+
+    Used for secondary deployments (comment partitions) that are reached
+    through an already connected handle; the driver connects on first use.
+
+    Args:
+        url (str): MongoDB connection URL.
+
+    Returns:
+        Database: Pooled handle.
+    """
+    key = (storage_backend(), url)
+    database = _databases.get(key)
+    if database is None:
+        database = _databases[key] = Database(url, shared=True)
+    return database
+
+
+async def close_databases() -> None:
+    """
+    Closes every pooled Database handle; called on application shutdown.
+    """
+    databases = list(_databases.values())
+    _databases.clear()
+    for database in databases:
+        await database.close(force=True)
 
 
 async def get_mongo_url() -> str:
@@ -121,16 +269,16 @@ async def get_mongo_url() -> str:
     Returns:
         str: MongoDB connection URL.
     """
-    file_config = pathlib.Path(__file__).parent.parent / "settings.ini"
-    async with aiofiles.open(file_config, mode="r") as config_file:
-        config_text = await config_file.read()
-        config = configparser.ConfigParser()
-        config.read_string(config_text)
-
-        mongo_user = config.get("mongo", "user")
-        mongo_pass = config.get("mongo", "password")
-        mongo_db = config.get("mongo", "db_name")
-        mongo_domain = config.get("mongo", "domain")
-
-        url = f"mongodb+srv://{mongo_user}:{mongo_pass}@{mongo_domain}/?retryWrites=true&w=majority"
+    config = get_settings()
+
+    # A full URL, e.g. of a local replica set, takes precedence over the Atlas credentials
+    url = config.get("mongo", "url", fallback="").strip()
+    if url:
         return url
+
+    mongo_user = config.get("mongo", "user")
+    mongo_pass = config.get("mongo", "password")
+    mongo_domain = config.get("mongo", "domain")
+
+    url = f"mongodb+srv://{mongo_user}:{mongo_pass}@{mongo_domain}/?retryWrites=true&w=majority"
+    return url
@@ -0,0 +1,565 @@
+"""
+MongoDB document semantics evaluated in process: query matching,
+projection, sorting, update operators and aggregation pipelines.
+
+Used by the in-memory backend (`src.database.memory`) and to merge the
+results of queries run on several comment partitions.
+"""
+import re
+from datetime import datetime
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+_MISSING = object()
+_RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+# Values ----------------------------------------------------------------------
+
+def _copy(value):
+    """
+    Copies a document; leaves are immutable so only containers are duplicated.
+    Dates are truncated to milliseconds, the precision of BSON dates.
+    """
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, datetime) and value.microsecond % 1000:
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _type_rank(value) -> int:
+    # BSON comparison order
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def sort_key(value) -> tuple:
+    """
+    Returns a key ordering values of mixed types the way MongoDB does.
+
+    Args:
+        value: Any BSON-compatible value.
+
+    Returns:
+        tuple: Comparable key.
+    """
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank == 4:
+        return (rank, tuple((key, sort_key(item)) for key, item in value.items()))
+    if rank == 5:
+        return (rank, tuple(sort_key(item) for item in value))
+    if rank == 10:
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return ("__dict__",) + tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ("__list__",) + tuple(_hashable(item) for item in value)
+    return value
+
+
+def get_path(document: dict, path: str, default=_MISSING):
+    """
+    Resolves a dotted field path inside a document.
+
+    Args:
+        document (dict): Document to read.
+        path (str): Dotted path such as `comments.post_id`.
+        default: Value returned when the path does not exist.
+
+    Returns:
+        The value at the path, a list of values when the path crosses an array, or `default`.
+    """
+    current = document
+    parts = path.split(".")
+    for index, part in enumerate(parts):
+        if isinstance(current, dict):
+            if part not in current:
+                return default
+            current = current[part]
+        elif isinstance(current, list):
+            if part.isdigit():
+                position = int(part)
+                if position >= len(current):
+                    return default
+                current = current[position]
+            else:
+                rest = ".".join(parts[index:])
+                values = [get_path(item, rest) for item in current if isinstance(item, dict)]
+                return [value for value in values if value is not _MISSING] or default
+        else:
+            return default
+    return current
+
+
+def _set_path(document: dict, path: str, value) -> None:
+    parts = path.split(".")
+    current = document
+    for part in parts[:-1]:
+        if isinstance(current, list):
+            current = current[int(part)]
+        else:
+            current = current.setdefault(part, {})
+    if isinstance(current, list):
+        current[int(parts[-1])] = value
+    else:
+        current[parts[-1]] = value
+
+
+def _matched_position(document: dict, query: dict) -> Optional[int]:
+    """
+    Returns the index of the first array element matched by the query, for the positional `$` operator.
+    """
+    for field, condition in query.items():
+        parts = field.split(".")
+        for split in range(1, len(parts)):
+            array = get_path(document, ".".join(parts[:split]))
+            if not isinstance(array, list):
+                continue
+            rest = ".".join(parts[split:])
+            for position, item in enumerate(array):
+                if isinstance(item, dict) and _match_condition(get_path(item, rest), condition):
+                    return position
+    return None
+
+
+def _unset_path(document: dict, path: str) -> None:
+    parts = path.split(".")
+    current = document
+    for part in parts[:-1]:
+        current = current.get(part)
+        if not isinstance(current, dict):
+            return
+    current.pop(parts[-1], None)
+
+
+# Query matching --------------------------------------------------------------
+
+def _compare(value, operator: str, operand) -> bool:
+    if value is _MISSING or _type_rank(value) != _type_rank(operand):
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    return value <= operand
+
+
+def _equals(value, operand) -> bool:
+    if value is _MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return any(_equals(item, operand) for item in value)
+    if isinstance(value, bool) != isinstance(operand, bool):
+        return False
+    return value == operand
+
+
+def _match_operator(value, operator: str, operand) -> bool:
+    if operator == "$eq":
+        return _equals(value, operand)
+    if operator == "$ne":
+        return not _equals(value, operand)
+    if operator in _RANGE_OPERATORS:
+        if isinstance(value, list):
+            return any(_compare(item, operator, operand) for item in value)
+        return _compare(value, operator, operand)
+    if operator == "$in":
+        return any(_equals(value, item) for item in operand)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in operand)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if operator == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if operator == "$not":
+        return not _match_condition(value, operand)
+    if operator == "$size":
+        return isinstance(value, list) and len(value) == operand
+    if operator == "$elemMatch":
+        return isinstance(value, list) and any(
+            isinstance(item, dict) and matches(item, operand) for item in value
+        )
+    raise OperationFailure(f"Unsupported query operator: {operator}")
+
+
+def _match_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        flags = 0
+        if "$options" in condition:
+            flags = re.IGNORECASE if "i" in condition["$options"] else 0
+        for operator, operand in condition.items():
+            if operator == "$options":
+                continue
+            if operator == "$regex" and flags:
+                operand = re.compile(operand, flags)
+            if not _match_operator(value, operator, operand):
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    return _equals(value, condition)
+
+
+def matches(document: dict, query: Optional[dict]) -> bool:
+    """
+    Evaluates a MongoDB query filter against a document.
+
+    Args:
+        document (dict): Candidate document.
+        query (Optional[dict]): Query filter.
+
+    Returns:
+        bool: True if the document satisfies the filter.
+    """
+    if not query:
+        return True
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif field == "$nor":
+            if any(matches(document, part) for part in condition):
+                return False
+        elif not _match_condition(get_path(document, field), condition):
+            return False
+    return True
+
+
+# Projection and sorting ------------------------------------------------------
+
+def project(document: dict, projection: Optional[Union[dict, list]]) -> dict:
+    """
+    Applies an inclusion or exclusion projection.
+
+    Args:
+        document (dict): Source document (not modified).
+        projection (Optional[Union[dict, list]]): MongoDB projection.
+
+    Returns:
+        dict: Projected copy of the document.
+    """
+    if not projection:
+        return _copy(document)
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+
+    include_id = projection.get("_id", 1)
+    fields = {field: flag for field, flag in projection.items() if field != "_id"}
+    inclusive = any(flag for flag in fields.values()) or (not fields and include_id)
+
+    if inclusive:
+        result = {}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        for field, flag in fields.items():
+            if not flag:
+                continue
+            value = get_path(document, field)
+            if value is not _MISSING:
+                _set_path(result, field, _copy(value))
+        return result
+
+    result = _copy(document)
+    for field in fields:
+        _unset_path(result, field)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _normalize_sort(key_or_list, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(field, order) for field, order in key_or_list]
+
+
+def sort_documents(documents: List[dict], sort: List[Tuple[str, int]]) -> List[dict]:
+    """
+    Sorts documents by several fields with per-field direction.
+
+    Args:
+        documents (List[dict]): Documents to sort.
+        sort (List[Tuple[str, int]]): (field, direction) pairs, most significant first.
+
+    Returns:
+        List[dict]: Sorted documents.
+    """
+    for field, direction in reversed(sort):
+        documents.sort(key=lambda doc: sort_key(get_path(doc, field, None)), reverse=direction < 0)
+    return documents
+
+
+def sort_order(sort: List[Tuple[str, int]]) -> Callable[[dict], Any]:
+    """
+    Returns a key function ordering documents like a MongoDB sort, e.g. to merge sorted results.
+
+    Args:
+        sort (List[Tuple[str, int]]): (field, direction) pairs, most significant first.
+
+    Returns:
+        Callable[[dict], Any]: Key function for `sorted` or `heapq.merge`.
+    """
+    def compare(left: dict, right: dict) -> int:
+        for field, direction in sort:
+            left_key, right_key = sort_key(get_path(left, field, None)), sort_key(get_path(right, field, None))
+            if left_key != right_key:
+                return direction if left_key > right_key else -direction
+        return 0
+
+    return cmp_to_key(compare)
+
+
+# Updates ---------------------------------------------------------------------
+
+def apply_update(document: dict, update: dict, inserting: bool = False, position: Optional[int] = None) -> None:
+    """
+    Applies MongoDB update operators, or an update pipeline, to a document in place.
+
+    Args:
+        document (dict): Document to modify.
+        update (dict): Update document made of operators ($set, $inc, $push, ...), or a
+            pipeline of `$set` / `$addFields` / `$unset` stages computing fields with expressions.
+        inserting (bool): True when the update creates the document through an upsert.
+        position (Optional[int]): Array index the query matched, substituted for the positional `$`.
+
+    Raises:
+        OperationFailure: If the update contains an unsupported operator, or a positional
+            `$` the query did not match an array element for.
+    """
+    if isinstance(update, list):
+        for stage in update:
+            (name, spec), = stage.items()
+            if name in ("$set", "$addFields"):
+                values = {field: evaluate(document, expression) for field, expression in spec.items()}
+                for field, value in values.items():
+                    _set_path(document, field, value)
+            elif name == "$unset":
+                for field in [spec] if isinstance(spec, str) else spec:
+                    _unset_path(document, field)
+            else:
+                raise OperationFailure(f"Unsupported update pipeline stage: {name}")
+        return
+    for operator, fields in update.items():
+        if operator == "$setOnInsert":
+            if inserting:
+                for field, value in fields.items():
+                    _set_path(document, field, _copy(value))
+            continue
+        for field, value in fields.items():
+            if "$" in field.split("."):
+                if position is None:
+                    raise OperationFailure("The positional operator did not find the match needed from the query.", 2)
+                field = ".".join(str(position) if part == "$" else part for part in field.split("."))
+            current = get_path(document, field)
+            if operator == "$set":
+                _set_path(document, field, _copy(value))
+            elif operator == "$unset":
+                _unset_path(document, field)
+            elif operator == "$inc":
+                _set_path(document, field, (0 if current is _MISSING else current) + value)
+            elif operator == "$min":
+                if current is _MISSING or sort_key(value) < sort_key(current):
+                    _set_path(document, field, _copy(value))
+            elif operator == "$max":
+                if current is _MISSING or sort_key(value) > sort_key(current):
+                    _set_path(document, field, _copy(value))
+            elif operator in ("$push", "$addToSet"):
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = [] if current is _MISSING else list(current)
+                for item in items:
+                    if operator == "$push" or item not in array:
+                        array.append(_copy(item))
+                if isinstance(value, dict) and "$slice" in value:
+                    limit = value["$slice"]
+                    array = array[limit:] if limit < 0 else array[:limit]
+                _set_path(document, field, array)
+            elif operator == "$pull":
+                if current is not _MISSING:
+                    _set_path(document, field, [
+                        item for item in current
+                        if not (matches(item, value) if isinstance(value, dict) and isinstance(item, dict)
+                                else _match_condition(item, value))
+                    ])
+            else:
+                raise OperationFailure(f"Unsupported update operator: {operator}")
+
+
+# Aggregation -----------------------------------------------------------------
+
+def evaluate(document: dict, expression):
+    """
+    Evaluates an aggregation expression against a document.
+
+    Args:
+        document (dict): Current document.
+        expression: Field path (`$field`), literal or operator expression.
+
+    Returns:
+        The computed value.
+    """
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(document, expression[1:], None)
+        return None if value is _MISSING else value
+    if isinstance(expression, list):
+        return [evaluate(document, item) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith("$"):
+        return {key: evaluate(document, item) for key, item in expression.items()}
+
+    operator, operand = next(iter(expression.items()))
+    if operator == "$dateToString":
+        value = evaluate(document, operand["date"])
+        return value.strftime(operand.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace("%L", "000")) if value else None
+    if operator == "$cond":
+        if isinstance(operand, dict):
+            operand = [operand["if"], operand["then"], operand["else"]]
+        condition, then, otherwise = operand
+        return evaluate(document, then) if evaluate(document, condition) else evaluate(document, otherwise)
+    if operator == "$ifNull":
+        value = evaluate(document, operand[0])
+        return evaluate(document, operand[1]) if value is None else value
+    if operator in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        left, right = (evaluate(document, item) for item in operand)
+        if operator == "$eq":
+            return left == right
+        if operator == "$ne":
+            return left != right
+        return _compare(left, operator, right)
+    if operator == "$add":
+        return sum(evaluate(document, item) or 0 for item in operand)
+    if operator == "$size":
+        return len(evaluate(document, operand) or [])
+    if operator == "$concat":
+        parts = [evaluate(document, item) for item in operand]
+        return None if any(part is None for part in parts) else "".join(parts)
+    if operator == "$toString":
+        value = evaluate(document, operand)
+        return None if value is None else str(value)
+    raise OperationFailure(f"Unsupported expression operator: {operator}")
+
+
+def _accumulate(operator: str, values: List) -> Any:
+    if operator == "$sum":
+        return sum(value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool))
+    if operator == "$avg":
+        numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        return sum(numbers) / len(numbers) if numbers else None
+    present = [value for value in values if value is not None]
+    if operator == "$min":
+        return min(present, key=sort_key) if present else None
+    if operator == "$max":
+        return max(present, key=sort_key) if present else None
+    if operator == "$first":
+        return values[0] if values else None
+    if operator == "$last":
+        return values[-1] if values else None
+    if operator == "$push":
+        return values
+    if operator == "$addToSet":
+        return [value for index, value in enumerate(values) if value not in values[:index]]
+    raise OperationFailure(f"Unsupported accumulator: {operator}")
+
+
+def run_pipeline(documents: List[dict], pipeline: List[dict]) -> List[dict]:
+    """
+    Runs aggregation stages over documents.
+
+    Args:
+        documents (List[dict]): Input documents (may be modified).
+        pipeline (List[dict]): Stages ($match, $group, $sort, $skip, $limit, $project, $unwind,
+            $replaceRoot, $count).
+
+    Returns:
+        List[dict]: Output documents.
+
+    Raises:
+        OperationFailure: If a stage is not supported.
+    """
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif name == "$group":
+            groups: Dict[Any, Tuple[Any, List[dict]]] = {}
+            for document in documents:
+                key = evaluate(document, spec["_id"])
+                groups.setdefault(_hashable(key), (key, []))[1].append(document)
+            output = []
+            for key, members in groups.values():
+                result = {"_id": key}
+                for field, accumulator in spec.items():
+                    if field == "_id":
+                        continue
+                    (operator, expression), = accumulator.items()
+                    result[field] = _accumulate(operator, [evaluate(member, expression) for member in members])
+                output.append(result)
+            documents = output
+        elif name == "$sort":
+            documents = sort_documents(documents, _normalize_sort(spec))
+        elif name == "$skip":
+            documents = documents[spec:]
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$project":
+            # Literal 0/1 flags select fields, anything else is a computed expression
+            computed = {field: value for field, value in spec.items() if not isinstance(value, (bool, int))}
+            plain = {field: value for field, value in spec.items() if field not in computed}
+            output = []
+            for document in documents:
+                result = project(document, plain) if plain else {"_id": document.get("_id")}
+                for field, expression in computed.items():
+                    result[field] = evaluate(document, expression)
+                output.append(result)
+            documents = output
+        elif name == "$unwind":
+            path = (spec["path"] if isinstance(spec, dict) else spec)[1:]
+            output = []
+            for document in documents:
+                for item in get_path(document, path, None) or []:
+                    unwound = dict(document)
+                    _set_path(unwound, path, item)
+                    output.append(unwound)
+            documents = output
+        elif name == "$replaceRoot":
+            documents = [evaluate(document, spec["newRoot"]) for document in documents]
+        elif name == "$count":
+            documents = [{spec: len(documents)}] if documents else []
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage: {name}")
+    return documents
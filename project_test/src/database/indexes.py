@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from src.utils.settings import get_settings
+
+# Largest expireAfterSeconds MongoDB accepts; used when a journal is kept forever
+MAX_EXPIRE_AFTER_SECONDS = 2147483647
+# Error code of create_index when the index exists with different options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class IndexSpec(NamedTuple):
+    """
+    Declarative description of a collection index.
+
+    Attributes:
+        keys (List[Tuple[str, int]]): Indexed fields with their sort direction.
+        unique (bool): Whether duplicate keys are rejected.
+        expire_after_seconds (Optional[int]): Makes it a TTL index: documents are removed
+            this many seconds after the date in the (single) indexed field.
+    """
+
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+
+def journal_retention_seconds(field: str) -> int:
+    """
+    Reads how long entries of a user-change journal are kept (`[journal] <FIELD>_RETENTION_DAYS`).
+
+    Args:
+        field (str): Journaled field: username, email or password.
+
+    Returns:
+        int: Retention in seconds; 0 days (keep forever) maps to the largest TTL.
+    """
+    days = get_settings().getfloat("journal", f"{field}_retention_days", fallback=0)
+    if days <= 0:
+        return MAX_EXPIRE_AFTER_SECONDS
+    return min(int(days * 86400), MAX_EXPIRE_AFTER_SECONDS)
+
+
+def journal_indexes(field: str) -> List[IndexSpec]:
+    return [
+        IndexSpec([("user", 1), ("timestamp", -1)]),
+        # TTL on a real date; also serves the compaction scan over old entries
+        IndexSpec([("created_at", 1)], expire_after_seconds=journal_retention_seconds(field)),
+    ]
+
+
+# Indexes backing the queries issued by the routes, keyed by collection name
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "users": [
+        # Emails are stored lowercased, so this enforces uniqueness of the normalized email
+        IndexSpec([("email", 1)], unique=True),
+        IndexSpec([("reset_token", 1)]),
+    ],
+    "posts": [
+        # Per-author feeds page by (created_at, _id); the author_id prefix also serves account deletion
+        IndexSpec([("author_id", 1), ("created_at", -1), ("_id", -1)]),
+        # The newest-first listing of GET /posts/ pages by (created_at, _id)
+        IndexSpec([("blocked", 1), ("created_at", -1), ("_id", -1)]),
+    ],
+    "comments": [
+        IndexSpec([("post_id", 1), ("blocked", 1)]),
+        # Threads and subtrees are range scans over materialized paths
+        IndexSpec([("post_id", 1), ("path", 1)]),
+        IndexSpec([("created_at", 1)]),
+    ],
+    "comment_buckets": [
+        # The upsert appending a comment looks for a bucket of the post with room left
+        IndexSpec([("post_id", 1), ("count", 1)]),
+        # Reads stream a post's buckets in creation order
+        IndexSpec([("post_id", 1), ("_id", 1)]),
+        # Lookups of one comment (parents, auto-reply targets) select its bucket; multikey over the array
+        IndexSpec([("post_id", 1), ("comments._id", 1)]),
+        IndexSpec([("last_at", 1)]),
+    ],
+    "follows": [
+        IndexSpec([("follower_id", 1), ("followee_id", 1)], unique=True),
+        # The feed reads a user's most recent follows without a sort stage
+        IndexSpec([("follower_id", 1), ("created_at", -1)]),
+        IndexSpec([("followee_id", 1)]),
+    ],
+    "journal_username": journal_indexes("username"),
+    "journal_email": journal_indexes("email"),
+    "journal_password": journal_indexes("password"),
+}
+
+
+async def ensure_indexes(database, collections: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Creates the declared indexes that do not exist yet.
+
+    `create_index` is a no-op for an index that already exists with the same
+    keys and options, and fails when it exists with different options. A
+    TTL index whose retention changed in the settings is updated in place
+    with `collMod` instead of being rebuilt.
+
+    Args:
+        database (Database): Connected database handle.
+        collections (Optional[Iterable[str]]): Collections to index; all declared ones by default.
+
+    Returns:
+        List[str]: Names of the indexes, in declaration order.
+    """
+    names = []
+    selected = None if collections is None else set(collections)
+    for collection_name, specs in INDEXES.items():
+        if selected is not None and collection_name not in selected:
+            continue
+        collection = database.db[collection_name]
+        for spec in specs:
+            options = {"unique": spec.unique}
+            if spec.expire_after_seconds is not None:
+                options["expireAfterSeconds"] = spec.expire_after_seconds
+            try:
+                names.append(await collection.create_index(spec.keys, **options))
+            except OperationFailure as e:
+                if spec.expire_after_seconds is None or e.code != INDEX_OPTIONS_CONFLICT:
+                    raise
+                await database.db.command(
+                    "collMod", collection_name,
+                    index={"keyPattern": dict(spec.keys), "expireAfterSeconds": spec.expire_after_seconds},
+                )
+                names.append("_".join(f"{field}_{direction}" for field, direction in spec.keys))
+    return names
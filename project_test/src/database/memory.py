@@ -0,0 +1,616 @@
+import bisect
+import re
+import time
+from datetime import datetime, timedelta
+from itertools import islice, product
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from src.database.documents import (
+    _MISSING,
+    _RANGE_OPERATORS,
+    _copy,
+    _hashable,
+    _matched_position,
+    _normalize_sort,
+    _set_path,
+    apply_update,
+    get_path,
+    matches,
+    project,
+    run_pipeline,
+    sort_documents,
+    sort_key,
+)
+from src.database.indexes import INDEXES
+
+# Like MongoDB's TTL monitor, expired documents are removed periodically rather than exactly on time
+TTL_MONITOR_SECONDS = 1.0
+
+
+# Indexes ---------------------------------------------------------------------
+
+class MemoryIndex:
+    """
+    Hash plus sorted index over one or more fields.
+
+    The hash map answers equality lookups on all fields; the sorted list
+    answers equality-prefix and range scans in key order. Fields holding
+    arrays are indexed per element, like MongoDB multikey indexes.
+    """
+
+    def __init__(self, name: str, keys: List[Tuple[str, int]], unique: bool = False,
+                 expire_after_seconds: Optional[float] = None):
+        self.name = name
+        self.keys = keys
+        self.fields = tuple(field for field, _ in keys)
+        self.unique = unique
+        # Set on single-field TTL indexes over dates
+        self.expire_after_seconds = expire_after_seconds
+        self._hash: Dict[tuple, set] = {}
+        self._sorted: List[tuple] = []
+        # Set once a document has several keys; scans then return each document once
+        self.multikey = False
+
+    def key_of(self, document: dict) -> tuple:
+        return tuple(get_path(document, field, None) for field in self.fields)
+
+    def keys_of(self, document: dict) -> List[tuple]:
+        """
+        Returns the index keys of a document; a field holding or crossing an array
+        contributes one key per element (a multikey index).
+        """
+        keys = [()]
+        for value in self.key_of(document):
+            values = value if isinstance(value, list) and value else [value]
+            keys = [key + (item,) for key in keys for item in values]
+        unique = {}
+        for key in keys:
+            unique.setdefault(tuple(_hashable(value) for value in key), key)
+        return list(unique.values())
+
+    @staticmethod
+    def _entry(key: tuple, document: dict) -> tuple:
+        return (tuple(sort_key(value) for value in key), sort_key(document["_id"]), document["_id"])
+
+    def check_unique(self, document: dict, ignore_id=_MISSING) -> None:
+        if not self.unique:
+            return
+        for key in self.keys_of(document):
+            existing = self._hash.get(tuple(_hashable(value) for value in key), ())
+            if any(doc_id != ignore_id for doc_id in existing):
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error index: {self.name} dup key: {dict(zip(self.fields, key))}",
+                    11000,
+                )
+
+    def add(self, document: dict) -> None:
+        keys = self.keys_of(document)
+        if len(keys) > 1:
+            self.multikey = True
+        for key in keys:
+            self._hash.setdefault(tuple(_hashable(value) for value in key), set()).add(document["_id"])
+            bisect.insort(self._sorted, self._entry(key, document))
+
+    def remove(self, document: dict) -> None:
+        for key in self.keys_of(document):
+            hashed = tuple(_hashable(value) for value in key)
+            ids = self._hash.get(hashed)
+            if ids is not None:
+                ids.discard(document["_id"])
+                if not ids:
+                    del self._hash[hashed]
+            entry = self._entry(key, document)
+            position = bisect.bisect_left(self._sorted, entry)
+            if position < len(self._sorted) and self._sorted[position] == entry:
+                del self._sorted[position]
+
+    def lookup(self, values: tuple) -> Iterable:
+        return self._hash.get(tuple(_hashable(value) for value in values), ())
+
+    def scan(self, prefix: tuple, bounds: Optional[dict] = None, reverse: bool = False) -> Iterator:
+        """
+        Yields ids whose key starts with `prefix` and whose next field lies within `bounds`.
+        """
+        prefix_keys = tuple(sort_key(value) for value in prefix)
+        depth = len(prefix_keys)
+        bounds = bounds or {}
+
+        low = None
+        for operator in ("$gt", "$gte"):
+            if operator in bounds:
+                low = (operator, sort_key(bounds[operator]))
+        high = None
+        for operator in ("$lt", "$lte"):
+            if operator in bounds:
+                high = (operator, sort_key(bounds[operator]))
+
+        start_key = prefix_keys + ((low[1],) if low else ())
+        start = bisect.bisect_left(self._sorted, (start_key,))
+        matched = []
+        for entry_key, _, doc_id in islice(self._sorted, start, None):
+            if entry_key[:depth] != prefix_keys:
+                break
+            if low or high:
+                value = entry_key[depth]
+                if low and (value < low[1] or (low[0] == "$gt" and value == low[1])):
+                    continue
+                if high and (value > high[1] or (high[0] == "$lt" and value == high[1])):
+                    break
+            matched.append(doc_id)
+        if self.multikey:
+            matched = list({_hashable(doc_id): doc_id for doc_id in matched}.values())
+        return iter(reversed(matched) if reverse else matched)
+
+
+def _plain_equality(condition) -> Tuple[bool, Any]:
+    if isinstance(condition, dict):
+        if set(condition) == {"$eq"}:
+            return True, condition["$eq"]
+        if any(key.startswith("$") for key in condition):
+            return False, None
+    if isinstance(condition, (list, re.Pattern)):
+        return False, None
+    return True, condition
+
+
+def _prefix_values(condition) -> Optional[list]:
+    # Values an index prefix field is looked up with: a plain equality or the members of an $in
+    if isinstance(condition, dict) and set(condition) == {"$in"}:
+        values = condition["$in"]
+        if any(isinstance(value, (dict, list, re.Pattern)) for value in values):
+            return None
+        return list({_hashable(value): value for value in values}.values())
+    is_equality, value = _plain_equality(condition)
+    return [value] if is_equality else None
+
+
+def _range_bounds(condition) -> Optional[dict]:
+    if isinstance(condition, dict) and condition and set(condition) <= set(_RANGE_OPERATORS):
+        return condition
+    return None
+
+
+# Cursors ---------------------------------------------------------------------
+
+class MemoryCursor:
+    """
+    Lazily evaluated cursor mirroring the subset of Motor's cursor API used by the routes.
+    """
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[dict], projection=None):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def max_time_ms(self, _milliseconds: int) -> "MemoryCursor":
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            documents = self._collection._select(self._query, self._sort, self._skip, self._limit)
+            self._results = [project(document, self._projection) for document in documents]
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._evaluate()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        self._iterator = iter(self._evaluate())
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MemoryAggregationCursor(MemoryCursor):
+    """
+    Cursor over precomputed aggregation results.
+    """
+
+    def __init__(self, results: List[dict]):
+        self._results = results
+
+
+# Collections -----------------------------------------------------------------
+
+class MemoryCollection:
+    """
+    In-memory collection implementing the storage operations used by the routes.
+
+    Documents are kept by `_id`; secondary indexes (hash and sorted) are
+    maintained on every write and used by the query planner for equality
+    lookups, prefix scans and range scans; an `$in` on a prefix field runs
+    one lookup or scan per value. Every operation runs to completion
+    without yielding to the event loop, so each one is atomic. Documents
+    past the expiry of a TTL index are removed before queries run, at most
+    once per TTL_MONITOR_SECONDS.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._documents: Dict[Any, dict] = {}
+        self._indexes: Dict[str, MemoryIndex] = {}
+        self._expired_at = 0.0
+
+    # Indexes
+
+    async def create_index(self, keys, unique: bool = False, name: Optional[str] = None,
+                           expireAfterSeconds: Optional[float] = None, **_options) -> str:
+        return self.ensure_index(keys, unique=unique, name=name, expire_after_seconds=expireAfterSeconds)
+
+    def ensure_index(self, keys, unique: bool = False, name: Optional[str] = None,
+                     expire_after_seconds: Optional[float] = None) -> str:
+        keys = _normalize_sort(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        if name in self._indexes:
+            existing = self._indexes[name]
+            if existing.unique != unique or existing.expire_after_seconds != expire_after_seconds:
+                raise OperationFailure(f"Index with name: {name} already exists with different options", 85)
+            return name
+        index = MemoryIndex(name, keys, unique, expire_after_seconds)
+        for document in self._documents.values():
+            index.check_unique(document)
+            index.add(document)
+        self._indexes[name] = index
+        return name
+
+    async def index_information(self) -> dict:
+        info = {"_id_": {"key": [("_id", 1)]}}
+        for name, index in self._indexes.items():
+            info[name] = {"key": list(index.keys), "unique": index.unique}
+            if index.expire_after_seconds is not None:
+                info[name]["expireAfterSeconds"] = index.expire_after_seconds
+        return info
+
+    def modify_index(self, key_pattern: dict, expire_after_seconds: float) -> None:
+        """
+        Changes the expiry of a TTL index, like the `collMod` command.
+        """
+        for index in self._indexes.values():
+            if dict(index.keys) == dict(key_pattern) and index.expire_after_seconds is not None:
+                index.expire_after_seconds = expire_after_seconds
+                self._expired_at = 0.0
+                return
+        raise OperationFailure(f"cannot find index {key_pattern} for ns {self.name}", 27)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        if now - self._expired_at < TTL_MONITOR_SECONDS:
+            return
+        self._expired_at = now
+        for index in list(self._indexes.values()):
+            if index.expire_after_seconds is None:
+                continue
+            cutoff = datetime.utcnow() - timedelta(seconds=index.expire_after_seconds)
+            for doc_id in list(index.scan((), {"$gte": datetime.min, "$lt": cutoff})):
+                document = self._documents.get(_hashable(doc_id))
+                if document is None:
+                    continue
+                for each in self._indexes.values():
+                    each.remove(document)
+                del self._documents[_hashable(doc_id)]
+
+    async def drop_indexes(self) -> None:
+        self._indexes.clear()
+
+    def with_options(self, **_options) -> "MemoryCollection":
+        return self
+
+    # Query planning
+
+    def _candidate_ids(self, query: dict, sort: List[Tuple[str, int]]) -> Iterable:
+        if "_id" in query:
+            is_equality, value = _plain_equality(query["_id"])
+            if is_equality:
+                return [value] if _hashable(value) in self._documents else []
+            condition = query["_id"]
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                return [value for value in condition["$in"] if _hashable(value) in self._documents]
+
+        best = None
+        best_score = (0, 0)
+        for index in self._indexes.values():
+            # Values each prefix field may take: one for an equality, several for an $in
+            prefix = []
+            for field in index.fields:
+                if field not in query:
+                    break
+                values = _prefix_values(query[field])
+                if values is None:
+                    break
+                prefix.append(values)
+
+            bounds = None
+            if len(prefix) < len(index.fields):
+                next_field = index.fields[len(prefix)]
+                bounds = _range_bounds(query.get(next_field))
+
+            score = (len(prefix) + (1 if bounds else 0), 1 if len(prefix) == len(index.fields) else 0)
+            if score > best_score:
+                best, best_score = (index, prefix, bounds), score
+
+        if best is None:
+            return list(self._documents)
+
+        # One lookup or scan per combination of prefix values, merged without duplicates
+        index, prefix, bounds = best
+        combinations = list(product(*prefix))
+        ids = []
+        for values in combinations:
+            if len(values) == len(index.fields):
+                ids.extend(index.lookup(values))
+            else:
+                ids.extend(index.scan(values, bounds))
+        if len(combinations) > 1 or index.multikey:
+            ids = list({_hashable(doc_id): doc_id for doc_id in ids}.values())
+        return ids
+
+    def _select(self, query: dict, sort=None, skip: int = 0, limit: int = 0) -> List[dict]:
+        self._expire()
+        documents = [
+            document
+            for document in (self._documents.get(_hashable(doc_id)) for doc_id in self._candidate_ids(query, sort or []))
+            if document is not None and matches(document, query)
+        ]
+        if sort:
+            sort_documents(documents, sort)
+        if skip:
+            documents = documents[skip:]
+        if limit:
+            documents = documents[:limit]
+        return documents
+
+    # Reads
+
+    def find(self, filter: Optional[dict] = None, projection=None, sort=None, skip: int = 0,
+             limit: int = 0, **_options) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection=None, sort=None, **_options) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        documents = self._select(filter or {}, _normalize_sort(sort), 0, 1)
+        return project(documents[0], projection) if documents else None
+
+    async def count_documents(self, filter: dict, **_options) -> int:
+        return len(self._select(filter))
+
+    async def estimated_document_count(self, **_options) -> int:
+        return len(self._documents)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **_options) -> list:
+        seen = []
+        for document in self._select(filter or {}):
+            value = get_path(document, key)
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not _MISSING and item not in seen:
+                    seen.append(item)
+        return seen
+
+    def aggregate(self, pipeline: List[dict], **_options) -> MemoryAggregationCursor:
+        stages = list(pipeline)
+        if stages and "$match" in stages[0]:
+            # A leading $match goes through the query planner like find()
+            documents = self._select(stages.pop(0)["$match"])
+        else:
+            self._expire()
+            documents = list(self._documents.values())
+        return MemoryAggregationCursor(run_pipeline([_copy(doc) for doc in documents], stages))
+
+    # Writes
+
+    def _insert(self, document: dict) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        key = _hashable(document["_id"])
+        if key in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {document['_id']}", 11000)
+        stored = _copy(document)
+        for index in self._indexes.values():
+            index.check_unique(stored)
+        for index in self._indexes.values():
+            index.add(stored)
+        self._documents[key] = stored
+        return document["_id"]
+
+    async def insert_one(self, document: dict, **_options) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **_options) -> InsertManyResult:
+        inserted = []
+        for document in documents:
+            inserted.append(self._insert(document))
+        return InsertManyResult(inserted, True)
+
+    def _replace_stored(self, old: dict, new: dict) -> None:
+        for index in self._indexes.values():
+            index.check_unique(new, ignore_id=old["_id"])
+        for index in self._indexes.values():
+            index.remove(old)
+        for index in self._indexes.values():
+            index.add(new)
+        self._documents[_hashable(old["_id"])] = new
+
+    def _upsert_document(self, filter: dict, update: dict) -> dict:
+        document = {}
+        for field, condition in filter.items():
+            if field.startswith("$"):
+                continue
+            is_equality, value = _plain_equality(condition)
+            if is_equality:
+                _set_path(document, field, _copy(value))
+        apply_update(document, update, inserting=True)
+        return document
+
+    def _update(self, filter: dict, update: dict, many: bool, upsert: bool, sort=None) -> Tuple[int, int, Any]:
+        targets = self._select(filter, _normalize_sort(sort), 0, 0 if many else 1)
+        modified = 0
+        for document in targets:
+            updated = _copy(document)
+            apply_update(updated, update, position=_matched_position(document, filter))
+            if updated != document:
+                self._replace_stored(document, updated)
+                modified += 1
+        if targets or not upsert:
+            return len(targets), modified, None
+        return 0, 0, self._insert(self._upsert_document(filter, update))
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **_options) -> UpdateResult:
+        matched, modified, upserted_id = self._update(filter, update, False, upsert)
+        raw = {"n": matched or (1 if upserted_id is not None else 0), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **_options) -> UpdateResult:
+        matched, modified, upserted_id = self._update(filter, update, True, upsert)
+        raw = {"n": matched or (1 if upserted_id is not None else 0), "nModified": modified}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **_options) -> UpdateResult:
+        targets = self._select(filter, None, 0, 1)
+        if targets:
+            new = _copy(replacement)
+            new["_id"] = targets[0]["_id"]
+            self._replace_stored(targets[0], new)
+            return UpdateResult({"n": 1, "nModified": 1}, True)
+        if upsert:
+            upserted_id = self._insert(_copy(replacement))
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": upserted_id}, True)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection=None, sort=None,
+                                  upsert: bool = False, return_document=ReturnDocument.BEFORE,
+                                  **_options) -> Optional[dict]:
+        targets = self._select(filter, _normalize_sort(sort), 0, 1)
+        if targets:
+            before = targets[0]
+            after = _copy(before)
+            apply_update(after, update)
+            if after != before:
+                self._replace_stored(before, after)
+            result = after if return_document == ReturnDocument.AFTER else before
+            return project(result, projection)
+        if upsert:
+            document = self._upsert_document(filter, update)
+            self._insert(document)
+            return project(document, projection) if return_document == ReturnDocument.AFTER else None
+        return None
+
+    def _delete(self, filter: dict, many: bool) -> int:
+        targets = self._select(filter, None, 0, 0 if many else 1)
+        for document in targets:
+            for index in self._indexes.values():
+                index.remove(document)
+            del self._documents[_hashable(document["_id"])]
+        return len(targets)
+
+    async def delete_one(self, filter: dict, **_options) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, False)}, True)
+
+    async def delete_many(self, filter: dict, **_options) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, True)}, True)
+
+    async def find_one_and_delete(self, filter: dict, projection=None, sort=None, **_options) -> Optional[dict]:
+        targets = self._select(filter, _normalize_sort(sort), 0, 1)
+        if not targets:
+            return None
+        await self.delete_one({"_id": targets[0]["_id"]})
+        return project(targets[0], projection)
+
+    async def drop(self) -> None:
+        self._documents.clear()
+        for index in self._indexes.values():
+            index._hash.clear()
+            index._sorted.clear()
+
+
+# Client ----------------------------------------------------------------------
+
+class MemoryDatabase:
+    """
+    Named group of in-memory collections created on first access with the declared indexes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(name)
+            for spec in INDEXES.get(name, ()):
+                collection.ensure_index(spec.keys, unique=spec.unique, expire_after_seconds=spec.expire_after_seconds)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command, value=None, **kwargs) -> dict:
+        if command == "collMod" and "index" in kwargs:
+            index = kwargs["index"]
+            self[value].modify_index(index["keyPattern"], index["expireAfterSeconds"])
+        return {"ok": 1.0}
+
+
+class MemoryClient:
+    """
+    Stand-in for AsyncIOMotorClient holding every database in process memory.
+    """
+
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = MemoryDatabase("admin")
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(name)
+        return database
+
+    def get_database(self, name: str, **_options) -> MemoryDatabase:
+        return self[name]
+
+    def close(self) -> None:
+        # Data lives as long as the process; closing a handle keeps it available
+        return None
+
+
+# Process-wide in-memory deployment shared by every Database handle
+memory_client = MemoryClient()
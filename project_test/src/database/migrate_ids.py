@@ -0,0 +1,170 @@
+"""
+Online migration of string references to native ObjectIds.
+
+Converts the fields listed in `src.utils.ids.OBJECT_ID_FIELDS` in batches
+while the application keeps serving traffic. Progress is checkpointed in the
+`migrations` collection after every batch, so an interrupted run resumes
+where it stopped; running it again after completion only re-checks.
+
+Documents whose `_id` is a string (older comments) cannot be updated in
+place: a converted copy is inserted, then the original is deleted. Readers
+use dual reads (`[ids] DUAL_READ=true`) during the migration; once it has
+completed, set `DUAL_READ=false`.
+
+Usage (from the project_test directory):
+
+    python -m src.database.migrate_ids --dry-run
+    python -m src.database.migrate_ids --batch-size 500 --pause 0.1
+    python -m src.database.migrate_ids --restart
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from src.database.connect import Database, close_databases, connect_to_database_mongo, get_mongo_url
+from src.utils.ids import OBJECT_ID_FIELDS, normalize_references
+
+MIGRATION_ID = "object_id_refs"
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    """
+    Batched, checkpointed conversion of string references.
+
+    Each collection goes through two phases, each walking one `_id` range in
+    ascending order: "rekey" re-inserts documents with a string `_id` under
+    an ObjectId, and "convert" updates the other reference fields in place.
+    Range queries never match across BSON types, so each phase only sees the
+    `_id` type it handles.
+    """
+
+    def __init__(self, database: Database, batch_size: int, pause: float, dry_run: bool):
+        self.database = database
+        self.batch_size = batch_size
+        self.pause = pause
+        self.dry_run = dry_run
+        self.migrations = database.db["migrations"]
+        self.progress: Dict[str, dict] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    async def load_progress(self, restart: bool) -> None:
+        if restart and not self.dry_run:
+            await self.migrations.delete_one({"_id": MIGRATION_ID})
+        state = None if restart else await self.migrations.find_one({"_id": MIGRATION_ID})
+        self.progress = (state or {}).get("progress", {})
+
+    async def _checkpoint(self, collection: str, phase: str, last_id) -> None:
+        self.progress.setdefault(collection, {})[phase] = last_id
+        if not self.dry_run:
+            await self.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {f"progress.{collection}.{phase}": last_id}},
+                upsert=True,
+            )
+
+    def _count(self, collection: str, outcome: str, amount: int = 1) -> None:
+        counts = self.counts.setdefault(collection, {"scanned": 0, "converted": 0, "duplicates": 0, "skipped": 0})
+        counts[outcome] += amount
+
+    async def _batches(self, collection: str, phase: str, start):
+        """
+        Yields batches of documents with an `_id` greater than the checkpoint, in `_id` order.
+        """
+        last_id = self.progress.get(collection, {}).get(phase, start)
+        while True:
+            batch = await self.database.db[collection].find(
+                {"_id": {"$gt": last_id}}
+            ).sort("_id", 1).limit(self.batch_size).to_list(length=None)
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]["_id"]
+            await self._checkpoint(collection, phase, last_id)
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+    async def _rekey(self, collection: str, document: dict, changes: dict) -> None:
+        target = self.database.db[collection]
+        try:
+            await target.insert_one({**document, **changes})
+            self._count(collection, "converted")
+        except DuplicateKeyError:
+            # Inserted by an interrupted run, or another unique key already holds the converted form
+            self._count(collection, "duplicates")
+        await target.delete_one({"_id": document["_id"]})
+
+    async def _convert(self, collection: str, document: dict, changes: dict) -> None:
+        target = self.database.db[collection]
+        # Only documents still holding the string values are changed, so concurrent writes win
+        original = {field: document[field] for field in changes}
+        try:
+            result = await target.update_one({"_id": document["_id"], **original}, {"$set": changes})
+            self._count(collection, "converted" if result.modified_count else "skipped")
+        except DuplicateKeyError:
+            # The converted document would duplicate one written with ObjectIds (e.g. a follow)
+            await target.delete_one({"_id": document["_id"], **original})
+            self._count(collection, "duplicates")
+
+    async def run_phase(self, collection: str, phase: str) -> None:
+        # "" and ObjectId("0" * 24) are the smallest string and ObjectId values
+        start = "" if phase == "rekey" else ObjectId("0" * 24)
+        async for batch in self._batches(collection, phase, start):
+            self._count(collection, "scanned", len(batch))
+            for document in batch:
+                changes = normalize_references(collection, document)
+                if not changes:
+                    continue
+                if self.dry_run:
+                    self._count(collection, "converted")
+                elif phase == "rekey":
+                    await self._rekey(collection, document, changes)
+                else:
+                    await self._convert(collection, document, changes)
+            logger.info(f"{collection}/{phase}: {self.counts[collection]}")
+
+    async def run(self) -> Dict[str, Dict[str, int]]:
+        for collection, fields in OBJECT_ID_FIELDS.items():
+            if "_id" in fields:
+                await self.run_phase(collection, "rekey")
+            await self.run_phase(collection, "convert")
+        return self.counts
+
+
+async def migrate(batch_size: int, pause: float, dry_run: bool, restart: bool) -> Dict[str, Dict[str, int]]:
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    try:
+        migration = Migration(database, batch_size, pause, dry_run)
+        await migration.load_progress(restart)
+        return await migration.run()
+    finally:
+        await close_databases()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert string references to ObjectId")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents read per batch")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents to convert without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    logging.basicConfig(level=logging.INFO)
+    counts = asyncio.run(migrate(args.batch_size, args.pause, args.dry_run, args.restart))
+    print(json.dumps(counts, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+One-shot migration giving comments stored before threading a thread path.
+
+Such comments become top-level comments: their path is their own ID. The
+update goes through the comment store, so it covers the configured layout on
+every partition: flat comments are updated on the server in one pipeline
+`update_many`, and bucketed ones with one update per bucket holding such
+comments. Comments that already have a path are left alone, so running it
+again is harmless.
+
+Usage (from the project_test directory):
+
+    python -m src.database.migrate_paths --dry-run
+    python -m src.database.migrate_paths
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from typing import List, Optional
+
+from src.database.comment_store import comment_store
+from src.database.connect import close_databases, connect_to_database_mongo, get_mongo_url
+
+logger = logging.getLogger(__name__)
+
+
+async def count_missing_paths(database) -> int:
+    """
+    Counts the comments without a thread path on every partition.
+
+    Args:
+        database (Database): Connected handle of the main database.
+
+    Returns:
+        int: Number of comments without a path.
+    """
+    rows = await comment_store(database).aggregate([
+        {"$match": {"path": {"$exists": False}}},
+        {"$group": {"_id": None, "count": {"$sum": 1}}},
+    ]).to_list(length=None)
+    return rows[0]["count"] if rows else 0
+
+
+async def backfill_comment_paths(database) -> int:
+    """
+    Turns comments stored before threading was introduced into top-level comments.
+
+    Runs on every partition of the configured comment layout. Idempotent:
+    comments that already have a path are not matched.
+
+    Args:
+        database (Database): Connected handle of the main database.
+
+    Returns:
+        int: Number of updated comments.
+    """
+    backfilled = await comment_store(database).backfill_paths()
+    if backfilled:
+        logger.info(f"Backfilled thread paths of {backfilled} comments")
+    return backfilled
+
+
+async def migrate(dry_run: bool) -> dict:
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    try:
+        if dry_run:
+            return {"comments": await count_missing_paths(database)}
+        return {"backfilled": await backfill_comment_paths(database)}
+    finally:
+        await close_databases()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Give comments stored before threading a thread path")
+    parser.add_argument("--dry-run", action="store_true", help="Count comments without a path without writing")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(migrate(args.dry_run)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Horizontal partitioning of comments.
+
+With `[comment_partitions] COUNT` above 0, the comments of each post are
+stored in one of COUNT databases, chosen by a jump consistent hash of the
+post ID; posts and every other collection stay in the main database.
+Partition `i` is the database `DB_PREFIX + i` of the deployment
+`URLS[i % len(URLS)]`, or of the main deployment if URLS is empty.
+
+The jump hash moves only the posts that must move when COUNT changes
+(about 1/(N+1) of them when going from N to N+1 partitions). To change
+COUNT, stop writers, move the comments, then deploy the new COUNT (from
+the project_test directory):
+
+    python -m src.database.comment_store --rebalance-from 2 --partitions 3
+"""
+import hashlib
+from typing import List, Optional
+
+from src.database.connect import Database, pooled_database
+from src.database.indexes import ensure_indexes
+from src.utils.settings import get_settings
+
+# Collections held by each partition
+PARTITIONED_COLLECTIONS = ("comments", "comment_buckets")
+DEFAULT_DB_PREFIX = "comments_"
+
+
+def comment_partition_count() -> int:
+    """
+    Returns the configured number of comment partitions; 0 keeps comments in the main database.
+    """
+    return get_settings().getint("comment_partitions", "count", fallback=0)
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Maps a 64-bit key to one of `buckets` buckets (Lamping and Veach's jump consistent hash).
+
+    Args:
+        key (int): Unsigned 64-bit key.
+        buckets (int): Number of buckets, at least 1.
+
+    Returns:
+        int: Bucket in `[0, buckets)`.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def partition_of(post_id, count: int) -> int:
+    """
+    Returns the partition holding the comments of a post.
+
+    Args:
+        post_id: Post ID, as an ObjectId or its string form (both map to the same partition).
+        count (int): Number of partitions.
+
+    Returns:
+        int: Partition index.
+    """
+    if count <= 1:
+        return 0
+    digest = hashlib.md5(str(post_id).encode("utf-8")).digest()
+    return jump_hash(int.from_bytes(digest[:8], "big"), count)
+
+
+def partition_databases(database: Database, count: Optional[int] = None) -> List[Database]:
+    """
+    Returns the handles of the comment partitions, with the profile of `database`.
+
+    Args:
+        database (Database): Handle of the main database.
+        count (Optional[int]): Number of partitions; defaults to the configured one.
+            With 0, the only partition is the main database.
+
+    Returns:
+        List[Database]: One handle per partition, in partition order.
+    """
+    count = comment_partition_count() if count is None else count
+    if count <= 0:
+        return [database]
+    settings = get_settings()
+    prefix = settings.get("comment_partitions", "db_prefix", fallback=DEFAULT_DB_PREFIX).strip()
+    urls = [url.strip() for url in settings.get("comment_partitions", "urls", fallback="").split(",") if url.strip()]
+
+    handles = []
+    for index in range(count):
+        url = urls[index % len(urls)] if urls else database.url
+        deployment = database
+        if url != database.url:
+            deployment = pooled_database(url)
+            if database.profile:
+                deployment = deployment.with_profile(database.profile.name)
+        handles.append(deployment.named(f"{prefix}{index}"))
+    return handles
+
+
+async def ensure_partition_indexes(database: Database) -> List[str]:
+    """
+    Creates the comment indexes in every configured partition.
+
+    Args:
+        database (Database): Handle of the main database.
+
+    Returns:
+        List[str]: Names of the indexes, per partition in order.
+    """
+    if comment_partition_count() <= 0:
+        return []
+    names = []
+    for partition in partition_databases(database):
+        names.extend(await ensure_indexes(partition, PARTITIONED_COLLECTIONS))
+    return names
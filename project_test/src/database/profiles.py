@@ -0,0 +1,226 @@
+"""
+Named database profiles.
+
+A profile sets the read preference, read concern, write concern and
+server-side time limit (`maxTimeMS`) of the operations made through it.
+Profiles are the `[db_profile:<name>]` sections of settings.ini and are
+chosen per route or job with `connect_to_database_mongo(url, profile=...)`;
+operations made without a profile keep the defaults of the connection URL.
+
+To check the profiles against a deployment, e.g. a local single-node
+replica set (from the project_test directory):
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+    # settings.ini: [mongo] URL=mongodb://localhost:27017/?replicaSet=rs0
+    python -m src.database.profiles
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from src.utils.settings import get_settings
+
+INTERACTIVE_WRITE = "interactive-write"
+BACKGROUND_WRITE = "background-write"
+ANALYTICS_READ = "analytics-read"
+FRESH_READ = "fresh-read"
+SECTION_PREFIX = "db_profile:"
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primarypreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondarypreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+READ_CONCERNS = ("local", "available", "majority", "linearizable", "snapshot")
+
+
+class DatabaseProfile(NamedTuple):
+    """
+    Options applied to the operations of one profile; None keeps the connection default.
+
+    Attributes:
+        name (str): Profile name.
+        read_preference (Optional[str]): Read preference mode, e.g. `secondaryPreferred`.
+        read_concern (Optional[str]): Read concern level, e.g. `majority`.
+        write_concern (Optional[Union[int, str]]): `w` of the write concern, e.g. 1 or `majority`.
+        journal (Optional[bool]): Whether writes wait for the journal.
+        wtimeout_ms (Optional[int]): Time to wait for the write concern.
+        max_time_ms (Optional[int]): Server-side time limit of reads.
+    """
+
+    name: str
+    read_preference: Optional[str] = None
+    read_concern: Optional[str] = None
+    write_concern: Optional[Union[int, str]] = None
+    journal: Optional[bool] = None
+    wtimeout_ms: Optional[int] = None
+    max_time_ms: Optional[int] = None
+
+    def options(self) -> dict:
+        """
+        Returns the options of the profile as keyword arguments of `get_database`.
+        """
+        options = {}
+        if self.read_preference:
+            options["read_preference"] = READ_PREFERENCES[self.read_preference.lower()]
+        if self.read_concern:
+            options["read_concern"] = ReadConcern(self.read_concern)
+        if self.write_concern is not None or self.journal is not None or self.wtimeout_ms:
+            options["write_concern"] = WriteConcern(w=self.write_concern, j=self.journal, wtimeout=self.wtimeout_ms)
+        return options
+
+
+def _optional(section, key: str) -> Optional[str]:
+    value = section.get(key, fallback="").strip()
+    return value or None
+
+
+def database_profile(name: str) -> DatabaseProfile:
+    """
+    Reads a profile from its `[db_profile:<name>]` section of settings.ini.
+
+    Args:
+        name (str): Profile name.
+
+    Returns:
+        DatabaseProfile: The profile.
+
+    Raises:
+        ValueError: If the profile is not defined or holds an invalid value.
+    """
+    settings = get_settings()
+    if not settings.has_section(SECTION_PREFIX + name):
+        raise ValueError(f"Unknown database profile '{name}'")
+    section = settings[SECTION_PREFIX + name]
+
+    read_preference = _optional(section, "read_preference")
+    if read_preference and read_preference.lower() not in READ_PREFERENCES:
+        raise ValueError(f"Database profile '{name}': unknown read preference '{read_preference}'")
+    read_concern = _optional(section, "read_concern")
+    if read_concern and read_concern not in READ_CONCERNS:
+        raise ValueError(f"Database profile '{name}': unknown read concern '{read_concern}'")
+    write_concern = _optional(section, "write_concern")
+    if write_concern is not None and write_concern.isdigit():
+        write_concern = int(write_concern)
+    journal = _optional(section, "journal")
+
+    try:
+        profile = DatabaseProfile(
+            name=name,
+            read_preference=read_preference,
+            read_concern=read_concern,
+            write_concern=write_concern,
+            journal=None if journal is None else section.getboolean("journal"),
+            wtimeout_ms=section.getint("wtimeout_ms", fallback=0) or None,
+            max_time_ms=section.getint("max_time_ms", fallback=0) or None,
+        )
+        profile.options()
+    except ValueError as e:
+        raise ValueError(f"Database profile '{name}': {e}")
+    return profile
+
+
+def database_profiles() -> List[DatabaseProfile]:
+    """
+    Reads and validates every profile defined in settings.ini.
+
+    Raises:
+        ValueError: If a profile holds an invalid value.
+    """
+    return [
+        database_profile(section[len(SECTION_PREFIX):])
+        for section in get_settings().sections()
+        if section.startswith(SECTION_PREFIX)
+    ]
+
+
+class TimeLimitedCollection:
+    """
+    Collection whose reads carry the `maxTimeMS` of a profile; other operations pass through.
+
+    Attributes:
+        max_time_ms (int): Server-side time limit of each read.
+    """
+
+    def __init__(self, collection, max_time_ms: int):
+        self._collection = collection
+        self.max_time_ms = max_time_ms
+
+    def __getattr__(self, name: str):
+        return getattr(self._collection, name)
+
+    def find(self, *args, **kwargs):
+        return self._collection.find(*args, **kwargs).max_time_ms(self.max_time_ms)
+
+    async def find_one(self, filter: Optional[dict] = None, *args, **kwargs) -> Optional[dict]:
+        kwargs.setdefault("max_time_ms", self.max_time_ms)
+        return await self._collection.find_one(filter, *args, **kwargs)
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        kwargs.setdefault("maxTimeMS", self.max_time_ms)
+        return await self._collection.count_documents(filter, **kwargs)
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        kwargs.setdefault("maxTimeMS", self.max_time_ms)
+        return self._collection.aggregate(pipeline, **kwargs)
+
+
+async def probe_profiles() -> Dict[str, dict]:
+    """
+    Runs a read, and a write and delete in the `profile_probe` collection, through every profile.
+
+    Returns:
+        Dict[str, dict]: Effective options and round-trip times per profile.
+    """
+    from src.database.connect import close_databases, connect_to_database_mongo, get_mongo_url
+
+    url = await get_mongo_url()
+    report = {}
+    try:
+        for profile in database_profiles():
+            database = await connect_to_database_mongo(url, profile=profile.name)
+            if not database:
+                raise RuntimeError("Failed to connect to the database")
+            collection = database.db["profile_probe"]
+            start = time.perf_counter()
+            result = await collection.insert_one({"profile": profile.name})
+            write_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            await database.posts_collection.find_one({}, {"_id": 1})
+            read_ms = (time.perf_counter() - start) * 1000
+            await collection.delete_one({"_id": result.inserted_id})
+            report[profile.name] = {
+                **{key: value for key, value in profile._asdict().items() if key != "name"},
+                "write_ms": round(write_ms, 3),
+                "read_ms": round(read_ms, 3),
+            }
+    finally:
+        await close_databases()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the database profiles against the configured deployment")
+    parser.add_argument("--validate-only", action="store_true", help="Only read and validate the profiles")
+    args = parser.parse_args(argv)
+
+    if args.validate_only:
+        profiles = {profile.name: profile._asdict() for profile in database_profiles()}
+    else:
+        profiles = asyncio.run(probe_profiles())
+    print(json.dumps(profiles, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+from typing import Any, List, Optional, Protocol
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.monitoring.mongo import command_timing_listener
+from src.monitoring.query_accounting import query_accounting_listener
+from src.utils.settings import get_settings
+
+MONGO_BACKEND = "mongo"
+MEMORY_BACKEND = "memory"
+BACKENDS = (MONGO_BACKEND, MEMORY_BACKEND)
+
+
+class StorageCursor(Protocol):
+    """
+    Cursor returned by `find` and `aggregate`.
+    """
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "StorageCursor": ...
+
+    def skip(self, count: int) -> "StorageCursor": ...
+
+    def limit(self, count: int) -> "StorageCursor": ...
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]: ...
+
+    def __aiter__(self): ...
+
+
+class StorageCollection(Protocol):
+    """
+    Collection operations used by the routes, journals and analytics.
+
+    Both Motor collections and `src.database.memory.MemoryCollection` satisfy it.
+    """
+
+    def find(self, filter: Optional[dict] = None, projection=None, **kwargs) -> StorageCursor: ...
+
+    async def find_one(self, filter: Optional[dict] = None, projection=None, **kwargs) -> Optional[dict]: ...
+
+    async def count_documents(self, filter: dict, **kwargs) -> int: ...
+
+    async def insert_one(self, document: dict, **kwargs) -> Any: ...
+
+    async def insert_many(self, documents, **kwargs) -> Any: ...
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> Any: ...
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> Any: ...
+
+    async def find_one_and_update(self, filter: dict, update: dict, **kwargs) -> Optional[dict]: ...
+
+    async def delete_one(self, filter: dict, **kwargs) -> Any: ...
+
+    async def delete_many(self, filter: dict, **kwargs) -> Any: ...
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> StorageCursor: ...
+
+    async def create_index(self, keys, **kwargs) -> str: ...
+
+
+class StorageClient(Protocol):
+    """
+    Entry point of a storage backend: databases by name plus an admin handle for pings.
+    """
+
+    admin: Any
+
+    def __getitem__(self, name: str) -> Any: ...
+
+    def close(self) -> None: ...
+
+
+def storage_backend() -> str:
+    """
+    Returns the configured storage backend (`[storage] BACKEND` in settings.ini).
+
+    Returns:
+        str: `mongo` (default) or `memory`.
+
+    Raises:
+        ValueError: If the configured backend is unknown.
+    """
+    backend = get_settings().get("storage", "backend", fallback=MONGO_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def create_client(url: str, backend: Optional[str] = None) -> StorageClient:
+    """
+    Creates a client for the given storage backend.
+
+    The Motor client gets the monitoring listeners attached; the in-memory
+    backend returns the process-wide deployment so every handle sees the same data.
+
+    Args:
+        url (str): MongoDB connection URL (ignored by the in-memory backend).
+        backend (Optional[str]): Backend name; defaults to the configured one.
+
+    Returns:
+        StorageClient: Backend client.
+    """
+    backend = backend or storage_backend()
+    if backend == MEMORY_BACKEND:
+        from src.database.memory import memory_client
+
+        return memory_client
+    return AsyncIOMotorClient(url, event_listeners=[command_timing_listener, query_accounting_listener])
@@ -53,6 +53,7 @@ async def get_user_logs(
                 state_before=log["state_before"],
                 state_after=log["state_after"],
                 timestamp=str(log["timestamp"]),
+                changes=log.get("changes", 1),
             )
         )
 
@@ -69,6 +70,7 @@ async def get_user_logs(
                 state_before=log.get("state_before"),
                 state_after=log.get("state_after"),
                 timestamp=str(log["timestamp"]),
+                changes=log.get("changes", 1),
             )
         )
 
@@ -85,6 +87,7 @@ async def get_user_logs(
                 state_before=log.get("state_before"),
                 state_after=log.get("state_after"),
                 timestamp=str(log["timestamp"]),
+                changes=log.get("changes", 1),
             )
         )
 
@@ -40,6 +40,7 @@ async def get_password_logs(user_id: str):
                     "state_before": log.get("state_before"),
                     "state_after": log.get("state_after"),
                     "timestamp": str(log["timestamp"]),
+                    "changes": log.get("changes", 1),
                 }
             )
 
@@ -52,6 +52,7 @@ async def get_username_logs(
                 "state_before": log["state_before"],
                 "state_after": log["state_after"],
                 "timestamp": str(log["timestamp"]),
+                "changes": log.get("changes", 1),
             }
         )
 
@@ -0,0 +1,279 @@
+"""
+Retention and compaction of the user-change journals.
+
+Entries older than `[journal] COMPACT_AFTER_DAYS` are collapsed into one
+summary document per user and journal, so reading or deleting a user's
+history touches a bounded number of documents. A summary keeps the number
+of changes it stands for, the value before the first and after the last
+one, and the dates of both. Entries (summaries included) are then removed
+by the TTL index on `created_at` once they are older than the retention
+configured for their journal.
+
+Only one process compacts at a time (a lease in the `locks` collection);
+a run interrupted between updating a summary and deleting its entries is
+completed by the next one without counting those entries twice.
+
+Usage (from the project_test directory):
+
+    python -m src.journal.retention
+    python -m src.journal.retention --backfill-only
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.database.connect import Database, close_databases, connect_to_database_mongo, get_mongo_url
+from src.database.profiles import BACKGROUND_WRITE
+from src.utils.settings import get_settings
+
+# Journaled field to collection name
+JOURNALS = {
+    "username": "journal_username",
+    "email": "journal_email",
+    "password": "journal_password",
+}
+LOCK_ID = "journal_compaction"
+# Entries read per compaction batch
+COMPACT_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_created_at(database: Database, collection_name: str) -> int:
+    """
+    Sets `created_at` on entries written before it existed, from their Unix `timestamp`.
+
+    Entries without a `created_at` date are never expired by the TTL index.
+    Idempotent; concurrent runs write the same values.
+
+    Args:
+        database (Database): Connected database handle.
+        collection_name (str): Journal collection.
+
+    Returns:
+        int: Number of updated entries.
+    """
+    collection = database.db[collection_name]
+    legacy = await collection.find(
+        {"created_at": {"$exists": False}}, {"_id": 1, "timestamp": 1}
+    ).to_list(length=None)
+    for entry in legacy:
+        try:
+            created_at = datetime.utcfromtimestamp(int(entry["timestamp"]))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            created_at = datetime.utcnow()
+        await collection.update_one(
+            {"_id": entry["_id"], "created_at": {"$exists": False}},
+            {"$set": {"created_at": created_at}},
+        )
+    if legacy:
+        logger.info(f"Backfilled created_at of {len(legacy)} {collection_name} entries")
+    return len(legacy)
+
+
+def _compacted_by(summary: Optional[dict], entry: dict) -> bool:
+    # Entries up to the summary's watermark were counted by an earlier, interrupted run
+    if not summary or "last_id" not in summary:
+        return False
+    return (entry["created_at"], entry["_id"]) <= (summary["created_at"], summary["last_id"])
+
+
+async def _compact_user(collection, field: str, user, entries: List[dict]) -> int:
+    summary = await collection.find_one({"user": user, "summary": True})
+    fresh = [entry for entry in entries if not _compacted_by(summary, entry)]
+    if fresh:
+        first, last = fresh[0], fresh[-1]
+        await collection.update_one(
+            {"user": user, "summary": True},
+            {
+                "$inc": {"changes": sum(entry.get("changes", 1) for entry in fresh)},
+                "$setOnInsert": {
+                    "field": field,
+                    "state_before": first.get("state_before"),
+                    "first_at": first["created_at"],
+                },
+                "$set": {
+                    "state_after": last.get("state_after"),
+                    "timestamp": last.get("timestamp"),
+                    "created_at": last["created_at"],
+                    "last_id": last["_id"],
+                },
+            },
+            upsert=True,
+        )
+    await collection.delete_many({"_id": {"$in": [entry["_id"] for entry in entries]}})
+    return len(fresh)
+
+
+async def compact_journal(database: Database, field: str, cutoff: datetime,
+                          batch_size: int = COMPACT_BATCH_SIZE) -> int:
+    """
+    Collapses the entries of one journal older than `cutoff` into per-user summaries.
+
+    Args:
+        database (Database): Connected database handle.
+        field (str): Journaled field, a key of JOURNALS.
+        cutoff (datetime): Entries created before this date are compacted.
+        batch_size (int): Entries read per batch.
+
+    Returns:
+        int: Number of compacted entries.
+    """
+    collection = database.db[JOURNALS[field]]
+    compacted = 0
+    while True:
+        # Compacted entries are deleted, so every batch starts from the oldest remaining one
+        batch = await collection.find(
+            {"created_at": {"$lt": cutoff}, "summary": {"$ne": True}}
+        ).sort([("created_at", 1), ("_id", 1)]).limit(batch_size).to_list(length=None)
+        if not batch:
+            return compacted
+        batch.sort(key=lambda entry: (str(entry["user"]), entry["created_at"], entry["_id"]))
+        for _, entries in groupby(batch, key=lambda entry: str(entry["user"])):
+            entries = list(entries)
+            compacted += await _compact_user(collection, field, entries[0]["user"], entries)
+        if len(batch) < batch_size:
+            return compacted
+
+
+async def acquire_lease(database: Database, owner: str, seconds: float) -> bool:
+    """
+    Takes the compaction lease unless another live process holds it.
+
+    Args:
+        database (Database): Connected database handle.
+        owner (str): Identifier of this process.
+        seconds (float): Lease duration; a crashed holder loses it after this long.
+
+    Returns:
+        bool: Whether the lease was acquired.
+    """
+    now = datetime.utcnow()
+    try:
+        await database.db["locks"].find_one_and_update(
+            {"_id": LOCK_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # The lock exists and is held by someone else, so the upsert collided on _id
+        return False
+    return True
+
+
+async def release_lease(database: Database, owner: str) -> None:
+    await database.db["locks"].delete_one({"_id": LOCK_ID, "owner": owner})
+
+
+def compact_after_days() -> float:
+    """
+    Returns the age from which entries are compacted (`[journal] COMPACT_AFTER_DAYS` in settings.ini).
+
+    Raises:
+        ValueError: If it is not positive; a cutoff of now would compact every entry.
+    """
+    days = get_settings().getfloat("journal", "compact_after_days", fallback=30)
+    if days <= 0:
+        raise ValueError(f"[journal] COMPACT_AFTER_DAYS must be positive, got {days:g}")
+    return days
+
+
+async def compact_journals(database: Database, older_than_days: Optional[float] = None,
+                           lease_seconds: float = 3600) -> Optional[Dict[str, dict]]:
+    """
+    Backfills `created_at` and compacts every journal, holding the compaction lease.
+
+    Args:
+        database (Database): Connected database handle.
+        older_than_days (Optional[float]): Age from which entries are compacted;
+            defaults to `[journal] COMPACT_AFTER_DAYS`. 0 compacts every entry.
+        lease_seconds (float): Duration of the compaction lease.
+
+    Returns:
+        Optional[Dict[str, dict]]: Backfilled and compacted entries per journal,
+            or None if another process is compacting.
+
+    Raises:
+        ValueError: If `older_than_days` is omitted and the setting is not positive.
+    """
+    if older_than_days is None:
+        older_than_days = compact_after_days()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if not await acquire_lease(database, owner, lease_seconds):
+        logger.info("Journal compaction skipped: another process holds the lease")
+        return None
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        counts = {}
+        for field, collection_name in JOURNALS.items():
+            counts[collection_name] = {
+                "backfilled": await backfill_created_at(database, collection_name),
+                "compacted": await compact_journal(database, field, cutoff),
+            }
+        logger.info(f"Journal compaction finished: {counts}")
+        return counts
+    finally:
+        await release_lease(database, owner)
+
+
+async def run_journal_compaction(interval_seconds: float) -> None:
+    """
+    Compacts the journals periodically.
+
+    Args:
+        interval_seconds (float): Interval between runs.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            database = await connect_to_database_mongo(await get_mongo_url(), profile=BACKGROUND_WRITE)
+            if not database:
+                continue
+            await compact_journals(database)
+        except Exception as e:
+            logger.error(f"Journal compaction failed: {str(e)}")
+
+
+async def compact(older_than_days: Optional[float], backfill_only: bool) -> Optional[Dict[str, dict]]:
+    database = await connect_to_database_mongo(await get_mongo_url(), profile=BACKGROUND_WRITE)
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    try:
+        if backfill_only:
+            return {name: {"backfilled": await backfill_created_at(database, name)} for name in JOURNALS.values()}
+        return await compact_journals(database, older_than_days)
+    finally:
+        await close_databases()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact the user-change journals")
+    parser.add_argument("--older-than-days", type=float, default=None,
+                        help="Compact entries older than this (default: [journal] COMPACT_AFTER_DAYS)")
+    parser.add_argument("--backfill-only", action="store_true", help="Only set created_at on older entries")
+    args = parser.parse_args(argv)
+    if args.older_than_days is not None and args.older_than_days < 0:
+        parser.error("--older-than-days must not be negative")
+
+    logging.basicConfig(level=logging.INFO)
+    counts = asyncio.run(compact(args.older_than_days, args.backfill_only))
+    if counts is None:
+        print("Another process is compacting the journals", file=sys.stderr)
+        return 1
+    print(json.dumps(counts, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Production entry point for the posts & comments API.
+
+Reads the `[server]` section of settings.ini (overridable from the command
+line) and starts uvicorn with the requested number of worker processes,
+listen backlog, keep-alive and event loop / HTTP parser implementations.
+
+Every worker imports `main:app` on its own, so database pools, caches,
+warmup and background tasks are per process. On SIGTERM uvicorn stops
+accepting connections and the application ends its comment streams; uvicorn
+gives in-flight requests GRACEFUL_TIMEOUT seconds, then the application
+waits up to BACKGROUND_DRAIN_TIMEOUT seconds for background tasks
+(auto-replies) before cancelling them and closing its pool.
+
+Usage (from the project_test directory):
+
+    python -m src.launcher
+    python -m src.launcher --workers 4 --loop uvloop --http httptools
+"""
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+import uvicorn
+
+from src.utils.settings import get_settings
+
+APP = "main:app"
+LOOPS = ("auto", "asyncio", "uvloop")
+HTTP_IMPLEMENTATIONS = ("auto", "h11", "httptools")
+
+
+def server_options(argv: Optional[List[str]] = None) -> dict:
+    """
+    Resolves the server options from settings.ini and command-line overrides.
+
+    Args:
+        argv (Optional[List[str]]): Command-line arguments.
+
+    Returns:
+        dict: Keyword arguments for `uvicorn.run`.
+    """
+    settings = get_settings()
+
+    def setting(name: str, fallback: str) -> str:
+        return settings.get("server", name, fallback=fallback)
+
+    parser = argparse.ArgumentParser(description="Run the posts & comments API")
+    parser.add_argument("--host", default=setting("host", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(setting("port", "8000")))
+    parser.add_argument("--workers", type=int, default=int(setting("workers", "1")),
+                        help="Number of worker processes")
+    parser.add_argument("--backlog", type=int, default=int(setting("backlog", "2048")),
+                        help="Maximum number of pending connections")
+    parser.add_argument("--keep-alive", type=int, default=int(setting("keep_alive", "5")),
+                        help="Seconds to keep idle connections open")
+    parser.add_argument("--loop", choices=LOOPS, default=setting("loop", "auto"))
+    parser.add_argument("--http", choices=HTTP_IMPLEMENTATIONS, default=setting("http", "auto"))
+    parser.add_argument("--graceful-timeout", type=int, default=int(setting("graceful_timeout", "30")),
+                        help="Seconds to finish in-flight requests after SIGTERM")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "loop": args.loop,
+        "http": args.http,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = server_options(argv)
+    logging.info(
+        "Starting %s with %d worker(s), loop=%s, http=%s",
+        APP, options["workers"], options["loop"], options["http"],
+    )
+    uvicorn.run(APP, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import math
+from typing import Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GroupLimits(NamedTuple):
+    """
+    Admission limits of one route group.
+
+    Attributes:
+        concurrency (int): Requests allowed to run at the same time.
+        queue_size (int): Requests allowed to wait for a free slot.
+        deadline (float): Seconds a request may wait before being shed.
+    """
+
+    concurrency: int
+    queue_size: int
+    deadline: float
+
+
+# Route groups are isolated from each other, so a burst of analytics
+# queries can never take the slots reserved for comment creation.
+DEFAULT_GROUP_LIMITS: Dict[str, GroupLimits] = {
+    "reads": GroupLimits(concurrency=64, queue_size=256, deadline=2.0),
+    "writes": GroupLimits(concurrency=32, queue_size=128, deadline=2.0),
+    "auth": GroupLimits(concurrency=16, queue_size=64, deadline=3.0),
+    "analytics": GroupLimits(concurrency=2, queue_size=8, deadline=1.0),
+}
+
+AUTH_PATHS = ("/login/", "/logout/", "/registration/", "/forgot_password/", "/get_new_pass/")
+ANALYTICS_PATHS = ("/api/comments-daily-breakdown",)
+# Long-lived streams and operational endpoints are never queued
+EXEMPT_PATHS = ("/metrics", "/health", "/api/monitoring/")
+EXEMPT_SUFFIXES = ("/comments/stream",)
+
+
+def classify_request(method: str, path: str) -> Optional[str]:
+    """
+    Maps a request to its admission group.
+
+    Args:
+        method (str): HTTP method.
+        path (str): Request path.
+
+    Returns:
+        Optional[str]: Group name, or None if the request bypasses admission control.
+    """
+    if path.startswith(EXEMPT_PATHS) or path.endswith(EXEMPT_SUFFIXES):
+        return None
+    if path.startswith(AUTH_PATHS):
+        return "auth"
+    if path.startswith(ANALYTICS_PATHS):
+        return "analytics"
+    if method in ("GET", "HEAD"):
+        return "reads"
+    if method == "OPTIONS":
+        return None
+    return "writes"
+
+
+class AdmissionGroup:
+    """
+    Concurrency limiter with a bounded, deadline-limited wait queue.
+    """
+
+    def __init__(self, name: str, limits: GroupLimits):
+        self.name = name
+        self.limits = limits
+        self._semaphore = asyncio.Semaphore(limits.concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    async def acquire(self) -> bool:
+        """
+        Waits for a free slot.
+
+        Returns:
+            bool: True if the request may run, False if it has to be shed.
+        """
+        if self._semaphore.locked() and self.waiting >= self.limits.queue_size:
+            self.shed_queue_full += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.limits.deadline)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """
+        Frees the slot taken by `acquire`.
+        """
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        """
+        Returns queue and shed counters of the group.
+
+        Returns:
+            dict: Group counters.
+        """
+        return {
+            "concurrency": self.limits.concurrency,
+            "queue_size": self.limits.queue_size,
+            "deadline": self.limits.deadline,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+class AdmissionController:
+    """
+    Holds the admission groups shared by every request of the process.
+    """
+
+    def __init__(
+        self,
+        group_limits: Optional[Dict[str, GroupLimits]] = None,
+        classifier: Callable[[str, str], Optional[str]] = classify_request,
+    ):
+        self.classifier = classifier
+        self.groups = {
+            name: AdmissionGroup(name, limits)
+            for name, limits in (group_limits or DEFAULT_GROUP_LIMITS).items()
+        }
+
+    def group_for(self, method: str, path: str) -> Optional[AdmissionGroup]:
+        """
+        Returns the admission group of a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path.
+
+        Returns:
+            Optional[AdmissionGroup]: Group, or None if the request bypasses admission control.
+        """
+        name = self.classifier(method, path)
+        return self.groups.get(name) if name else None
+
+    def stats(self) -> dict:
+        """
+        Returns counters of every group.
+
+        Returns:
+            dict: Counters keyed by group name.
+        """
+        return {name: group.stats() for name, group in self.groups.items()}
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds requests which cannot start within their group's deadline.
+
+    Shed requests are answered immediately with 503 and a Retry-After header
+    instead of piling up behind a slow database.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        group = self.controller.group_for(scope["method"], scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await group.acquire():
+            logger.warning(f"Shedding {scope['method']} {scope['path']} (group: {group.name})")
+            await self._send_overloaded(send, group)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    @staticmethod
+    async def _send_overloaded(send, group: AdmissionGroup) -> None:
+        body = json.dumps({"detail": "Server is overloaded, retry later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(group.limits.deadline))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Process-wide controller; its counters are served by the monitoring routes
+admission_controller = AdmissionController()
@@ -0,0 +1,54 @@
+import logging
+
+from src.monitoring.query_accounting import RequestQueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryAccountingMiddleware:
+    """
+    ASGI middleware counting the Mongo commands issued by each request.
+
+    Adds `X-Db-Queries` and `X-Db-Time` (milliseconds) debug headers and logs
+    requests that exceed the query budget or repeat the same query shape,
+    which usually points at an N+1 loop. Meant for development and staging.
+    """
+
+    def __init__(self, app, query_budget: int = 10, repeated_threshold: int = 3):
+        self.app = app
+        self.query_budget = query_budget
+        self.repeated_threshold = repeated_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                headers.append(
+                    (b"x-db-time", f"{stats.duration_micros / 1000:.2f}".encode("latin-1"))
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope, stats: RequestQueryStats) -> None:
+        request_line = f"{scope['method']} {scope['path']}"
+        if stats.count > self.query_budget:
+            logger.warning(
+                f"{request_line} issued {stats.count} Mongo queries "
+                f"(budget {self.query_budget}, {stats.duration_micros / 1000:.2f} ms)"
+            )
+        for shape, count in stats.repeated_shapes(self.repeated_threshold).items():
+            logger.warning(f"{request_line} repeated query shape {count} times (possible N+1): {shape}")
@@ -1,8 +1,11 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from bson import ObjectId
 
+# Bounds the size of a comment, and with it how full a comment bucket can get
+MAX_COMMENT_LENGTH = 10000
+
 class UserBase(BaseModel):
     username: str
 
@@ -22,6 +25,8 @@ class UserLog(BaseModel):
     state_before: str
     state_after: str
     timestamp: datetime
+    # Number of changes an entry stands for; above 1 for compacted history
+    changes: int = 1
 
 class LoginData(BaseModel):
     email: EmailStr
@@ -92,7 +97,8 @@ class CommentBase(BaseModel):
         json_encoders = {ObjectId: str}
 
 class CommentCreate(BaseModel):
-    content: str
+    content: str = Field(..., max_length=MAX_COMMENT_LENGTH)
+    parent_id: Optional[str] = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -119,8 +125,51 @@ class CommentResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     blocked: bool
+    parent_id: Optional[str] = None
+    depth: int = 0
+
+class CommentNode(CommentResponse):
+    reply_count: int = 0
+    replies: List["CommentNode"] = []
+    more_replies: bool = False
+
+class CommentThread(BaseModel):
+    comments: List[CommentNode]
+    more_comments: bool = False
 
 class CommentAnalyticsResponse(BaseModel):
     date: datetime
     total_comments: int
     blocked_comments: int
+
+class TrendingPostResponse(BaseModel):
+    id: str
+    title: str
+    author_id: str
+    score: float
+
+class PostPage(BaseModel):
+    posts: List[PostInDB]
+    next_cursor: Optional[str] = None
+
+class AutocompleteSuggestion(BaseModel):
+    id: str
+    text: str
+    popularity: int
+
+class AutocompleteResponse(BaseModel):
+    users: List[AutocompleteSuggestion] = []
+    posts: List[AutocompleteSuggestion] = []
+
+class SearchHit(BaseModel):
+    kind: str
+    id: str
+    post_id: str
+    score: float
+    title: Optional[str] = None
+    created_at: datetime
+    highlights: Dict[str, str]
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,45 @@
+from pymongo import monitoring
+
+from src.monitoring.metrics import mongo_command_duration_seconds, mongo_command_failures_total
+
+# Commands whose first argument is not a collection name
+_NON_COLLECTION_COMMANDS = {"ping", "hello", "isMaster", "ismaster", "endSessions", "buildInfo"}
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """
+    pymongo command listener recording the latency of every command per collection and operation.
+
+    The driver reports durations itself, so the only work done here is a
+    dictionary lookup and a histogram update per command.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        command_name = event.command_name
+        if command_name in _NON_COLLECTION_COMMANDS:
+            collection = "admin"
+        else:
+            collection = event.command.get(command_name)
+            if not isinstance(collection, str):
+                collection = "unknown"
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop((event.connection_id, event.request_id), "unknown")
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1_000_000, collection, event.command_name
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop((event.connection_id, event.request_id), "unknown")
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1_000_000, collection, event.command_name
+        )
+        mongo_command_failures_total.inc(collection, event.command_name)
+
+
+# Listener attached to every client created by the Database layer
+command_timing_listener = CommandTimingListener()
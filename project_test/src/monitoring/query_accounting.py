@@ -0,0 +1,100 @@
+import contextvars
+import json
+from collections import Counter
+from typing import Optional
+
+from pymongo import monitoring
+
+# Fields of a command document that hold the query predicate
+_FILTER_FIELDS = ("filter", "query", "pipeline", "updates", "deletes")
+
+
+class RequestQueryStats:
+    """
+    Mongo commands issued on behalf of one HTTP request.
+
+    Attributes:
+        count (int): Number of commands.
+        duration_micros (int): Total server round-trip time reported by the driver.
+        shapes (Counter): Number of commands per query shape.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration_micros = 0
+        self.shapes: Counter = Counter()
+
+    def repeated_shapes(self, threshold: int) -> dict:
+        """
+        Returns the query shapes issued at least `threshold` times.
+
+        Args:
+            threshold (int): Minimum number of repetitions.
+
+        Returns:
+            dict: Repetition count keyed by query shape.
+        """
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+# Stats of the request currently being served; None outside of accounted requests.
+# Motor runs driver calls with a copy of the caller's context, so the listener
+# (invoked on a driver thread) still sees the request's stats object.
+current_query_stats: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shape(item) for item in value]
+    return "?"
+
+
+def query_shape(command_name: str, command: dict) -> str:
+    """
+    Reduces a command to its shape: collection, operation and predicate keys with values elided.
+
+    Two commands with the same shape differ only by literal values, which is
+    the signature of an N+1 loop.
+
+    Args:
+        command_name (str): Name of the command (find, update, ...).
+        command (dict): Command document sent to the server.
+
+    Returns:
+        str: Stable textual shape.
+    """
+    predicate = {field: _shape(command[field]) for field in _FILTER_FIELDS if field in command}
+    return f"{command.get(command_name)}.{command_name} {json.dumps(predicate, sort_keys=True, default=str)}"
+
+
+class QueryAccountingListener(monitoring.CommandListener):
+    """
+    pymongo command listener attributing every command to the current request.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        stats = current_query_stats.get()
+        if stats is None:
+            return
+        stats.count += 1
+        stats.shapes[query_shape(event.command_name, event.command)] += 1
+        self._pending[(event.connection_id, event.request_id)] = stats
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        stats = self._pending.pop((event.connection_id, event.request_id), None)
+        if stats is not None:
+            stats.duration_micros += event.duration_micros
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.succeeded(event)
+
+
+# Listener attached to every client created by the Database layer
+query_accounting_listener = QueryAccountingListener()
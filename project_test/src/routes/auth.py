@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from src.models.models import TokenResponse, LoginData, User, ResetPasswordRequest
 from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import FRESH_READ, INTERACTIVE_WRITE
 import src.utils.jwt_utils as jwt_utils
 from src.routes.update import update_password_in_db
 from src.utils.email_utils import generate_valid_password, send_new_password_email
@@ -21,7 +22,7 @@ async def login_for_access_token(user_data: LoginData):
     normalized_email = user_data.email.lower()
 
     # Connect to the database and find the user by lowercase email
-    database = await connect_to_database_mongo(await get_mongo_url())
+    database = await connect_to_database_mongo(await get_mongo_url(), profile=FRESH_READ)
     if not database:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -81,7 +82,7 @@ async def forgot_password(request: ResetPasswordRequest):
     Endpoint to initiate the password reset process.
     """
     # Connect to the database
-    database = await connect_to_database_mongo(await get_mongo_url())
+    database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
     if not database:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -119,7 +120,7 @@ async def get_new_password(token: str):
     Endpoint to reset a user's password using a token.
     """
     # Connect to the database
-    database = await connect_to_database_mongo(await get_mongo_url())
+    database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
     if not database:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Query
+from src.models.models import AutocompleteResponse, AutocompleteSuggestion
+from src.utils.autocomplete import autocomplete
+
+router = APIRouter()
+
+AUTOCOMPLETE_TYPES = ("all", "users", "posts")
+
+
+@router.get("/autocomplete", response_model=AutocompleteResponse, tags=["Search"])
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    type: str = Query("all", description="all, users or posts"),
+    limit: int = Query(10, ge=1, le=25),
+):
+    """
+    Endpoint to suggest usernames and post titles starting with the typed text.
+
+    The start of the whole name or title, or of any of its first words, can match.
+    Users are ranked by number of posts and posts by number of comments.
+
+    Args:
+    - q (str): Text typed so far.
+    - type (str): Restricts suggestions to users or posts.
+    - limit (int): Maximum number of suggestions per type.
+
+    Returns:
+    - AutocompleteResponse: Suggestions per type.
+
+    Raises:
+    - HTTPException: 400 for an unknown type, 503 while the index is loading.
+    """
+    if type not in AUTOCOMPLETE_TYPES:
+        raise HTTPException(status_code=400, detail="type must be one of: all, users, posts")
+    if not autocomplete.loaded:
+        raise HTTPException(status_code=503, detail="Autocomplete index is loading", headers={"Retry-After": "5"})
+
+    response = AutocompleteResponse()
+    if type in ("all", "users"):
+        response.users = [AutocompleteSuggestion(**entry._asdict()) for entry in autocomplete.users.suggest(q, limit)]
+    if type in ("all", "posts"):
+        response.posts = [AutocompleteSuggestion(**entry._asdict()) for entry in autocomplete.posts.suggest(q, limit)]
+    return response
@@ -0,0 +1,178 @@
+from fastapi import APIRouter, HTTPException, Header, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+import asyncio
+import json
+import logging
+
+from src.database.comment_store import comment_store
+from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.routes.comments import comment_event
+from src.utils.comment_broker import comment_broker
+from src.utils.ids import ref, ref_after
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Seconds of silence after which a keep-alive is sent on the SSE stream
+STREAM_KEEPALIVE_SECONDS = 15
+# Maximum number of missed comments replayed to a reconnecting client
+RESUME_BACKLOG_LIMIT = 500
+
+
+async def fetch_missed_comments(post_id: str, last_id: str) -> List[dict]:
+    """
+    Retrieves the visible comments of a post created after the given comment.
+
+    Args:
+        post_id (str): ID of the post.
+        last_id (str): ID of the last comment the client has seen.
+
+    Returns:
+        List[dict]: Comment events in insertion order.
+
+    Raises:
+        HTTPException: If the database connection fails.
+    """
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+
+    try:
+        cursor = comment_store(database).find(
+            {"post_id": ref(post_id), "blocked": False, **ref_after("_id", last_id)},
+            sort=[("_id", 1)], limit=RESUME_BACKLOG_LIMIT,
+        )
+        return [comment_event(comment) async for comment in cursor]
+    finally:
+        await database.close()
+
+
+async def comment_events(post_id: str, last_id: Optional[str]) -> AsyncIterator[Optional[dict]]:
+    """
+    Yields comment events for a post, replaying missed comments first when resuming.
+
+    The subscription is registered before the backlog is read so that no
+    comment inserted in between is lost; duplicates are filtered out.
+    A None item signals a keep-alive interval without new comments. The
+    events end when the broker drops the subscriber or closes on shutdown.
+
+    Args:
+        post_id (str): ID of the post to follow.
+        last_id (Optional[str]): ID of the last comment the client has seen.
+
+    Yields:
+        Optional[dict]: Comment events, or None on keep-alive.
+    """
+    subscription = comment_broker.subscribe(post_id)
+    try:
+        replayed = set()
+        if last_id:
+            for event in await fetch_missed_comments(post_id, last_id):
+                replayed.add(event["id"])
+                yield event
+
+        while True:
+            event = await subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            if subscription.ended:
+                return
+            if event is not None and event["id"] in replayed:
+                continue
+            yield event
+    finally:
+        comment_broker.unsubscribe(subscription)
+
+
+def _validate_stream_args(post_id: str, last_id: Optional[str]) -> None:
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=400, detail="Invalid ObjectId format")
+    if last_id and not ObjectId.is_valid(last_id):
+        raise HTTPException(status_code=400, detail="Invalid last_id format")
+
+
+@router.get("/posts/{post_id}/comments/stream", tags=["Comments"])
+async def stream_comments_sse(
+    post_id: str,
+    last_id: Optional[str] = Query(None, description="Resume after this comment ID"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Streams new comments of a post as Server-Sent Events.
+
+    Args:
+        post_id (str): ID of the post to follow.
+        last_id (Optional[str]): Resume after this comment ID; falls back to the Last-Event-ID header.
+        last_event_id (Optional[str]): Last-Event-ID header sent by reconnecting EventSource clients.
+
+    Returns:
+        StreamingResponse: `text/event-stream` response.
+    """
+    last_id = last_id or last_event_id
+    _validate_stream_args(post_id, last_id)
+
+    async def event_stream():
+        async for event in comment_events(post_id, last_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: comment\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/posts/{post_id}/comments/stream")
+async def stream_comments_ws(
+    websocket: WebSocket,
+    post_id: str,
+    last_id: Optional[str] = None,
+):
+    """
+    Streams new comments of a post over a WebSocket as JSON messages.
+
+    Args:
+        websocket (WebSocket): Client connection.
+        post_id (str): ID of the post to follow.
+        last_id (Optional[str]): Resume after this comment ID.
+    """
+    try:
+        _validate_stream_args(post_id, last_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    await websocket.accept()
+    # The events only end when the subscription does, so a disconnect is noticed by reading
+    sender = asyncio.create_task(_send_comments(websocket, post_id, last_id))
+    receiver = asyncio.create_task(_wait_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        # Cancelling the sender ends its subscription
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if receiver in done:
+        logger.info(f"Comment stream client disconnected for post_id: {post_id}")
+    elif sender.exception() is not None:
+        # Sending fails once the client is gone
+        logger.info(f"Comment stream for post_id {post_id} ended: {sender.exception()!r}")
+    elif comment_broker.closed:
+        await websocket.close(code=1001, reason="Server shutting down")
+    else:
+        # The broker dropped this subscriber for falling behind
+        await websocket.close(code=1013, reason="Subscriber too slow")
+
+
+async def _send_comments(websocket: WebSocket, post_id: str, last_id: Optional[str]) -> None:
+    async for event in comment_events(post_id, last_id):
+        if event is not None:
+            await websocket.send_json(event)
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    # Messages from the client are ignored
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
@@ -1,22 +1,83 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import Optional, List, Tuple, Union
 from datetime import datetime, date
 from bson import ObjectId
 import asyncio
 import logging
 
-from src.models.models import Comment, CommentCreate, PostInDB, CommentResponse, CommentAnalyticsResponse
+from src.models.models import (
+    Comment,
+    CommentCreate,
+    PostInDB,
+    CommentResponse,
+    CommentAnalyticsResponse,
+    CommentThread,
+)
 from src.database.connect import Database, connect_to_database_mongo, get_mongo_url
+from src.database.profiles import ANALYTICS_READ, BACKGROUND_WRITE, INTERACTIVE_WRITE
+from src.database.comment_store import comment_store
 from better_profanity import profanity
 from fastapi.security import OAuth2PasswordBearer
 from src.utils.jwt_utils import decode_access_token
 from jose.exceptions import ExpiredSignatureError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from src.monitoring.metrics import auto_reply_backlog, moderation_duration_seconds
+from src.utils.comment_broker import comment_broker
+from src.utils.background import background_tasks
+from src.utils.search_index import search_index
+from src.utils.autocomplete import autocomplete
+from src.utils.trending import trending_posts
+from src.utils.threads import MAX_REPLY_DEPTH, build_thread, subtree_query, thread_fields
+from src.utils.ids import ref, to_object_id
+from src.utils.singleflight import SingleFlightFull, comment_reads
+from src.utils.fields import fields_projection, render_fields, select_fields
+from src.utils.http_cache import (
+    has_conditional_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 logger = logging.getLogger(__name__)
 
-async def create_auto_reply(post_id: str, author_id: str, delay: int, content: str):
+def comment_event(comment: dict) -> dict:
+    """
+    Converts a comment document into the JSON-serializable event pushed to stream subscribers.
+
+    Args:
+        comment (dict): Comment document as stored in MongoDB.
+
+    Returns:
+        dict: Comment representation matching CommentResponse.
+    """
+    return jsonable_encoder(CommentResponse(
+        id=str(comment["_id"]),
+        post_id=str(comment["post_id"]),
+        content=comment["content"],
+        author_id=str(comment["author_id"]),
+        created_at=comment["created_at"],
+        updated_at=comment["updated_at"],
+        blocked=comment["blocked"],
+        parent_id=str(comment["parent_id"]) if comment.get("parent_id") else None,
+        depth=comment.get("depth", 0)
+    ))
+
+async def add_reply_to_parent(database: Database, parent: Optional[dict]) -> None:
+    """
+    Counts a visible reply on the comment it answers, so readers know when a level has more replies.
+
+    Args:
+        database (Database): Instance of Database connected to MongoDB.
+        parent (Optional[dict]): Comment being replied to, or None for a top-level comment.
+    """
+    if parent:
+        await comment_store(database).add_reply(parent)
+
+async def create_auto_reply(post_id: str, author_id: str, delay: int, content: str, parent: Optional[dict] = None):
     """
     Creates an auto-reply comment for a post after a specified delay.
 
@@ -25,25 +86,33 @@ async def create_auto_reply(post_id: str, author_id: str, delay: int, content: s
         author_id (str): ID of the author of the auto-reply comment.
         delay (int): Delay in seconds before sending the auto-reply.
         content (str): Content of the auto-reply comment.
+        parent (Optional[dict]): Comment the auto-reply answers; None for a top-level comment.
     """
     mongo_url = await get_mongo_url()
-    database = await connect_to_database_mongo(mongo_url)
+    database = await connect_to_database_mongo(mongo_url, profile=BACKGROUND_WRITE)
     try:
         logger.info(f"Creating auto-reply for post_id: {post_id} with delay: {delay} seconds")
         await asyncio.sleep(delay)
 
+        comment_id = ObjectId()
         auto_reply_comment = {
-            "_id": str(ObjectId()),  # Ensure _id is a string
-            "post_id": post_id,
+            "_id": comment_id,
+            "post_id": to_object_id(post_id),
             "content": content,
-            "author_id": author_id,
+            "author_id": to_object_id(author_id),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
-            "blocked": False
+            "blocked": False,
+            **thread_fields(comment_id, parent)
         }
 
-        result = await database.comments_collection.insert_one(auto_reply_comment)
-        logger.info(f"Auto-reply inserted with id: {result.inserted_id}")
+        await comment_store(database).insert(auto_reply_comment)
+        await add_reply_to_parent(database, parent)
+        logger.info(f"Auto-reply inserted with id: {comment_id}")
+        comment_broker.publish(post_id, comment_event(auto_reply_comment))
+        search_index.add_comment(auto_reply_comment)
+        autocomplete.record_comment(auto_reply_comment)
+        return auto_reply_comment
 
     except Exception as e:
         logger.error(f"Error creating auto-reply: {str(e)}", exc_info=True)
@@ -59,7 +128,8 @@ async def send_delayed_reply(post_id: str, comment_id: Optional[str], delay: int
         delay (int): Delay in seconds before sending the auto-reply.
     """
     mongo_url = await get_mongo_url()
-    database = await connect_to_database_mongo(mongo_url)
+    database = await connect_to_database_mongo(mongo_url, profile=BACKGROUND_WRITE)
+    auto_reply_backlog.inc()
     try:
         logger.info(f"Preparing to send delayed reply for post_id: {post_id} after {delay} seconds")
         await asyncio.sleep(delay)
@@ -71,6 +141,7 @@ async def send_delayed_reply(post_id: str, comment_id: Optional[str], delay: int
             return
 
         auto_reply_content = f"Auto-reply to your post: {post.get('title', '')}"
+        parent = None
 
         if comment_id:
             comment_id_str = str(comment_id).strip()
@@ -78,23 +149,28 @@ async def send_delayed_reply(post_id: str, comment_id: Optional[str], delay: int
                 logger.error(f"Invalid comment_id length: '{comment_id_str}'")
                 return
 
-            comment_id_obj = ObjectId(comment_id_str)
-            comment = await database.comments_collection.find_one({"_id": comment_id_obj})
+            comment = await comment_store(database).find_one({"post_id": ref(post_id), "_id": ref(comment_id_str)})
 
             if comment:
                 auto_reply_content = f"Auto-reply to comment: {comment.get('content', '')}"
+                # Replies are threaded under the comment unless moderation blocked it
+                if not comment.get("blocked") and comment.get("depth", 0) < MAX_REPLY_DEPTH:
+                    parent = comment
             else:
                 logger.error(f"Comment with id {comment_id_str} not found")
 
-        await create_auto_reply(post_id, post["author_id"], delay, auto_reply_content)
+        auto_reply_comment = await create_auto_reply(post_id, post["author_id"], delay, auto_reply_content, parent)
+        trending_posts.record_comment(auto_reply_comment, post)
         logger.info(f"Auto-reply created successfully for post_id: {post_id}")
 
     except Exception as e:
         logger.error(f"Error sending delayed reply: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to send delayed reply")
+    finally:
+        auto_reply_backlog.dec()
 
 async def insert_comment_into_db(
-        post_id: str, comment: CommentCreate, author_id: str, database: Database
+        post_id: str, comment: CommentCreate, author_id: str, database: Database, parent: Optional[dict] = None
 ) -> dict:
     """
     Inserts a new comment into the database.
@@ -104,6 +180,7 @@ async def insert_comment_into_db(
         comment (CommentCreate): Comment data to insert.
         author_id (str): ID of the author of the comment.
         database (Database): Instance of Database connected to MongoDB.
+        parent (Optional[dict]): Comment being replied to, or None for a top-level comment.
 
     Returns:
         dict: The inserted comment with its ID.
@@ -111,21 +188,29 @@ async def insert_comment_into_db(
     Raises:
         HTTPException: If the post is not found or database connection fails.
     """
+    with moderation_duration_seconds.time("comment"):
+        is_blocked = profanity.contains_profanity(comment.content)
+    comment_id = ObjectId()  # Generate a new ObjectId for the comment
     comment_obj = {
-        "_id": str(ObjectId()),  # Generate a new ObjectId for the comment
-        "post_id": post_id,
+        "_id": comment_id,
+        "post_id": to_object_id(post_id),
         "content": comment.content,
-        "author_id": author_id,
+        "author_id": to_object_id(author_id),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
-        "blocked": profanity.contains_profanity(comment.content)
+        "blocked": is_blocked,
+        **thread_fields(comment_id, parent)
     }
-    result = await database.comments_collection.insert_one(comment_obj)
-    if not result.acknowledged:
-        raise HTTPException(status_code=500, detail="Failed to insert comment")
+    await comment_store(database).insert(comment_obj)
 
     # Convert the _id to string
-    comment_obj["_id"] = str(result.inserted_id)
+    comment_obj["_id"] = str(comment_id)
+    if not is_blocked:
+        await add_reply_to_parent(database, parent)
+    # Blocked comments are left out of the search index by moderation
+    search_index.add_comment(comment_obj)
+    if not is_blocked:
+        autocomplete.record_comment(comment_obj)
 
     return comment_obj
 
@@ -159,7 +244,7 @@ async def create_comment(
         if not mongo_url:
             raise HTTPException(status_code=500, detail="Failed to get MongoDB URL")
 
-        database = await connect_to_database_mongo(mongo_url)
+        database = await connect_to_database_mongo(mongo_url, profile=INTERACTIVE_WRITE)
         if not database:
             raise HTTPException(status_code=500, detail="Failed to connect to MongoDB")
 
@@ -173,25 +258,45 @@ async def create_comment(
         if post_dict.get("blocked", False):
             raise HTTPException(status_code=403, detail="Post is blocked")
 
+        parent = None
+        if comment.parent_id:
+            if not ObjectId.is_valid(comment.parent_id):
+                raise HTTPException(status_code=400, detail="Invalid parent comment ID")
+            parent = await comment_store(database).find_one(
+                {"post_id": ref(post_id), "_id": ref(comment.parent_id)},
+                {"post_id": 1, "path": 1, "depth": 1, "blocked": 1}
+            )
+            if not parent:
+                raise HTTPException(status_code=404, detail="Parent comment not found")
+            if parent.get("blocked", False):
+                raise HTTPException(status_code=403, detail="Parent comment is blocked")
+            if parent.get("depth", 0) >= MAX_REPLY_DEPTH:
+                raise HTTPException(status_code=400, detail="Replies are nested too deeply")
+
         # Insert the comment into the database
-        comment_obj = await insert_comment_into_db(post_id, comment, author_id, database)
+        comment_obj = await insert_comment_into_db(post_id, comment, author_id, database, parent)
+        if not comment_obj["blocked"]:
+            comment_broker.publish(post_id, comment_event(comment_obj))
+            trending_posts.record_comment(comment_obj, post_dict)
 
         # Auto-reply logic
         if post_dict.get("auto_reply_enabled"):
             delay = post_dict.get("auto_reply_delay", 0)
             auto_reply_content = f"Auto-reply to your post: {post_dict.get('title', '')}"
-            asyncio.create_task(send_delayed_reply(post_id, comment_obj["_id"], delay))
+            background_tasks.spawn(send_delayed_reply(post_id, comment_obj["_id"], delay), name=f"auto-reply:{post_id}")
             logger.info(f"Auto-reply task created for post_id: {post_id}")
 
         # Return CommentResponse with id as a string
         return CommentResponse(
             id=comment_obj["_id"],  # Ensure id is a string
-            post_id=comment_obj["post_id"],
+            post_id=str(comment_obj["post_id"]),
             content=comment_obj["content"],
-            author_id=comment_obj["author_id"],
+            author_id=str(comment_obj["author_id"]),
             created_at=comment_obj["created_at"],
             updated_at=comment_obj["updated_at"],
-            blocked=comment_obj["blocked"]
+            blocked=comment_obj["blocked"],
+            parent_id=str(comment_obj["parent_id"]) if comment_obj["parent_id"] else None,
+            depth=comment_obj["depth"]
         )
 
     except HTTPException as e:
@@ -202,23 +307,88 @@ async def create_comment(
         raise HTTPException(status_code=500, detail="Failed to create comment")
 
 
+async def fetch_comments(
+        post_id: str, fields: Optional[Tuple[str, ...]] = None
+) -> Tuple[List[Union[CommentResponse, dict]], Optional[dict]]:
+    """
+    Reads the visible comments of a post.
+
+    Comments are read as a stream, which with the bucketed layout means one
+    document per bucket rather than per comment.
+
+    Args:
+        post_id (str): ID of the post.
+        fields (Optional[Tuple[str, ...]]): Fields to read and return; all of them by default.
+
+    Returns:
+        Tuple[List[Union[CommentResponse, dict]], Optional[dict]]: The comments (dicts of the
+            selected fields if `fields` is given), and the most recently updated one
+            (None if there are no comments).
+
+    Raises:
+        HTTPException: If the database connection fails.
+    """
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+
+    comments_response = []
+    newest = None
+    projection = fields_projection(CommentResponse, fields, ["updated_at"]) if fields else None
+    async for comment in comment_store(database).find({"post_id": ref(post_id), "blocked": False}, projection):
+        if newest is None or (comment["updated_at"], str(comment["_id"])) > (newest["updated_at"], str(newest["_id"])):
+            newest = comment
+        if fields:
+            comments_response.append(render_fields(CommentResponse, fields, comment))
+            continue
+        comments_response.append(CommentResponse(
+            id=str(comment["_id"]),
+            post_id=str(comment["post_id"]),
+            content=comment["content"],
+            author_id=str(comment["author_id"]),
+            created_at=comment["created_at"],
+            updated_at=comment["updated_at"],
+            blocked=comment["blocked"],
+            parent_id=str(comment["parent_id"]) if comment.get("parent_id") else None,
+            depth=comment.get("depth", 0)
+        ))
+    return comments_response, newest
+
 @router.get("/posts/{post_id}/comments/", response_model=List[CommentResponse])
-async def get_comments(post_id: str):
+async def get_comments(
+        post_id: str,
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,author_id"),
+):
     """
     Retrieves all comments for a specified post.
 
+    The ETag is derived from the post ID and the newest comment's timestamp.
+    Conditional requests are revalidated with a single-document query and
+    answered with 304 before the comment listing is fetched. Concurrent
+    requests for the same post share one listing read (`fetch_comments`).
+    With `fields`, only the selected fields are read and returned.
+
     Args:
         post_id (str): ID of the post for which to retrieve comments.
+        request (Request): Incoming request, inspected for cache validators.
+        response (Response): Outgoing response, used to attach ETag / Last-Modified.
+        fields (Optional[str]): Fields to return; all of them by default.
 
     Returns:
         List[CommentResponse]: List of comments related to the specified post.
 
     Raises:
-        HTTPException: If the database connection fails, or no comments are found.
+        HTTPException: If the database connection fails, a field is unknown, or no comments are found.
     """
     database = None
-    client = None
     try:
+        try:
+            selected = select_fields(CommentResponse, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         mongo_url = await get_mongo_url()
         logger.info(f"Connecting to MongoDB at {mongo_url}")
         database = await connect_to_database_mongo(mongo_url)
@@ -226,32 +396,45 @@ async def get_comments(post_id: str):
         if not database:
             raise HTTPException(status_code=500, detail="Failed to connect to the database")
 
-        client = database.client
         logger.info(f"Looking for comments with post_id: {post_id}")
 
-        comments_cursor = database.comments_collection.find({"post_id": post_id, "blocked": False})
-        comments = await comments_cursor.to_list(length=None)
+        if not ObjectId.is_valid(post_id):
+            raise HTTPException(status_code=404, detail="No comments found for the specified post_id")
+        query = {"post_id": ref(post_id), "blocked": False}
 
-        if not comments:
+        # Revalidate against the newest comment only, without reading the listing
+        comments_store = comment_store(database)
+        if has_conditional_headers(request):
+            newest = await comments_store.find_one(
+                query, {"updated_at": 1}, sort=[("updated_at", -1), ("_id", -1)]
+            )
+            if not newest:
+                raise HTTPException(status_code=404, detail="No comments found for the specified post_id")
+            etag = make_etag(post_id, newest["_id"], newest["updated_at"], *(selected or ()))
+            if is_not_modified(request, etag, newest["updated_at"]):
+                return not_modified_response(etag, newest["updated_at"])
+
+        # Listings with different field selections are different reads
+        comments_response, newest = await comment_reads.do(
+            (post_id, selected) if selected else post_id, lambda: fetch_comments(post_id, selected)
+        )
+        if not comments_response:
             raise HTTPException(status_code=404, detail="No comments found for the specified post_id")
 
-        logger.info(f"Retrieved {len(comments)} comments for post {post_id}")
-
-        comments_response = []
-        for comment in comments:
-            logger.info(f"Processing comment with id: {comment['_id']}")
-            comments_response.append(CommentResponse(
-                id=str(comment["_id"]),
-                post_id=comment["post_id"],
-                content=comment["content"],
-                author_id=comment["author_id"],
-                created_at=comment["created_at"],
-                updated_at=comment["updated_at"],
-                blocked=comment["blocked"]
-            ))
+        headers = validator_headers(
+            make_etag(post_id, newest["_id"], newest["updated_at"], *(selected or ())),
+            newest["updated_at"],
+        )
+        logger.info(f"Retrieved {len(comments_response)} comments for post {post_id}")
 
+        if selected:
+            # Already rendered against the partial model, which response_model would reject
+            return JSONResponse(content=comments_response, headers=headers)
+        response.headers.update(headers)
         return comments_response
 
+    except SingleFlightFull:
+        raise HTTPException(status_code=503, detail="Too many concurrent requests", headers={"Retry-After": "1"})
     except HTTPException as e:
         logger.error(f"HTTP error: {str(e.detail)}")
         raise e
@@ -260,8 +443,74 @@ async def get_comments(post_id: str):
         raise HTTPException(status_code=500, detail="Failed to retrieve comments")
 
     finally:
-        if client:
-            client.close()
+        if database:
+            await database.close()
+
+
+# Upper bound on the comments read for one thread request
+MAX_THREAD_COMMENTS = 1000
+
+
+@router.get("/posts/{post_id}/comments/thread", response_model=CommentThread)
+async def get_comment_thread(
+    post_id: str,
+    parent_id: Optional[str] = Query(None, description="Comment whose replies are listed; the whole post if omitted"),
+    after: Optional[str] = Query(None, description="Last reply of the previous page at the first level"),
+    depth: int = Query(3, ge=1, le=MAX_REPLY_DEPTH, description="Number of levels returned"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of comments per level"),
+):
+    """
+    Retrieves comments of a post, or replies to a comment, as nested threads.
+
+    The subtree is read with one range query over the (post_id, path) index,
+    in reading order (each comment followed by its replies, oldest first).
+    Every level keeps at most `limit` comments; when `more_replies` is set on
+    a comment, request its next replies with `parent_id` set to that comment
+    and `after` set to its last returned reply. `more_comments` does the same
+    for the first level.
+
+    Args:
+        post_id (str): ID of the post.
+        parent_id (Optional[str]): Comment whose replies are listed.
+        after (Optional[str]): Last returned comment of the first level.
+        depth (int): Number of levels returned.
+        limit (int): Maximum number of comments per level.
+
+    Returns:
+        CommentThread: Nested comments.
+
+    Raises:
+        HTTPException: 400 for invalid IDs, 404 if the parent comment is not found,
+            500 if the database connection fails.
+    """
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=400, detail="Invalid post ID")
+    for value in (parent_id, after):
+        if value is not None and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail="Invalid comment ID")
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+
+    comments_store = comment_store(database)
+    path, base_depth = "", 0
+    if parent_id:
+        parent = await comments_store.find_one(
+            {"post_id": ref(post_id), "_id": ref(parent_id), "blocked": False}, {"path": 1, "depth": 1}
+        )
+        if not parent or "path" not in parent:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+        path, base_depth = parent["path"], parent["depth"] + 1
+
+    max_depth = base_depth + depth - 1
+    comments = await comments_store.find(
+        subtree_query(post_id, path, after, max_depth), sort=[("path", 1)], limit=MAX_THREAD_COMMENTS + 1
+    ).to_list(length=None)
+
+    truncated = len(comments) > MAX_THREAD_COMMENTS
+    roots, more = build_thread(comments[:MAX_THREAD_COMMENTS], base_depth, max_depth, limit)
+    return CommentThread(comments=roots, more_comments=more or truncated)
 
 
 @router.get("/api/comments-daily-breakdown", response_model=List[CommentAnalyticsResponse])
@@ -279,7 +528,7 @@ async def get_comments_daily_breakdown(
     database = None
     try:
         mongo_url = await get_mongo_url()
-        database = await connect_to_database_mongo(mongo_url)
+        database = await connect_to_database_mongo(mongo_url, profile=ANALYTICS_READ)
 
         if not database:
             raise HTTPException(status_code=500, detail="Failed to connect to the database")
@@ -300,7 +549,7 @@ async def get_comments_daily_breakdown(
             {"$sort": {"_id": 1}}
         ]
 
-        results = await database.comments_collection.aggregate(pipeline).to_list(length=None)
+        results = await comment_store(database).aggregate(pipeline).to_list(length=None)
 
         analytics_response = [
             CommentAnalyticsResponse(
@@ -320,9 +569,8 @@ async def get_comments_daily_breakdown(
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if database and database.client:
+        if database:
             try:
-                await database.client.close()
-                logger.info("Closed MongoDB client connection")
+                await database.close()
             except Exception as e:
                 logger.error(f"Error closing MongoDB client: {str(e)}")
\ No newline at end of file
@@ -2,7 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from src.routes.update import oauth2_scheme
 from src.utils.jwt_utils import decode_access_token
 from src.database.connect import Database, connect_to_database_mongo, get_mongo_url
+from src.database.profiles import INTERACTIVE_WRITE
+from src.database.comment_store import comment_store
 from bson import ObjectId
+from src.utils.post_cache import post_cache
+from src.utils.search_index import search_index
+from src.utils.autocomplete import autocomplete
+from src.utils.trending import trending_posts
+from src.utils.front_page import front_page
+from src.utils.ids import ref
 
 router = APIRouter()
 
@@ -32,12 +40,24 @@ async def delete_user_from_db(user_id: ObjectId, database: Database) -> dict:
     # Delete user logs first
     await delete_user_logs_from_db(user_id, database)
 
-    # Delete user's posts and associated comments
-    posts_cursor = database.posts_collection.find({"author_id": str(user_id)}, {"_id": 1})
-    async for post in posts_cursor:
-        await database.comments_collection.delete_many({"post_id": str(post["_id"])})
-
-    await database.posts_collection.delete_many({"author_id": str(user_id)})
+    # Delete user's posts and associated comments; with partitioned comments,
+    # every partition holding some of them is cleared concurrently
+    posts = await database.posts_collection.find({"author_id": ref(user_id)}, {"_id": 1}).to_list(length=None)
+    post_ids = [str(post["_id"]) for post in posts]
+    if post_ids:
+        await comment_store(database).delete_for_posts([post["_id"] for post in posts])
+
+    await database.posts_collection.delete_many({"author_id": ref(user_id)})
+    await database.follows_collection.delete_many(
+        {"$or": [{"follower_id": ref(user_id)}, {"followee_id": ref(user_id)}]}
+    )
+    post_cache.invalidate_many(post_ids)
+    for post_id in post_ids:
+        search_index.remove_post(post_id)
+        autocomplete.posts.remove(post_id)
+        trending_posts.remove(post_id)
+        front_page.remove(post_id)
+    autocomplete.users.remove(str(user_id))
 
     # Delete the user from the users collection
     result = await database.users_collection.delete_one({"_id": user_id})
@@ -64,7 +84,7 @@ async def delete_account(token: str = Depends(oauth2_scheme)):
         user_data = decode_access_token(token)
 
         # Connect to the MongoDB database
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
 
         if not database:
             raise HTTPException(
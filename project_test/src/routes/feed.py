@@ -0,0 +1,236 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
+from typing import List, Optional, Tuple, Union
+from datetime import datetime
+from itertools import islice
+import asyncio
+import heapq
+import logging
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from src.database.connect import Database, connect_to_database_mongo, get_mongo_url
+from src.models.models import PostInDB, PostPage
+from src.routes.update import oauth2_scheme
+from src.utils.jwt_utils import decode_access_token
+from src.utils.ids import ref, to_object_id
+from src.utils.pagination import NEWEST_FIRST, after_cursor, encode_cursor
+from src.utils.fields import fields_projection, render_fields, select_fields
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Only the most recently followed authors take part in the merged feed
+MAX_FEED_AUTHORS = 500
+# Concurrent per-author queries issued for one feed page
+FEED_QUERY_CONCURRENCY = 16
+
+
+def _post_out(post: dict) -> dict:
+    return PostInDB(**{
+        **post,
+        "_id": str(post["_id"]),
+        "author_id": str(post["author_id"])
+    }).dict(by_alias=True)
+
+
+def _page(posts: List[dict], limit: int, fields: Optional[Tuple[str, ...]] = None) -> Union[PostPage, JSONResponse]:
+    # One extra item was fetched to know whether another page exists
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1]["created_at"], posts[-1]["_id"])
+    if fields:
+        # Partial posts would be rejected by the PostPage response model
+        return JSONResponse(content={
+            "posts": [render_fields(PostInDB, fields, post) for post in posts],
+            "next_cursor": next_cursor,
+        })
+    return PostPage(posts=[_post_out(post) for post in posts], next_cursor=next_cursor)
+
+
+def _select_fields(fields: Optional[str]) -> Tuple[Optional[Tuple[str, ...]], Optional[dict]]:
+    # The selected fields and the projection reading them plus the cursor position
+    try:
+        selected = select_fields(PostInDB, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return selected, fields_projection(PostInDB, selected, ["created_at"]) if selected else None
+
+
+def _validate_user_id(user_id: str) -> None:
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+
+
+async def _database() -> Database:
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+    return database
+
+
+async def fetch_author_posts(database: Database, author_id: str, limit: int, cursor: Optional[str],
+                             projection: Optional[dict] = None) -> List[dict]:
+    """
+    Reads one page (plus one look-ahead item) of an author's non-blocked posts, newest first.
+
+    The query is an equality on author_id and a range on (created_at, _id),
+    answered by the (author_id, created_at, _id) index without a sort stage.
+
+    Args:
+        database (Database): Connected database handle.
+        author_id (str): Author whose posts are listed.
+        limit (int): Page size.
+        cursor (Optional[str]): Cursor of the previous page.
+        projection (Optional[dict]): Fields to read; all of them by default.
+
+    Returns:
+        List[dict]: Up to `limit + 1` post documents.
+    """
+    query = {"author_id": ref(author_id), "blocked": False, **after_cursor(cursor)}
+    return await database.posts_collection.find(query, projection).sort(NEWEST_FIRST).limit(limit + 1).to_list(length=None)
+
+
+@router.get("/users/{user_id}/posts", response_model=PostPage, tags=["Feed"])
+async def get_user_posts(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return, e.g. _id,title"),
+):
+    """
+    Endpoint to list one author's non-blocked posts, newest first.
+
+    Args:
+    - user_id (str): Author ID.
+    - limit (int): Page size.
+    - cursor (Optional[str]): Cursor of the next page.
+    - fields (Optional[str]): Post fields to read and return; all of them by default.
+
+    Returns:
+    - PostPage: Posts and the cursor of the next page, if any.
+
+    Raises:
+    - HTTPException: 400 for an invalid ID, cursor or field, 500 if the database is unavailable.
+    """
+    _validate_user_id(user_id)
+    selected, projection = _select_fields(fields)
+    database = await _database()
+    try:
+        posts = await fetch_author_posts(database, user_id, limit, cursor, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page(posts, limit, selected)
+
+
+@router.post("/users/{user_id}/follow", response_model=dict, tags=["Feed"])
+async def follow_user(user_id: str, token: str = Depends(oauth2_scheme)):
+    """
+    Endpoint to follow an author.
+
+    Args:
+    - user_id (str): Author to follow.
+    - token (str): OAuth2 token for authentication.
+
+    Returns:
+    - dict: Success message; following an author twice is not an error.
+
+    Raises:
+    - HTTPException: 400 for an invalid ID or self-follow, 404 if the author does not exist.
+    """
+    follower_id = decode_access_token(token).get("id")
+    _validate_user_id(user_id)
+    if user_id == follower_id:
+        raise HTTPException(status_code=400, detail="Users cannot follow themselves")
+
+    database = await _database()
+    if not await database.users_collection.find_one({"_id": ObjectId(user_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        await database.follows_collection.insert_one({
+            "follower_id": to_object_id(follower_id),
+            "followee_id": to_object_id(user_id),
+            "created_at": datetime.utcnow(),
+        })
+    except DuplicateKeyError:
+        pass
+    return {"message": "Following user"}
+
+
+@router.delete("/users/{user_id}/follow", response_model=dict, tags=["Feed"])
+async def unfollow_user(user_id: str, token: str = Depends(oauth2_scheme)):
+    """
+    Endpoint to stop following an author.
+
+    Args:
+    - user_id (str): Author to unfollow.
+    - token (str): OAuth2 token for authentication.
+
+    Returns:
+    - dict: Success message.
+
+    Raises:
+    - HTTPException: 400 for an invalid ID, 404 if the author was not followed.
+    """
+    follower_id = decode_access_token(token).get("id")
+    _validate_user_id(user_id)
+    database = await _database()
+    result = await database.follows_collection.delete_one(
+        {"follower_id": ref(follower_id), "followee_id": ref(user_id)}
+    )
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="User is not followed")
+    return {"message": "Unfollowed user"}
+
+
+@router.get("/feed", response_model=PostPage, tags=["Feed"])
+async def get_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return, e.g. _id,title"),
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Endpoint to list posts from the authors the user follows, newest first.
+
+    Each followed author contributes one index-bounded page of at most
+    `limit + 1` posts; the sorted pages are k-way merged, so no query has to
+    sort a large `$in` result set. Only the MAX_FEED_AUTHORS (500) most
+    recently followed authors are read: posts of authors followed before
+    them are left out of the feed.
+
+    Args:
+    - limit (int): Page size.
+    - cursor (Optional[str]): Cursor of the next page.
+    - fields (Optional[str]): Post fields to read and return; all of them by default.
+    - token (str): OAuth2 token for authentication.
+
+    Returns:
+    - PostPage: Posts and the cursor of the next page, if any.
+
+    Raises:
+    - HTTPException: 400 for an invalid cursor or field, 500 if the database is unavailable.
+    """
+    follower_id = decode_access_token(token).get("id")
+    selected, projection = _select_fields(fields)
+    database = await _database()
+
+    follows = await database.follows_collection.find(
+        {"follower_id": ref(follower_id)}, {"followee_id": 1}
+    ).sort("created_at", -1).limit(MAX_FEED_AUTHORS).to_list(length=None)
+
+    semaphore = asyncio.Semaphore(FEED_QUERY_CONCURRENCY)
+
+    async def author_page(author_id: str) -> List[dict]:
+        async with semaphore:
+            return await fetch_author_posts(database, author_id, limit, cursor, projection)
+
+    try:
+        pages = await asyncio.gather(*(author_page(follow["followee_id"]) for follow in follows))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    merged = heapq.merge(*pages, key=lambda post: (post["created_at"], post["_id"]), reverse=True)
+    return _page(list(islice(merged, limit + 1)), limit, selected)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from src.utils.warmup import readiness
+
+router = APIRouter()
+
+
+@router.get("/health/live", response_model=dict, tags=["Health"])
+async def liveness():
+    """
+    Endpoint reporting that the process is up and serving requests.
+
+    Returns:
+    - dict: Liveness status.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=dict, tags=["Health"])
+async def readiness_check():
+    """
+    Endpoint reporting whether the instance may receive traffic.
+
+    Readiness flips once the startup warmup (settings, database connection,
+    index checks, search and autocomplete index loads,
+    trending posts ranking, profanity word list, JWT, schemas and one
+    synthetic request per router) has succeeded.
+
+    Returns:
+    - JSONResponse: 200 with the warmup report when ready, 503 while warming up.
+    """
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
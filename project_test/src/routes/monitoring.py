@@ -0,0 +1,140 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.monitoring.metrics import registry
+from src.middleware.admission import admission_controller
+from src.utils.comment_broker import comment_broker
+from src.utils.post_cache import post_cache
+from src.utils.background import background_tasks
+from src.utils.search_index import search_index
+from src.utils.autocomplete import autocomplete
+from src.utils.trending import trending_posts
+from src.utils.singleflight import comment_reads, post_reads
+from src.utils.front_page import front_page
+from src.routes.posts import front_page_reads
+
+router = APIRouter()
+
+
+@registry.register_collector
+def _component_metrics():
+    """
+    Exposes counters owned by the cache, the comment broker, admission control, background tasks,
+    the search and autocomplete indexes, the trending posts ranking, the first-page snapshot
+    and read coalescing.
+    """
+    cache = post_cache.stats()
+    yield "post_cache_entries", "Entries held by the hot-post cache.", "gauge", [({}, cache["size"])]
+    yield "post_cache_lookups_total", "Hot-post cache lookups by result.", "counter", [
+        ({"result": "hit"}, cache["hits"]),
+        ({"result": "negative_hit"}, cache["negative_hits"]),
+        ({"result": "miss"}, cache["misses"]),
+    ]
+    broker = comment_broker.stats()
+    yield "comment_stream_subscribers", "Active live comment stream subscribers.", "gauge", [
+        ({}, broker["subscribers"])
+    ]
+    yield "comment_stream_dropped_total", "Slow comment stream subscribers dropped.", "counter", [
+        ({}, broker["dropped"])
+    ]
+    groups = admission_controller.stats()
+    yield "admission_waiting", "Requests waiting for an admission slot.", "gauge", [
+        ({"group": name}, group["waiting"]) for name, group in groups.items()
+    ]
+    yield "admission_shed_total", "Requests shed by admission control.", "counter", [
+        ({"group": name, "reason": reason}, group[f"shed_{reason}"])
+        for name, group in groups.items()
+        for reason in ("queue_full", "timeout")
+    ]
+    tasks = background_tasks.stats()
+    yield "background_tasks_running", "Background tasks (auto-replies) in flight.", "gauge", [
+        ({}, tasks["running"])
+    ]
+    yield "background_tasks_finished_total", "Background tasks that did not complete normally.", "counter", [
+        ({"outcome": "failed"}, tasks["failed"]),
+        ({"outcome": "cancelled"}, tasks["cancelled"]),
+    ]
+    search = search_index.stats()
+    yield "search_index_documents", "Posts and comments in the search index.", "gauge", [
+        ({"kind": "post"}, search["posts"]),
+        ({"kind": "comment"}, search["comments"]),
+    ]
+    suggestions = autocomplete.stats()
+    yield "autocomplete_entries", "Usernames and post titles in the autocomplete index.", "gauge", [
+        ({"kind": "user"}, suggestions["users"]),
+        ({"kind": "post"}, suggestions["posts"]),
+    ]
+    yield "trending_posts_tracked", "Posts with recent comment activity tracked for trending.", "gauge", [
+        ({}, trending_posts.stats()["posts"])
+    ]
+    pages = front_page.stats()
+    yield "front_page_requests_total", "First-page requests by source: snapshot or reload.", "counter", [
+        ({"source": "snapshot"}, pages["served"]),
+        ({"source": "reload"}, pages["loads"]),
+    ]
+    yield "front_page_updates_total", "Posts spliced into the first-page snapshot.", "counter", [
+        ({}, pages["updates"])
+    ]
+    flights = {flight.name: flight.stats() for flight in (post_reads, comment_reads, front_page_reads)}
+    yield "singleflight_requests_total", "Coalesced read requests by outcome.", "counter", [
+        ({"route": name, "outcome": outcome}, stats[outcome])
+        for name, stats in flights.items()
+        for outcome in ("executed", "coalesced", "rejected")
+    ]
+    yield "singleflight_in_flight", "Coalesced reads currently in flight.", "gauge", [
+        ({"route": name}, stats["in_flight"]) for name, stats in flights.items()
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+async def get_metrics():
+    """
+    Endpoint exposing all metrics in the Prometheus text format.
+
+    Returns:
+    - PlainTextResponse: Prometheus exposition text.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/api/monitoring/post-cache", response_model=dict, tags=["Monitoring"])
+async def get_post_cache_stats():
+    """
+    Endpoint to report hit-rate and size metrics of the hot-post cache.
+
+    Returns:
+    - dict: Cache counters.
+    """
+    return post_cache.stats()
+
+
+@router.get("/api/monitoring/comment-stream", response_model=dict, tags=["Monitoring"])
+async def get_comment_stream_stats():
+    """
+    Endpoint to report subscriber and fan-out counters of the live comment stream.
+
+    Returns:
+    - dict: Broker counters.
+    """
+    return comment_broker.stats()
+
+
+@router.get("/api/monitoring/admission", response_model=dict, tags=["Monitoring"])
+async def get_admission_stats():
+    """
+    Endpoint to report concurrency, queue and shed counters per route group.
+
+    Returns:
+    - dict: Admission counters keyed by route group.
+    """
+    return admission_controller.stats()
+
+
+@router.get("/api/monitoring/singleflight", response_model=dict, tags=["Monitoring"])
+async def get_singleflight_stats():
+    """
+    Endpoint to report executed versus coalesced reads per coalesced route.
+
+    Returns:
+    - dict: Coalescing counters keyed by route.
+    """
+    return {flight.name: flight.stats() for flight in (post_reads, comment_reads, front_page_reads)}
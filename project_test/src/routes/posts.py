@@ -1,15 +1,33 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
-from src.models.models import Post, PostCreate, PostInDB
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import Optional, Tuple
+from src.models.models import Post, PostCreate, PostInDB, TrendingPostResponse
 from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import INTERACTIVE_WRITE
 from src.utils.jwt_utils import decode_access_token
 from jose.exceptions import ExpiredSignatureError
 from fastapi.security import OAuth2PasswordBearer
 from src.routes.comments import send_delayed_reply
-import asyncio
 from bson import ObjectId
 import logging
 from better_profanity import profanity
+from fastapi.encoders import jsonable_encoder
+import json
+from src.monitoring.metrics import moderation_duration_seconds
+from src.utils.post_cache import CachedPost, MISSING, post_cache
+from src.utils.background import background_tasks
+from src.utils.search_index import search_index
+from src.utils.autocomplete import autocomplete
+from src.utils.trending import trending_posts
+from src.utils.singleflight import SingleFlight, SingleFlightFull, post_reads
+from src.utils.front_page import FrontPageSnapshot, front_page
+from src.utils.pagination import NEWEST_FIRST, after_cursor, encode_cursor, utcnow_ms
+from src.utils.fields import fields_projection, render_fields, select_fields
+from src.utils.http_cache import (
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -17,6 +35,180 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def serialize_post(post: dict) -> CachedPost:
+    """
+    Serializes a post document into cacheable JSON bytes with its validators.
+
+    Args:
+    - post (dict): Post document as stored in MongoDB.
+
+    Returns:
+    - CachedPost: Encoded post body, ETag and modification time.
+    """
+    payload = PostInDB(**{
+        **post,
+        "_id": str(post["_id"]),
+        "author_id": str(post["author_id"])
+    }).dict(by_alias=True)
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+    return CachedPost(
+        body=body,
+        etag=make_etag(post["_id"], post["updated_at"]),
+        updated_at=post["updated_at"],
+    )
+
+
+async def fetch_post(post_id: str):
+    """
+    Reads a visible post into the hot-post cache.
+
+    Args:
+    - post_id (str): The ID of the post.
+
+    Returns:
+    - Union[CachedPost, object]: The cached post, or MISSING if it does not exist or is blocked.
+    """
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+    # A write or delete invalidating the post during the read keeps this result out of the cache
+    generation = post_cache.generation()
+    post = await database.posts_collection.find_one({"_id": ObjectId(post_id), "blocked": False})
+    if post is None:
+        post_cache.set_missing(post_id, generation)
+        return MISSING
+    return post_cache.set(post_id, serialize_post(post), generation)
+
+
+async def fetch_post_fields(post_id: str, fields: Tuple[str, ...]) -> Optional[CachedPost]:
+    """
+    Reads the selected fields of a visible post, bypassing the hot-post cache.
+
+    Args:
+    - post_id (str): The ID of the post.
+    - fields (Tuple[str, ...]): Selected fields.
+
+    Returns:
+    - Optional[CachedPost]: The encoded fields, or None if the post does not exist or is blocked.
+    """
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+    post = await database.posts_collection.find_one(
+        {"_id": ObjectId(post_id), "blocked": False},
+        fields_projection(PostInDB, fields, ["updated_at"]),
+    )
+    if post is None:
+        return None
+    return CachedPost(
+        body=json.dumps(render_fields(PostInDB, fields, post), separators=(",", ":")).encode("utf-8"),
+        etag=make_etag(post["_id"], post["updated_at"], *fields),
+        updated_at=post["updated_at"],
+    )
+
+
+def select_post_fields(cached: CachedPost, fields: Tuple[str, ...]) -> CachedPost:
+    """
+    Cuts the selected fields out of a cached post.
+
+    The selection is a different representation of the post, so the ETag
+    covers the selected fields as well.
+
+    Args:
+    - cached (CachedPost): Cached full post.
+    - fields (Tuple[str, ...]): Selected fields.
+
+    Returns:
+    - CachedPost: The encoded fields with their own ETag and the post's modification time.
+    """
+    post = json.loads(cached.body)
+    body = json.dumps({name: post[name] for name in fields}, separators=(",", ":")).encode("utf-8")
+    return CachedPost(
+        body=body, etag=make_etag(post["_id"], cached.updated_at, *fields), updated_at=cached.updated_at
+    )
+
+
+# Reloads of the first page triggered by concurrent requests share one query
+front_page_reads = SingleFlight("front_page")
+
+
+async def fetch_posts_page(limit: int, cursor: Optional[str] = None, projection: Optional[dict] = None) -> list:
+    """
+    Reads one page (plus one look-ahead post) of the newest non-blocked posts.
+
+    Args:
+    - limit (int): Page size.
+    - cursor (Optional[str]): Cursor of the previous page.
+    - projection (Optional[dict]): Fields to read; all of them by default.
+
+    Returns:
+    - list: Up to `limit + 1` post documents, newest first.
+    """
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise HTTPException(status_code=500, detail="Failed to connect to the database")
+    query = {"blocked": False, **after_cursor(cursor)}
+    return await database.posts_collection.find(query, projection).sort(NEWEST_FIRST).limit(limit + 1).to_list(
+        length=None
+    )
+
+
+async def load_front_page() -> FrontPageSnapshot:
+    """
+    Reloads the first page of posts from MongoDB.
+
+    Returns:
+    - FrontPageSnapshot: The new snapshot.
+    """
+    posts = await fetch_posts_page(front_page.size)
+    return front_page.load([(post, serialize_post(post).body) for post in posts])
+
+
+def posts_response(body: bytes, next_cursor: Optional[str], headers: Optional[dict] = None) -> Response:
+    """
+    Builds the response of a page of posts from its encoded body.
+
+    Args:
+    - body (bytes): Encoded JSON list of posts.
+    - next_cursor (Optional[str]): Cursor of the next page, sent as X-Next-Cursor; None on the last page.
+    - headers (Optional[dict]): Additional headers, such as validators.
+
+    Returns:
+    - Response: JSON response.
+    """
+    headers = dict(headers or {})
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def front_page_response(request: Request, snapshot: FrontPageSnapshot) -> Response:
+    """
+    Serves the first page of posts from its pre-encoded snapshot.
+
+    Clients accepting gzip get the compressed body, when the snapshot has
+    one. A matching If-None-Match / If-Modified-Since yields a 304.
+
+    Args:
+    - request (Request): Incoming request, inspected for Accept-Encoding and cache validators.
+    - snapshot (FrontPageSnapshot): Current first page.
+
+    Returns:
+    - Response: The page, or a 304 Not Modified response.
+    """
+    body, etag, headers = snapshot.body, snapshot.etag, {"Vary": "Accept-Encoding"}
+    if snapshot.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        # Each encoding is a different representation with its own strong ETag
+        body, etag = snapshot.gzipped, snapshot.etag[:-1] + '-gzip"'
+        headers["Content-Encoding"] = "gzip"
+    if is_not_modified(request, etag, snapshot.last_modified):
+        response = not_modified_response(etag, snapshot.last_modified)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+    headers.update(validator_headers(etag, snapshot.last_modified))
+    return posts_response(body, snapshot.next_cursor, headers)
+
+
 @router.post("/posts/", response_model=PostInDB)
 async def create_post(
     post: PostCreate,
@@ -35,14 +227,17 @@ async def create_post(
         if not mongo_url:
             raise HTTPException(status_code=500, detail="Failed to get MongoDB URL")
 
-        database = await connect_to_database_mongo(mongo_url)
+        database = await connect_to_database_mongo(mongo_url, profile=INTERACTIVE_WRITE)
         if not database:
             raise HTTPException(status_code=500, detail="Failed to connect to MongoDB")
 
         try:
             # Create a new ObjectId for the post
             post_id = ObjectId()
-            is_blocked = profanity.contains_profanity(post.content)
+            # Stored precision, so the post spliced into the front page matches it once read back
+            now = utcnow_ms()
+            with moderation_duration_seconds.time("post"):
+                is_blocked = profanity.contains_profanity(post.content)
             post_obj = PostInDB(
                 id=str(post_id),
                 title=post.title,
@@ -50,22 +245,30 @@ async def create_post(
                 author_id=str(ObjectId(author_id)),
                 auto_reply_enabled=post.auto_reply_enabled,
                 auto_reply_delay=post.auto_reply_delay,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
+                created_at=now,
+                updated_at=now,
                 blocked=is_blocked
             )
 
             # Convert fields back to ObjectId for database insertion
             post_data = post_obj.dict(by_alias=True)
             post_data["_id"] = ObjectId(post_data["_id"])
+            post_data["author_id"] = ObjectId(post_data["author_id"])
 
             # Insert the post into the database
             await database.posts_collection.insert_one(post_data)
+            post_cache.invalidate(post_obj.id)
+            if not is_blocked:
+                front_page.add(post_data, serialize_post(post_data).body)
+            # Blocked posts are left out of the search index by moderation
+            search_index.add_post(post_data)
+            if not is_blocked:
+                autocomplete.record_post(post_data)
 
             # Handle auto-reply if enabled
             if post.auto_reply_enabled:
                 delay = post.auto_reply_delay or 60
-                asyncio.create_task(send_delayed_reply(post_obj.id, None, delay))
+                background_tasks.spawn(send_delayed_reply(post_obj.id, None, delay), name=f"auto-reply:{post_obj.id}")
 
             return post_obj
         finally:
@@ -84,13 +287,54 @@ async def create_post(
 
 
 
+# Registered before /posts/{post_id}, which would otherwise match "trending"
+@router.get("/posts/trending", response_model=list[TrendingPostResponse])
+async def get_trending_posts(limit: int = Query(20, ge=1, le=trending_posts.top_k)):
+    """
+    Endpoint to list posts ranked by recent comment activity.
+
+    Each comment counts 1 when new and half as much every half-life
+    (`[trending]` in `settings.ini`). Scores are maintained as comments are
+    created, so the ranking is served from memory without querying MongoDB.
+
+    Args:
+    - limit (int): Maximum number of posts.
+
+    Returns:
+    - list[TrendingPostResponse]: Posts by descending score.
+
+    Raises:
+    - HTTPException: 503 while the ranking is loading.
+    """
+    if not trending_posts.loaded:
+        raise HTTPException(status_code=503, detail="Trending posts are loading", headers={"Retry-After": "5"})
+    return [TrendingPostResponse(**post._asdict()) for post in trending_posts.top(limit)]
+
+
 @router.get("/posts/{post_id}", response_model=PostInDB)
-async def get_post(post_id: str):
+async def get_post(
+    post_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. _id,title"),
+):
     """
     Endpoint to retrieve a specific post by ID if it is not blocked.
 
+    Posts are served from the in-process hot-post cache when possible; misses
+    (including ids known not to exist) are cached as well. Concurrent misses
+    for the same post share one database read. Supports conditional
+    requests: the ETag is derived from the post's `_id` and `updated_at`, and a
+    matching If-None-Match / If-Modified-Since yields a 304, computed from the
+    cached post or from the shared read on a miss.
+
+    With `fields`, only the selected fields are returned: they are cut from
+    the cached post, or read with a projection on a cache miss (which does
+    not fill the cache).
+
     Args:
     - post_id (str): The ID of the post to retrieve.
+    - request (Request): Incoming request, inspected for cache validators.
+    - fields (Optional[str]): Fields to return; all of them by default.
 
     Returns:
     - PostInDB: The requested post.
@@ -101,65 +345,107 @@ async def get_post(post_id: str):
     try:
         if not ObjectId.is_valid(post_id):
             raise HTTPException(status_code=400, detail="Invalid ObjectId format")
+        try:
+            selected = select_fields(PostInDB, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        mongo_url = await get_mongo_url()
-        database = await connect_to_database_mongo(mongo_url)
+        cached = post_cache.get(post_id)
+        if cached is MISSING:
+            raise HTTPException(status_code=404, detail="Post not found or is blocked")
 
-        if not database:
-            raise HTTPException(status_code=500, detail="Failed to connect to the database")
+        if cached is None:
+            # One read serves the body and the validators, so a conditional miss costs no extra query
+            try:
+                if selected:
+                    generation = post_cache.generation()
+                    cached = await post_reads.do((post_id, selected), lambda: fetch_post_fields(post_id, selected))
+                    if cached is None:
+                        post_cache.set_missing(post_id, generation)
+                        raise HTTPException(status_code=404, detail="Post not found or is blocked")
+                else:
+                    cached = await post_reads.do(post_id, lambda: fetch_post(post_id))
+                    if cached is MISSING:
+                        raise HTTPException(status_code=404, detail="Post not found or is blocked")
+            except SingleFlightFull:
+                raise HTTPException(status_code=503, detail="Too many concurrent requests", headers={"Retry-After": "1"})
+        elif selected:
+            cached = select_post_fields(cached, selected)
 
-        try:
-            post = await database.posts_collection.find_one({"_id": ObjectId(post_id), "blocked": False})
-            if post is None:
-                raise HTTPException(status_code=404, detail="Post not found or is blocked")
-
-            return PostInDB(**{
-                **post,
-                "_id": str(post["_id"]),
-                "author_id": str(post["author_id"])
-            }).dict(by_alias=True)
-        finally:
-            if database:
-                try:
-                    await database.close()
-                except Exception as e:
-                    logger.error(f"Error closing MongoDB client: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Failed to close MongoDB client")
+        if is_not_modified(request, cached.etag, cached.updated_at):
+            return not_modified_response(cached.etag, cached.updated_at)
+
+        return Response(
+            content=cached.body,
+            media_type="application/json",
+            headers=validator_headers(cached.etag, cached.updated_at),
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/posts/", response_model=list[PostInDB])
-async def get_posts():
+async def get_posts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; defaults to the front page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. _id,title"),
+):
     """
-    Endpoint to retrieve all posts that are not blocked.
+    Endpoint to retrieve non-blocked posts, newest first, one page at a time.
+
+    The first page is served from a pre-encoded snapshot (gzip-compressed
+    when the client accepts it) without querying MongoDB. It is updated when
+    this worker creates a post and reloaded once it is older than
+    `[front_page] MAX_STALENESS_SECONDS` or a listed post is deleted. The
+    cursor of the next page is returned in the X-Next-Cursor header.
+
+    With `fields`, only the selected fields are read from MongoDB and
+    returned; such pages are not served from the snapshot.
+
+    Args:
+    - request (Request): Incoming request, inspected for cache validators and Accept-Encoding.
+    - limit (Optional[int]): Page size.
+    - cursor (Optional[str]): Cursor of the previous page.
+    - fields (Optional[str]): Fields to return; all of them by default.
 
     Returns:
-    - list[PostInDB]: List of all non-blocked posts.
+    - list[PostInDB]: One page of non-blocked posts.
 
     Raises:
-    - HTTPException: If connection to MongoDB fails or any other unexpected error occurs.
+    - HTTPException: 400 for an invalid cursor or field, 500 if connection to MongoDB fails
+      or any other unexpected error occurs.
     """
     try:
-        mongo_url = await get_mongo_url()
-        database = await connect_to_database_mongo(mongo_url)
+        try:
+            selected = select_fields(PostInDB, fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        if not database:
-            raise HTTPException(status_code=500, detail="Failed to connect to the database")
+        if cursor is None and limit in (None, front_page.size) and not selected:
+            snapshot = front_page.current() or await front_page_reads.do("front_page", load_front_page)
+            return front_page_response(request, snapshot)
 
+        limit = limit or front_page.size
+        projection = fields_projection(PostInDB, selected, ["created_at"]) if selected else None
         try:
-            posts = await database.posts_collection.find({"blocked": False}).to_list(length=None)
-            return [PostInDB(**{
-                **post,
-                "_id": str(post["_id"]),
-                "author_id": str(post["author_id"])
-            }).dict(by_alias=True) for post in posts]
-        finally:
-            if database:
-                try:
-                    await database.close()
-                except Exception as e:
-                    logger.error(f"Error closing MongoDB client: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Failed to close MongoDB client")
+            posts = await fetch_posts_page(limit, cursor, projection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = encode_cursor(posts[-1]["created_at"], posts[-1]["_id"])
+        if selected:
+            body = json.dumps(
+                [render_fields(PostInDB, selected, post) for post in posts], separators=(",", ":")
+            ).encode("utf-8")
+        else:
+            body = b"[" + b",".join(serialize_post(post).body for post in posts) + b"]"
+        return posts_response(body, next_cursor)
+    except SingleFlightFull:
+        raise HTTPException(status_code=503, detail="Too many concurrent requests", headers={"Retry-After": "1"})
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import INTERACTIVE_WRITE
 from src.models.models import UserCreate
+from pymongo.errors import DuplicateKeyError
+from src.utils.autocomplete import autocomplete
 import logging
 import re
 
@@ -74,25 +77,28 @@ async def registration(
             raise HTTPException(status_code=400, detail="Invalid password format")
 
         url = await get_mongo_url()
-        database = await connect_to_database_mongo(url)
+        database = await connect_to_database_mongo(url, profile=INTERACTIVE_WRITE)
 
         if database:
             try:
-                existing_user = await database.users_collection.find_one(
-                    {"email": email}
-                )
-                if existing_user:
-                    raise HTTPException(
-                        status_code=400, detail="User already registered"
-                    )
-
                 user_data = {
                     "username": name,
                     "email": email,
                     "password": user_create.password,
                 }
 
-                await database.save_user(user_data)
+                # The unique index on the normalized email rejects duplicates in the same round trip
+                try:
+                    inserted_id = await database.save_user(user_data)
+                except DuplicateKeyError:
+                    raise HTTPException(
+                        status_code=400, detail="User already registered"
+                    )
+                if not inserted_id:
+                    raise HTTPException(
+                        status_code=500, detail="Failed to register user"
+                    )
+                autocomplete.users.add(str(inserted_id), name)
 
                 return {"message": "User successfully registered."}
             finally:
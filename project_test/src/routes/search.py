@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+import logging
+from src.models.models import SearchHit, SearchResponse
+from src.utils.search_index import KINDS, search_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Maps the `type` query parameter to indexed document kinds
+SEARCH_TYPES = {"all": KINDS, "posts": ("post",), "comments": ("comment",)}
+MAX_QUERY_LENGTH = 256
+
+
+@router.get("/search", response_model=SearchResponse, tags=["Search"])
+async def search(
+    q: str = Query(..., min_length=1, max_length=MAX_QUERY_LENGTH,
+                   description='Terms, prefix terms (`comm*`) and quoted phrases (`"exact words"`)'),
+    type: str = Query("all", description="all, posts or comments"),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """
+    Endpoint to search non-blocked posts and comments ranked by relevance.
+
+    Every term, prefix and phrase of the query must match. Matches are marked
+    with <mark> in the HTML-escaped highlight snippets.
+
+    Args:
+    - q (str): Search query.
+    - type (str): Restricts results to posts or comments.
+    - limit (int): Page size.
+    - cursor (Optional[str]): Cursor of the next page.
+
+    Returns:
+    - SearchResponse: Page of hits and the cursor of the next page, if any.
+
+    Raises:
+    - HTTPException: 400 for an unknown type or invalid cursor, 503 while the index is loading.
+    """
+    kinds = SEARCH_TYPES.get(type)
+    if kinds is None:
+        raise HTTPException(status_code=400, detail="type must be one of: all, posts, comments")
+    if not search_index.loaded:
+        raise HTTPException(status_code=503, detail="Search index is loading", headers={"Retry-After": "5"})
+
+    try:
+        hits, next_cursor = search_index.search(q, kinds, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return SearchResponse(results=[SearchHit(**hit) for hit in hits], next_cursor=next_cursor)
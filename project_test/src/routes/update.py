@@ -2,11 +2,16 @@ import secrets
 from fastapi import APIRouter, Depends, Header, HTTPException, Body
 from fastapi.security import OAuth2PasswordBearer
 from src.database.connect import Database, connect_to_database_mongo, get_mongo_url
+from src.database.profiles import INTERACTIVE_WRITE
 from src.utils.jwt_utils import decode_access_token
 from src.routes.registration import is_valid_password, is_valid_email
 from bson import ObjectId
 from jose.exceptions import ExpiredSignatureError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.utils.autocomplete import autocomplete
 import time
+from datetime import datetime
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -32,6 +37,7 @@ async def update_username_in_db(
     await database.users_collection.update_one(
         {"_id": user_id}, {"$set": {"username": new_name}}
     )
+    autocomplete.users.rename(str(user_id), new_name)
     timestamp = int(time.time())
     document_to_insert = {
         "user": user_id,
@@ -39,6 +45,8 @@ async def update_username_in_db(
         "state_before": current_name,
         "state_after": new_name,
         "timestamp": timestamp,
+        # Real date for the retention TTL index; the integer timestamp is kept for readers
+        "created_at": datetime.utcfromtimestamp(timestamp),
     }
     await database.journal_username_collection.insert_one(document_to_insert)
     return {"message": "Username updated"}
@@ -63,7 +71,7 @@ async def update_username(
     """
     try:
         user_data = decode_access_token(token)
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
         if not database:
             raise HTTPException(
                 status_code=500, detail="Failed to connect to the database"
@@ -112,6 +120,7 @@ async def update_password_in_db(
         "state_before": "***",
         "state_after": "***",
         "timestamp": timestamp,
+        "created_at": datetime.utcfromtimestamp(timestamp),
     }
     await database.journal_password_collection.insert_one(document_to_insert)
     return {"message": "Password updated"}
@@ -140,7 +149,7 @@ async def update_password(
     """
     try:
         user_data = decode_access_token(token)
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
         if not database:
             raise HTTPException(
                 status_code=500, detail="Failed to connect to the database"
@@ -171,16 +180,26 @@ async def update_email_in_db(
     - dict: Success message upon email update.
 
     Raises:
-    - HTTPException: If user is not found, email format is invalid, or database connection fails.
+    - HTTPException: If user is not found, email format is invalid, the email is
+      already registered, or database connection fails.
     """
-    user = await database.users_collection.find_one({"_id": user_id})
-    current_email = user.get("email")
     if not is_valid_email(new_email):
         raise HTTPException(status_code=400, detail="Invalid email format")
     new_email = new_email.lower()
-    await database.users_collection.update_one(
-        {"_id": user_id}, {"$set": {"email": new_email}}
-    )
+    # One round trip: the previous email comes back with the update, duplicates
+    # are rejected by the unique index on the normalized email
+    try:
+        user = await database.users_collection.find_one_and_update(
+            {"_id": user_id},
+            {"$set": {"email": new_email}},
+            projection={"email": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    current_email = user.get("email")
     timestamp = int(time.time())
     document_to_insert = {
         "user": user_id,
@@ -188,6 +207,7 @@ async def update_email_in_db(
         "state_before": current_email,
         "state_after": new_email,
         "timestamp": timestamp,
+        "created_at": datetime.utcfromtimestamp(timestamp),
     }
     await database.journal_email_collection.insert_one(document_to_insert)
     return {"message": "Email updated"}
@@ -216,15 +236,12 @@ async def update_email(
     """
     try:
         user_data = decode_access_token(token)
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=INTERACTIVE_WRITE)
         if not database:
             raise HTTPException(
                 status_code=500, detail="Failed to connect to the database"
             )
         user_id_obj = ObjectId(user_data.get("id"))
-        user = await database.users_collection.find_one({"_id": user_id_obj})
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
         response_message = await update_email_in_db(user_id_obj, new_email, database)
         return response_message
     except HTTPException as e:
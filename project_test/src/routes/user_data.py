@@ -2,6 +2,7 @@ from fastapi import APIRouter, Header, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from src.utils.jwt_utils import decode_access_token
 from src.database.connect import Database, connect_to_database_mongo, get_mongo_url
+from src.database.profiles import FRESH_READ
 from bson import ObjectId
 
 router = APIRouter()
@@ -53,7 +54,7 @@ async def get_user_data_by_field(
         user_data = decode_access_token(token)
 
         # Connect to the MongoDB database
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=FRESH_READ)
 
         if not database:
             raise HTTPException(
@@ -106,7 +107,7 @@ async def get_user_data(
         user_data = decode_access_token(token)
 
         # Connect to the MongoDB database
-        database = await connect_to_database_mongo(await get_mongo_url())
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=FRESH_READ)
 
         if not database:
             raise HTTPException(
@@ -0,0 +1,415 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from src.database.comment_store import comment_store
+from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import ANALYTICS_READ
+from src.utils.background import run_periodic
+
+logger = logging.getLogger(__name__)
+
+# Prefixes up to this length match large ranges; their top-K lists are cached
+CACHED_PREFIX_LENGTH = 2
+# Only the first words of a label can be matched individually
+MAX_WORD_KEYS = 8
+_LAST_CHAR = "\U0010ffff"
+# Writes racing with a refresh may carry slightly older timestamps; re-read this window
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def normalize(text: str) -> str:
+    """
+    Case-folds text and collapses whitespace so lookups ignore case and spacing.
+    """
+    return " ".join((text or "").casefold().split())
+
+
+class Suggestion(NamedTuple):
+    """
+    Autocomplete entry.
+
+    Attributes:
+        id (str): ID of the user or post.
+        text (str): Username or post title as stored.
+        popularity (int): Ranking weight (posts per user, comments per post).
+    """
+
+    id: str
+    text: str
+    popularity: int
+
+
+def _rank(entry: Suggestion) -> tuple:
+    return -entry.popularity, normalize(entry.text), entry.id
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, id) pairs answering prefix lookups with binary search.
+
+    Every label is indexed under its whole normalized text and under each of
+    its first words, so `smi` finds "John Smith". Matches are ranked by
+    popularity; the top-K lists of very short prefixes, which match large
+    ranges, are cached and kept up to date when an entry under them changes.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []
+        self._entries: Dict[str, Suggestion] = {}
+        self._cache: Dict[Tuple[str, int], List[Suggestion]] = {}
+        # Entries removed while a replacement index is being built, re-applied by `replace`
+        self._removed: Optional[Set[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self._entries
+
+    @staticmethod
+    def _keys_for(text: str) -> List[str]:
+        normalized = normalize(text)
+        words = normalized.split(" ")
+        keys = {normalized}
+        for index in range(1, min(len(words), MAX_WORD_KEYS)):
+            keys.add(" ".join(words[index:]))
+        return [key for key in keys if key]
+
+    def _invalidate(self, keys: List[str]) -> None:
+        if not self._cache:
+            return
+        prefixes = {key[:length] for key in keys for length in range(1, CACHED_PREFIX_LENGTH + 1)}
+        for cached in [cached for cached in self._cache if cached[0] in prefixes]:
+            del self._cache[cached]
+
+    def add(self, entry_id: str, text: str, popularity: int = 0) -> None:
+        """
+        Adds an entry or replaces the text and popularity of an existing one.
+        """
+        self._discard(entry_id)
+        keys = self._keys_for(text)
+        for key in keys:
+            bisect.insort(self._keys, (key, entry_id))
+        self._entries[entry_id] = Suggestion(entry_id, text, popularity)
+        self._invalidate(keys)
+
+    def remove(self, entry_id: str) -> None:
+        if self._removed is not None:
+            self._removed.add(entry_id)
+        self._discard(entry_id)
+
+    def _discard(self, entry_id: str) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        keys = self._keys_for(entry.text)
+        for key in keys:
+            index = bisect.bisect_left(self._keys, (key, entry_id))
+            if index < len(self._keys) and self._keys[index] == (key, entry_id):
+                del self._keys[index]
+        self._invalidate(keys)
+
+    def rename(self, entry_id: str, text: str) -> None:
+        entry = self._entries.get(entry_id)
+        self.add(entry_id, text, entry.popularity if entry else 0)
+
+    def bump(self, entry_id: str, delta: int = 1) -> None:
+        """
+        Changes the popularity of an entry; unknown IDs are ignored.
+        """
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        updated = self._entries[entry_id] = entry._replace(popularity=entry.popularity + delta)
+        keys = self._keys_for(entry.text)
+        if delta < 0:
+            # Another entry may now belong in the top K; recompute on the next lookup
+            self._invalidate(keys)
+            return
+
+        # A more popular entry can only move up: patch the cached top-K lists in place
+        prefixes = {key[:length] for key in keys for length in range(1, CACHED_PREFIX_LENGTH + 1)}
+        for (prefix, limit), cached in self._cache.items():
+            if prefix not in prefixes:
+                continue
+            ranked = [item for item in cached if item.id != entry_id] + [updated]
+            ranked.sort(key=_rank)
+            cached[:] = ranked[:limit]
+
+    def load(self, entries: List[Suggestion]) -> None:
+        """
+        Replaces all entries in one pass; not safe to call while the index is being read.
+
+        The served indexes are rebuilt by loading new ones off the event loop and
+        passing them to `replace`.
+        """
+        self._entries = {entry.id: entry for entry in entries}
+        self._keys = sorted((key, entry.id) for entry in entries for key in self._keys_for(entry.text))
+        self._cache = {}
+
+    def track_removals(self) -> None:
+        """
+        Starts recording removed entries, so that `replace` does not bring them back.
+        """
+        self._removed = set()
+
+    def replace(self, other: "PrefixIndex") -> None:
+        """
+        Swaps in the contents of a rebuilt index, then removes the entries removed since `track_removals`.
+
+        Args:
+            other (PrefixIndex): Index loaded from a full read; it must not be used afterwards.
+        """
+        self._entries, self._keys, self._cache = other._entries, other._keys, {}
+        removed, self._removed = self._removed or set(), None
+        for entry_id in removed:
+            self._discard(entry_id)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """
+        Returns the most popular entries with a key starting with `prefix`.
+
+        Args:
+            prefix (str): Typed text.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            List[Suggestion]: Suggestions by descending popularity, then text.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        cacheable = len(prefix) <= CACHED_PREFIX_LENGTH
+        if cacheable and (prefix, limit) in self._cache:
+            return self._cache[(prefix, limit)]
+
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + _LAST_CHAR,))
+        ids = {entry_id for _, entry_id in self._keys[start:end]}
+        result = heapq.nsmallest(
+            limit,
+            (self._entries[entry_id] for entry_id in ids),
+            key=_rank,
+        )
+        if cacheable:
+            self._cache[(prefix, limit)] = result
+        return result
+
+
+class Autocomplete:
+    """
+    Prefix indexes for usernames (ranked by post count) and post titles (ranked by comment count).
+
+    Posts and comments are counted once each: their IDs are remembered until
+    they fall out of the refresh overlap, so the same document read by a
+    refresh and written by this worker is not counted twice.
+    """
+
+    def __init__(self):
+        self.users = PrefixIndex()
+        self.posts = PrefixIndex()
+        self._seen: Dict[str, datetime] = {}
+        self.watermark: Optional[datetime] = None
+        self.rebuilt_at: Optional[float] = None
+        self.loaded = False
+
+    def _first_seen(self, document: dict) -> bool:
+        document_id = str(document["_id"])
+        if document_id in self._seen:
+            return False
+        self._seen[document_id] = document["created_at"]
+        return True
+
+    def record_post(self, post: dict) -> bool:
+        """
+        Adds a non-blocked post and counts it for its author; posts already counted are ignored.
+
+        Returns:
+            bool: False if the post was already counted.
+        """
+        if not self._first_seen(post):
+            return False
+        self.posts.add(str(post["_id"]), post.get("title", ""))
+        self.users.bump(str(post["author_id"]))
+        return True
+
+    def record_comment(self, comment: dict) -> bool:
+        """
+        Counts a non-blocked comment for its post; comments already counted are ignored.
+
+        Returns:
+            bool: False if the comment was already counted.
+        """
+        if not self._first_seen(comment):
+            return False
+        self.posts.bump(str(comment["post_id"]))
+        return True
+
+    def replace(self, users: PrefixIndex, posts: PrefixIndex, watermark: datetime) -> None:
+        """
+        Swaps in rebuilt indexes holding everything created up to `watermark`.
+        """
+        self.users.replace(users)
+        self.posts.replace(posts)
+        # Counts recorded during the rebuild went to the replaced indexes
+        self._seen = {}
+        self.watermark = watermark
+        self.rebuilt_at = time.monotonic()
+        self.loaded = True
+
+    def prune(self) -> None:
+        """
+        Forgets the IDs of posts and comments that can no longer be read twice.
+        """
+        if self.watermark:
+            self._seen = {
+                document_id: created_at for document_id, created_at in self._seen.items()
+                if created_at > self.watermark - REFRESH_OVERLAP
+            }
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "users": len(self.users), "posts": len(self.posts)}
+
+
+def _build_indexes(users: List[dict], posts: List[dict],
+                   comment_counts: List[dict]) -> Tuple[PrefixIndex, PrefixIndex]:
+    # References not migrated to ObjectId yet group separately from migrated ones
+    comments_per_post: Dict[str, int] = {}
+    for row in comment_counts:
+        comments_per_post[str(row["_id"])] = comments_per_post.get(str(row["_id"]), 0) + row["count"]
+    posts_per_author: Dict[str, int] = {}
+    for post in posts:
+        author_id = str(post["author_id"])
+        posts_per_author[author_id] = posts_per_author.get(author_id, 0) + 1
+
+    user_index, post_index = PrefixIndex(), PrefixIndex()
+    user_index.load([
+        Suggestion(str(user["_id"]), user.get("username", ""), posts_per_author.get(str(user["_id"]), 0))
+        for user in users
+    ])
+    post_index.load([
+        Suggestion(str(post["_id"]), post.get("title", ""), comments_per_post.get(str(post["_id"]), 0))
+        for post in posts
+    ])
+    return user_index, post_index
+
+
+async def load_autocomplete(database, index: Optional[Autocomplete] = None) -> int:
+    """
+    Rebuilds both prefix indexes from the database.
+
+    Everything created up to a cutoff is read and counted in a worker thread,
+    and the new indexes are swapped in at once; a refresh then adds what was
+    created after the cutoff, including writes made during the rebuild.
+
+    Args:
+        database (Database): Connected database handle.
+        index (Optional[Autocomplete]): Indexes to rebuild; defaults to the process-wide ones.
+
+    Returns:
+        int: Number of loaded users and posts.
+    """
+    index = index if index is not None else autocomplete
+    cutoff = datetime.utcnow() - REFRESH_OVERLAP
+    index.users.track_removals()
+    index.posts.track_removals()
+    users = await database.users_collection.find(
+        {"_id": {"$lte": ObjectId.from_datetime(cutoff)}}, {"username": 1}
+    ).to_list(length=None)
+    posts = await database.posts_collection.find(
+        {"blocked": False, "created_at": {"$lte": cutoff}}, {"title": 1, "author_id": 1}
+    ).to_list(length=None)
+    comment_counts = await comment_store(database).aggregate([
+        {"$match": {"blocked": False, "created_at": {"$lte": cutoff}}},
+        {"$group": {"_id": "$post_id", "count": {"$sum": 1}}},
+    ]).to_list(length=None)
+
+    index.replace(*await asyncio.to_thread(_build_indexes, users, posts, comment_counts), cutoff)
+    await refresh_autocomplete(database, index)
+    return len(index.users) + len(index.posts)
+
+
+async def refresh_autocomplete(database, index: Optional[Autocomplete] = None) -> int:
+    """
+    Applies the users, username changes, posts and comments created since the last load or refresh.
+
+    Other worker processes write to the same database; this picks up their
+    writes. Deletions made by other workers are dropped by the next rebuild.
+
+    Args:
+        database (Database): Connected database handle.
+        index (Optional[Autocomplete]): Indexes to refresh; defaults to the process-wide ones.
+
+    Returns:
+        int: Number of documents read.
+    """
+    index = index if index is not None else autocomplete
+    started = datetime.utcnow()
+    since = index.watermark
+    users = await database.users_collection.find(
+        {"_id": {"$gt": ObjectId.from_datetime(since)}}, {"username": 1}
+    ).to_list(length=None)
+    renames = await database.journal_username_collection.find(
+        {"created_at": {"$gt": since}}, {"user": 1, "state_after": 1}, sort=[("created_at", 1)]
+    ).to_list(length=None)
+    posts = await database.posts_collection.find(
+        {"blocked": False, "created_at": {"$gt": since}}, {"title": 1, "author_id": 1, "created_at": 1}
+    ).to_list(length=None)
+    comments = await comment_store(database).find(
+        {"blocked": False, "created_at": {"$gt": since}}, {"post_id": 1, "created_at": 1}
+    ).to_list(length=None)
+
+    for user in users:
+        if str(user["_id"]) not in index.users:
+            index.users.add(str(user["_id"]), user.get("username", ""))
+    for rename in renames:
+        # Renames of users deleted since are skipped
+        if str(rename["user"]) in index.users:
+            index.users.rename(str(rename["user"]), rename["state_after"])
+    for post in posts:
+        index.record_post(post)
+    for comment in comments:
+        index.record_comment(comment)
+    index.watermark = started - REFRESH_OVERLAP
+    index.prune()
+    return len(users) + len(renames) + len(posts) + len(comments)
+
+
+async def run_autocomplete_sync(refresh_seconds: float, rebuild_seconds: float,
+                                index: Optional[Autocomplete] = None) -> None:
+    """
+    Keeps the indexes in sync with writes made by other worker processes.
+
+    Changes made since the watermark are applied every `refresh_seconds`; a
+    full rebuild every `rebuild_seconds` (0 disables it) drops users and posts
+    deleted elsewhere. Runs until cancelled.
+
+    Args:
+        refresh_seconds (float): Interval between incremental refreshes.
+        rebuild_seconds (float): Interval between full rebuilds.
+        index (Optional[Autocomplete]): Indexes to maintain; defaults to the process-wide ones.
+    """
+    index = index if index is not None else autocomplete
+
+    async def sync() -> None:
+        rebuild = rebuild_seconds > 0 and time.monotonic() - index.rebuilt_at >= rebuild_seconds
+        # Full loads read from the primary: a lagging secondary would miss documents older than the new watermark
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=None if rebuild else ANALYTICS_READ)
+        if not database:
+            return
+        if rebuild:
+            await load_autocomplete(database, index)
+        else:
+            await refresh_autocomplete(database, index)
+
+    await run_periodic("Autocomplete sync", refresh_seconds, sync, lambda: index.loaded)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    Registry of fire-and-forget tasks started by request handlers.
+
+    Keeping a reference to every task prevents it from being garbage-collected
+    mid-flight and lets shutdown wait for the tasks instead of abandoning them.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def spawn(self, coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+        """
+        Starts a coroutine as a tracked background task.
+
+        Args:
+            coro (Coroutine): Coroutine to run.
+            name (Optional[str]): Task name shown in logs.
+
+        Returns:
+            asyncio.Task: The started task.
+        """
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        self.started += 1
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            logger.error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Waits for the running tasks, cancelling those still running after the timeout.
+
+        Tasks spawned while draining are waited for as well.
+
+        Args:
+            timeout (float): Seconds to wait before cancelling.
+
+        Returns:
+            int: Number of tasks cancelled at the deadline.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+
+        pending = set(self._tasks)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Cancelled {len(pending)} background task(s) still running after {timeout}s")
+        return len(pending)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "started": self.started,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
+
+
+async def run_periodic(name: str, interval: float, step: Callable[[], Awaitable[object]],
+                       ready: Callable[[], bool] = lambda: True) -> None:
+    """
+    Runs `step` every `interval` seconds until cancelled; a failed run is logged and the next one proceeds.
+
+    Args:
+        name (str): Name of the job shown in logs.
+        interval (float): Seconds between runs.
+        step (Callable[[], Awaitable[object]]): Coroutine function doing one run.
+        ready (Callable[[], bool]): Runs are skipped while it returns False, e.g. until the
+            startup warmup has loaded the state the job maintains.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if not ready():
+            continue
+        try:
+            await step()
+        except Exception as e:
+            logger.error(f"{name} failed: {str(e)}")
+
+
+background_tasks = BackgroundTasks()
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import signal
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before it is considered a slow consumer
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """
+    A single subscriber to the comment stream of one post.
+
+    Attributes:
+        post_id (str): ID of the post being followed.
+        queue (asyncio.Queue): Bounded queue of pending comment events.
+        dropped (bool): True once the broker disconnected this subscriber for falling behind.
+        closed (bool): True once the broker closed this subscriber because the server is shutting down.
+    """
+
+    def __init__(self, post_id: str, max_queue: int = SUBSCRIBER_QUEUE_SIZE):
+        self.post_id = post_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+        self.closed = False
+
+    @property
+    def ended(self) -> bool:
+        return self.dropped or self.closed
+
+    def _wake(self) -> None:
+        # Replace the pending events with a None so the consumer notices it has ended
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Waits for the next comment event.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait before giving up.
+
+        Returns:
+            Optional[dict]: The next event, or None on timeout or once the subscription has ended.
+        """
+        if self.ended:
+            return None
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return None if self.ended else event
+
+
+class CommentBroker:
+    """
+    In-process publish/subscribe fan-out of new comments, keyed by post ID.
+
+    Publishing never blocks: each subscriber has a bounded queue and a
+    subscriber whose queue is full is dropped so that one slow client cannot
+    hold back the writers or the other subscribers.
+
+    Attributes:
+        closed (bool): True once `close` ended every stream; later subscriptions end at once.
+    """
+
+    def __init__(self, max_queue: int = SUBSCRIBER_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.closed = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, post_id: str) -> Subscription:
+        """
+        Registers a new subscriber for a post.
+
+        Args:
+            post_id (str): ID of the post to follow.
+
+        Returns:
+            Subscription: The new subscription; release it with `unsubscribe`.
+        """
+        subscription = Subscription(post_id, self.max_queue)
+        if self.closed:
+            subscription.closed = True
+            return subscription
+        self._subscribers[post_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Removes a subscriber.
+
+        Args:
+            subscription (Subscription): Subscription returned by `subscribe`.
+        """
+        subscribers = self._subscribers.get(subscription.post_id)
+        if not subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.post_id]
+
+    def publish(self, post_id: str, event: dict) -> None:
+        """
+        Fans a comment event out to every subscriber of the post.
+
+        Args:
+            post_id (str): ID of the post the comment belongs to.
+            event (dict): JSON-serializable comment representation.
+        """
+        self.published += 1
+        for subscription in list(self._subscribers.get(post_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def close(self) -> int:
+        """
+        Ends every subscription, e.g. on shutdown, so that open streams finish instead of
+        holding the server until its graceful timeout.
+
+        Returns:
+            int: Number of closed subscriptions.
+        """
+        self.closed = True
+        subscriptions = [subscription for subscribers in self._subscribers.values() for subscription in subscribers]
+        self._subscribers.clear()
+        for subscription in subscriptions:
+            subscription.closed = True
+            subscription._wake()
+        if subscriptions:
+            logger.info(f"Closed {len(subscriptions)} comment stream subscriber(s)")
+        return len(subscriptions)
+
+    def subscriber_count(self) -> int:
+        """
+        Returns the number of active subscribers across all posts.
+        """
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self) -> dict:
+        """
+        Returns fan-out counters.
+
+        Returns:
+            dict: Broker counters.
+        """
+        return {
+            "subscribers": self.subscriber_count(),
+            "posts": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+    def _drop(self, subscription: Subscription) -> None:
+        logger.warning(f"Dropping slow comment stream subscriber for post_id: {subscription.post_id}")
+        subscription.dropped = True
+        self.dropped += 1
+        self.unsubscribe(subscription)
+        subscription._wake()
+
+
+def close_on_exit_signals(broker: CommentBroker) -> Callable[[], None]:
+    """
+    Closes the broker's streams as soon as the process receives SIGINT or SIGTERM.
+
+    uvicorn waits up to its graceful timeout for open responses, streams
+    included, before it runs the lifespan shutdown; closing the streams when
+    the signal arrives lets it finish right after the in-flight requests.
+    The previous handlers (uvicorn's) still run. Signal handlers can only be
+    set from the main thread; elsewhere this does nothing.
+
+    Args:
+        broker (CommentBroker): Broker whose streams are closed.
+
+    Returns:
+        Callable[[], None]: Restores the previous handlers.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    loop = asyncio.get_running_loop()
+    previous = {}
+
+    def handle(sig, frame):
+        loop.call_soon_threadsafe(broker.close)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        elif handler == signal.SIG_DFL:
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle)
+
+    def restore() -> None:
+        for sig, handler in previous.items():
+            if handler is not None:
+                signal.signal(sig, handler)
+
+    return restore
+
+
+# Process-wide broker shared by the write paths and the stream endpoints
+comment_broker = CommentBroker()
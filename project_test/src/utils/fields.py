@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple, Type
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, create_model
+
+
+def _serialized_names(model: Type[BaseModel]) -> dict:
+    # Name of each field in responses (its alias, e.g. `_id`) to its attribute name
+    return {info.alias or name: name for name, info in model.model_fields.items()}
+
+
+def _document_field(name: str) -> str:
+    # Models expose the MongoDB `_id` as `id`, aliased or not
+    return "_id" if name == "id" else name
+
+
+def select_fields(model: Type[BaseModel], fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Validates a comma-separated `fields` query parameter against a response model.
+
+    Args:
+        model (Type[BaseModel]): Full response model.
+        fields (Optional[str]): Requested field names, as they appear in responses.
+
+    Returns:
+        Optional[Tuple[str, ...]]: The requested names in model order, or None for the
+            full representation.
+
+    Raises:
+        ValueError: If a name is not a field of the model, or no name is given.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    names = _serialized_names(model)
+    unknown = requested - names.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; expected any of {', '.join(names)}")
+    if not requested:
+        raise ValueError("No fields requested")
+    return tuple(name for name in names if name in requested)
+
+
+def fields_projection(model: Type[BaseModel], fields: Tuple[str, ...], required: Iterable[str] = ()) -> dict:
+    """
+    Translates selected fields into a MongoDB projection.
+
+    Args:
+        model (Type[BaseModel]): Full response model.
+        fields (Tuple[str, ...]): Names returned by `select_fields`.
+        required (Iterable[str]): Document fields the route needs besides the selected ones,
+            such as `updated_at` for validators or `created_at` for cursors.
+
+    Returns:
+        dict: Inclusion projection; `_id` is always returned by MongoDB.
+    """
+    names = _serialized_names(model)
+    projection = {_document_field(names[name]): 1 for name in fields}
+    projection.update({field: 1 for field in required})
+    return projection
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Builds (once per field selection) a response model holding only the selected fields.
+
+    Args:
+        model (Type[BaseModel]): Full response model.
+        fields (Tuple[str, ...]): Names returned by `select_fields`.
+
+    Returns:
+        Type[BaseModel]: Model with the same types, defaults and aliases for the selected fields.
+    """
+    names = _serialized_names(model)
+    definitions = {
+        names[name]: (model.model_fields[names[name]].annotation, model.model_fields[names[name]])
+        for name in fields
+    }
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+
+def render_fields(model: Type[BaseModel], fields: Tuple[str, ...], document: dict) -> dict:
+    """
+    Renders the selected fields of a MongoDB document as a JSON-ready dict.
+
+    Args:
+        model (Type[BaseModel]): Full response model.
+        fields (Tuple[str, ...]): Names returned by `select_fields`.
+        document (dict): Document read with `fields_projection`.
+
+    Returns:
+        dict: The selected fields, validated against the model and keyed by their response names.
+    """
+    partial = partial_model(model, fields)
+    values = {}
+    for name, info in partial.model_fields.items():
+        field = _document_field(name)
+        if field in document:
+            value = document[field]
+            values[info.alias or name] = str(value) if isinstance(value, ObjectId) else value
+    return jsonable_encoder(partial(**values).dict(by_alias=True))
@@ -0,0 +1,150 @@
+import gzip
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from src.utils.http_cache import make_etag
+from src.utils.pagination import encode_cursor
+from src.utils.settings import get_settings
+
+
+class FrontPageSnapshot(NamedTuple):
+    """
+    The first page of `GET /posts/`, encoded once for every request that reads it.
+
+    Attributes:
+        body (bytes): JSON array of the posts.
+        gzipped (Optional[bytes]): Gzip-compressed body, if compression is enabled.
+        etag (str): Strong ETag of the page.
+        last_modified (Optional[datetime]): Latest `updated_at` of the listed posts.
+        next_cursor (Optional[str]): Cursor of the second page, or None if there is none.
+    """
+
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    last_modified: Optional[datetime]
+    next_cursor: Optional[str]
+
+
+class FrontPage:
+    """
+    Materialized first page of the newest non-blocked posts.
+
+    Each post is kept as its encoded JSON, so a post created by this worker
+    is spliced in without re-encoding the others. The page is reloaded from
+    MongoDB when it is older than `max_staleness` seconds (posts created by
+    other workers are picked up then) and when an update cannot be applied
+    incrementally, such as a listed post disappearing.
+
+    Attributes:
+        size (int): Posts on the page.
+        max_staleness (float): Seconds after a load during which the page may be served.
+        compress (bool): Whether a gzip copy of the body is kept.
+    """
+
+    def __init__(self, size: int, max_staleness: float, compress: bool):
+        self.size = size
+        self.max_staleness = max_staleness
+        self.compress = compress
+        # (post document, encoded post), newest first; one extra post tells whether a next page exists
+        self._entries: List[Tuple[dict, bytes]] = []
+        self._snapshot: Optional[FrontPageSnapshot] = None
+        self._loaded_at = 0.0
+        self.served = 0
+        self.loads = 0
+        self.updates = 0
+
+    @staticmethod
+    def _position(post: dict) -> tuple:
+        return post["created_at"], str(post["_id"])
+
+    def current(self) -> Optional[FrontPageSnapshot]:
+        """
+        Returns the snapshot if it may be served, or None if it must be reloaded.
+        """
+        if self._snapshot is None or time.monotonic() - self._loaded_at > self.max_staleness:
+            return None
+        self.served += 1
+        return self._snapshot
+
+    def load(self, entries: List[Tuple[dict, bytes]]) -> FrontPageSnapshot:
+        """
+        Replaces the page.
+
+        Args:
+            entries (List[Tuple[dict, bytes]]): Up to `size + 1` newest non-blocked posts,
+                newest first, with their encoded JSON.
+
+        Returns:
+            FrontPageSnapshot: The new snapshot.
+        """
+        self._entries = list(entries[:self.size + 1])
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+        return self._encode()
+
+    def add(self, post: dict, encoded: bytes) -> None:
+        """
+        Splices a newly created, non-blocked post into the page.
+
+        Args:
+            post (dict): Post document.
+            encoded (bytes): JSON encoding of the post as served.
+        """
+        if self._snapshot is None:
+            return
+        position = self._position(post)
+        index = 0
+        while index < len(self._entries) and self._position(self._entries[index][0]) > position:
+            index += 1
+        if index > self.size:
+            return
+        self._entries.insert(index, (post, encoded))
+        del self._entries[self.size + 1:]
+        self.updates += 1
+        self._encode()
+
+    def remove(self, post_id: str) -> None:
+        """
+        Drops a post that was deleted or blocked; the page is reloaded to refill it.
+
+        Args:
+            post_id (str): ID of the post.
+        """
+        if any(str(post["_id"]) == post_id for post, _ in self._entries):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def _encode(self) -> FrontPageSnapshot:
+        page = self._entries[:self.size]
+        body = b"[" + b",".join(encoded for _, encoded in page) + b"]"
+        last = page[-1][0] if page else None
+        self._snapshot = FrontPageSnapshot(
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=6) if self.compress else None,
+            etag=make_etag("front-page", *(f"{post['_id']}:{post['updated_at'].isoformat()}" for post, _ in page)),
+            last_modified=max((post["updated_at"] for post, _ in page), default=None),
+            next_cursor=(
+                encode_cursor(last["created_at"], last["_id"]) if len(self._entries) > self.size else None
+            ),
+        )
+        return self._snapshot
+
+    def stats(self) -> dict:
+        return {
+            "posts": len(self._entries[:self.size]),
+            "loaded": self._snapshot is not None,
+            "served": self.served,
+            "loads": self.loads,
+            "updates": self.updates,
+        }
+
+
+front_page = FrontPage(
+    get_settings().getint("front_page", "size", fallback=20),
+    get_settings().getfloat("front_page", "max_staleness_seconds", fallback=5),
+    get_settings().getboolean("front_page", "gzip", fallback=True),
+)
@@ -0,0 +1,140 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a strong ETag from the given validator parts.
+
+    Args:
+        *parts: Values identifying the representation (e.g. document id and update time).
+
+    Returns:
+        str: Quoted strong ETag value.
+    """
+    raw = "|".join(
+        part.isoformat() if isinstance(part, datetime) else str(part) for part in parts
+    )
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def format_http_date(value: datetime) -> str:
+    """
+    Formats a naive UTC datetime as an HTTP date for the Last-Modified header.
+
+    Args:
+        value (datetime): Naive datetime in UTC, as stored in MongoDB.
+
+    Returns:
+        str: RFC 7231 formatted date.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    Evaluates If-None-Match / If-Modified-Since preconditions for a GET request.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the client did not send an entity tag.
+
+    Args:
+        request (Request): Incoming request.
+        etag (str): Current ETag of the representation.
+        last_modified (Optional[datetime]): Naive UTC modification time, if known.
+
+    Returns:
+        bool: True if a 304 Not Modified response should be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    since = _parse_http_date(if_modified_since)
+    if since is None:
+        return False
+
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def has_conditional_headers(request: Request) -> bool:
+    """
+    Checks whether the request carries any cache validators.
+
+    Args:
+        request (Request): Incoming request.
+
+    Returns:
+        bool: True if If-None-Match or If-Modified-Since is present.
+    """
+    return (
+        "if-none-match" in request.headers or "if-modified-since" in request.headers
+    )
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    """
+    Builds the ETag / Last-Modified response headers.
+
+    Args:
+        etag (str): Current ETag of the representation.
+        last_modified (Optional[datetime]): Naive UTC modification time, if known.
+
+    Returns:
+        dict: Headers to attach to the response.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """
+    Creates an empty 304 Not Modified response carrying the validators.
+
+    Args:
+        etag (str): Current ETag of the representation.
+        last_modified (Optional[datetime]): Naive UTC modification time, if known.
+
+    Returns:
+        Response: 304 response without a body.
+    """
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
@@ -0,0 +1,107 @@
+from typing import Iterable, Union
+
+from bson import ObjectId
+
+from src.utils.settings import get_settings
+
+# Reference fields stored as ObjectId, per collection. Documents written
+# before the migration may still hold them as 24-character strings.
+OBJECT_ID_FIELDS = {
+    "posts": ("author_id",),
+    "comments": ("_id", "post_id", "author_id", "parent_id"),
+    "follows": ("follower_id", "followee_id"),
+}
+
+
+def to_object_id(value: Union[str, ObjectId]) -> ObjectId:
+    """
+    Converts an ID received from a client or read from an older document.
+
+    Args:
+        value (Union[str, ObjectId]): ObjectId or its 24-character hex form.
+
+    Returns:
+        ObjectId: The ID.
+
+    Raises:
+        ValueError: If the value is not a valid ObjectId.
+    """
+    if isinstance(value, ObjectId):
+        return value
+    if not ObjectId.is_valid(value):
+        raise ValueError(f"Invalid ObjectId: {value!r}")
+    return ObjectId(value)
+
+
+def dual_read_enabled() -> bool:
+    """
+    Tells whether references may still be stored as strings (`[ids] DUAL_READ`).
+    """
+    return get_settings().getboolean("ids", "dual_read", fallback=True)
+
+
+def ref(value: Union[str, ObjectId]):
+    """
+    Builds the condition matching a reference field.
+
+    While dual reads are enabled, both stored forms match; the `$in` over two
+    values stays an index lookup (two point ranges).
+
+    Args:
+        value (Union[str, ObjectId]): Referenced ID.
+
+    Returns:
+        The ObjectId, or an `$in` condition over both forms.
+    """
+    object_id = to_object_id(value)
+    if dual_read_enabled():
+        return {"$in": [object_id, str(object_id)]}
+    return object_id
+
+
+def ref_in(values: Iterable[Union[str, ObjectId]]) -> dict:
+    """
+    Builds the condition matching a reference field against several IDs.
+    """
+    object_ids = [to_object_id(value) for value in values]
+    if dual_read_enabled():
+        return {"$in": object_ids + [str(object_id) for object_id in object_ids]}
+    return {"$in": object_ids}
+
+
+def ref_after(field: str, value: Union[str, ObjectId]) -> dict:
+    """
+    Builds the filter selecting IDs greater than `value` in `field`.
+
+    Range comparisons never match across BSON types, so while dual reads are
+    enabled both forms are compared separately.
+
+    Args:
+        field (str): Field holding the reference.
+        value (Union[str, ObjectId]): Lower bound (excluded).
+
+    Returns:
+        dict: Filter fragment to merge into the query.
+    """
+    object_id = to_object_id(value)
+    if dual_read_enabled():
+        return {"$or": [{field: {"$gt": object_id}}, {field: {"$gt": str(object_id)}}]}
+    return {field: {"$gt": object_id}}
+
+
+def normalize_references(collection: str, document: dict) -> dict:
+    """
+    Returns the fields of `document` that still hold string references, converted to ObjectId.
+
+    Args:
+        collection (str): Collection name, a key of OBJECT_ID_FIELDS.
+        document (dict): Stored document.
+
+    Returns:
+        dict: Field name to ObjectId, for every field that needs converting.
+    """
+    return {
+        field: ObjectId(document[field])
+        for field in OBJECT_ID_FIELDS[collection]
+        if isinstance(document.get(field), str) and ObjectId.is_valid(document[field])
+    }
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from bson import ObjectId
+
+
+def utcnow_ms() -> datetime:
+    """
+    Returns the current UTC time truncated to milliseconds, the precision MongoDB stores dates with.
+
+    Documents kept in memory after being written (the front page, caches) then
+    carry the same dates, validators and cursors as when they are read back.
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def encode_cursor(created_at: datetime, document_id) -> str:
+    """
+    Encodes the position of the last item of a page sorted by (created_at, _id) descending.
+
+    Args:
+        created_at (datetime): Creation time of the last item.
+        document_id: `_id` of the last item (ObjectId or string).
+
+    Returns:
+        str: Opaque URL-safe cursor.
+    """
+    payload = [created_at.isoformat(), str(document_id), isinstance(document_id, ObjectId)]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, object]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Cursor sent by the client.
+
+    Returns:
+        Tuple[datetime, object]: Creation time and `_id` of the last item of the previous page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, document_id, is_object_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), ObjectId(document_id) if is_object_id else document_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def after_cursor(cursor: Optional[str]) -> dict:
+    """
+    Builds the filter selecting items strictly after the cursor in (created_at, _id) descending order.
+
+    Args:
+        cursor (Optional[str]): Cursor of the previous page, or None for the first page.
+
+    Returns:
+        dict: Filter fragment to merge into the query (empty for the first page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not cursor:
+        return {}
+    created_at, document_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": document_id}},
+        ]
+    }
+
+
+# Sort order matching `after_cursor`; backed by the (…, created_at, _id) indexes
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
@@ -0,0 +1,211 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional, Union
+
+from src.utils.settings import get_settings
+
+# Cache sizing; posts are small so a few thousand entries stay well under a few MB
+POST_CACHE_MAX_SIZE = 4096
+POST_CACHE_TTL_SECONDS = 30
+POST_CACHE_NEGATIVE_TTL_SECONDS = 5
+
+
+class CachedPost(NamedTuple):
+    """
+    A serialized post ready to be written to the wire.
+
+    Attributes:
+        body (bytes): JSON-encoded post representation.
+        etag (str): Strong ETag of the representation.
+        updated_at (datetime): Last modification time of the post.
+    """
+
+    body: bytes
+    etag: str
+    updated_at: datetime
+
+
+# Sentinel stored for ids known not to exist (or to be blocked)
+MISSING = object()
+
+
+class PostCache:
+    """
+    Bounded LRU cache with TTL for serialized posts, keyed by post ID.
+
+    Missing ids are cached too (negative caching) with a shorter TTL so that
+    repeated lookups of deleted or blocked posts do not reach MongoDB.
+
+    A fill reads the post under the generation returned by `generation` and
+    is dropped by `set` if the post was invalidated since, so a read that
+    raced a write or delete cannot store the old post. Invalidations only
+    reach the cache of the process that made the write.
+    """
+
+    def __init__(
+        self,
+        max_size: int = POST_CACHE_MAX_SIZE,
+        ttl: float = POST_CACHE_TTL_SECONDS,
+        negative_ttl: float = POST_CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            max_size (int): Maximum number of entries kept before evicting the least recently used.
+            ttl (float): Lifetime in seconds of a cached post.
+            negative_ttl (float): Lifetime in seconds of a cached miss.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Generation at which each recently invalidated post was last invalidated
+        self._generation = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        # Latest generation dropped from `_invalidated`; fills started before it are not trusted
+        self._forgotten = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    def generation(self) -> int:
+        """
+        Returns the generation a fill starts under; read the post after calling it and pass it to `set`.
+        """
+        return self._generation
+
+    def _is_stale(self, post_id: str, generation: Optional[int]) -> bool:
+        if generation is None:
+            return False
+        if generation < self._forgotten or self._invalidated.get(post_id, 0) > generation:
+            self.stale_fills += 1
+            return True
+        return False
+
+    def get(self, post_id: str) -> Union[None, CachedPost, object]:
+        """
+        Looks up a post.
+
+        Args:
+            post_id (str): ID of the post.
+
+        Returns:
+            Union[None, CachedPost, object]: The cached post, MISSING for a cached miss,
+            or None if the id is not cached.
+        """
+        entry = self._entries.get(post_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[post_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(post_id)
+        if value is MISSING:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, post_id: str, value: CachedPost, generation: Optional[int] = None) -> CachedPost:
+        """
+        Stores a serialized post, unless it was invalidated after the read started.
+
+        Args:
+            post_id (str): ID of the post.
+            value (CachedPost): Serialized post.
+            generation (Optional[int]): `generation()` taken before the post was read.
+
+        Returns:
+            CachedPost: The value, stored or not.
+        """
+        if not self._is_stale(post_id, generation):
+            self._store(post_id, value, self.ttl)
+        return value
+
+    def set_missing(self, post_id: str, generation: Optional[int] = None) -> None:
+        """
+        Records that a post does not exist or is not visible, unless it was invalidated after the read started.
+
+        Args:
+            post_id (str): ID of the post.
+            generation (Optional[int]): `generation()` taken before the post was read.
+        """
+        if not self._is_stale(post_id, generation):
+            self._store(post_id, MISSING, self.negative_ttl)
+
+    def invalidate(self, post_id: str) -> None:
+        """
+        Drops a post from the cache. Must be called by every write path that changes a post.
+
+        Args:
+            post_id (str): ID of the post.
+        """
+        post_id = str(post_id)
+        self._generation += 1
+        self._invalidated[post_id] = self._generation
+        self._invalidated.move_to_end(post_id)
+        while len(self._invalidated) > self.max_size:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+        if self._entries.pop(post_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_many(self, post_ids: Iterable[str]) -> None:
+        """
+        Drops several posts from the cache.
+
+        Args:
+            post_ids (Iterable[str]): IDs of the posts.
+        """
+        for post_id in post_ids:
+            self.invalidate(post_id)
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns hit-rate and size metrics.
+
+        Returns:
+            dict: Cache counters.
+        """
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_fills": self.stale_fills,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, post_id: str, value, ttl: float) -> None:
+        self._entries[post_id] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(post_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+# Process-wide cache shared by all requests
+post_cache = PostCache(
+    get_settings().getint("post_cache", "max_size", fallback=POST_CACHE_MAX_SIZE),
+    get_settings().getfloat("post_cache", "ttl_seconds", fallback=POST_CACHE_TTL_SECONDS),
+    get_settings().getfloat("post_cache", "negative_ttl_seconds", fallback=POST_CACHE_NEGATIVE_TTL_SECONDS),
+)
@@ -0,0 +1,549 @@
+import asyncio
+import base64
+import bisect
+import html
+import json
+import logging
+import math
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from src.database.comment_store import comment_store
+from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import ANALYTICS_READ
+from src.utils.background import run_periodic
+
+logger = logging.getLogger(__name__)
+
+POST = "post"
+COMMENT = "comment"
+KINDS = (POST, COMMENT)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title occurrences count as this many content occurrences
+TITLE_WEIGHT = 2
+# Bonus multiplier for documents containing a quoted phrase
+PHRASE_BOOST = 1.5
+# Maximum number of vocabulary terms a prefix query expands to
+MAX_PREFIX_EXPANSIONS = 64
+SNIPPET_CHARS = 160
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+# Writes racing with a refresh may carry slightly older timestamps; re-read this window
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+DocKey = Tuple[str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: Tokens in order of appearance.
+    """
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+
+class SearchDocument(NamedTuple):
+    """
+    Indexed post or comment.
+
+    Attributes:
+        kind (str): `post` or `comment`.
+        id (str): Document ID.
+        post_id (str): ID of the post (the document itself for posts).
+        title (str): Post title; empty for comments.
+        content (str): Body text.
+        created_at (datetime): Creation time.
+        length (int): Weighted number of tokens, used for length normalization.
+        title_length (int): Number of title tokens; positions below it belong to the title.
+    """
+
+    kind: str
+    id: str
+    post_id: str
+    title: str
+    content: str
+    created_at: datetime
+    length: int
+    title_length: int
+
+
+class ParsedQuery(NamedTuple):
+    """
+    Search query split into its parts; every part must match.
+
+    Attributes:
+        terms (List[str]): Plain terms.
+        prefixes (List[str]): Terms written with a trailing `*`.
+        phrases (List[List[str]]): Quoted phrases as token lists.
+    """
+
+    terms: List[str]
+    prefixes: List[str]
+    phrases: List[List[str]]
+
+
+def parse_query(text: str) -> ParsedQuery:
+    """
+    Parses `word`, `pref*` and `"exact phrase"` parts.
+
+    Args:
+        text (str): Raw query.
+
+    Returns:
+        ParsedQuery: Parsed query.
+    """
+    terms, prefixes, phrases = [], [], []
+    for phrase, word in _QUERY_RE.findall(text or ""):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            else:
+                terms.extend(tokens)
+        elif word.endswith("*") and tokenize(word):
+            tokens = tokenize(word)
+            terms.extend(tokens[:-1])
+            prefixes.append(tokens[-1])
+        else:
+            terms.extend(tokenize(word))
+    return ParsedQuery(terms, prefixes, phrases)
+
+
+def encode_cursor(score: float, key: DocKey) -> str:
+    payload = json.dumps([score, key[0], key[1]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, DocKey]:
+    """
+    Decodes a pagination cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, kind, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(score), (str(kind), str(doc_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def highlight(text: str, terms: Set[str], width: int = SNIPPET_CHARS) -> Optional[str]:
+    """
+    Returns an HTML-escaped snippet of `text` around the first matched term, with matches marked.
+
+    Args:
+        text (str): Field text.
+        terms (Set[str]): Lowercase tokens to mark.
+        width (int): Approximate snippet length in characters.
+
+    Returns:
+        Optional[str]: Snippet, or None if no term occurs in the text.
+    """
+    spans = [match.span() for match in _TOKEN_RE.finditer(text) if match.group().lower() in terms]
+    if not spans:
+        return None
+
+    start, end = 0, len(text)
+    if len(text) > width:
+        start = max(0, spans[0][0] - width // 3)
+        end = min(len(text), start + width)
+        # Do not cut words in half
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        while end < len(text) and not text[end].isspace():
+            end += 1
+
+    pieces = ["…" if start > 0 else ""]
+    position = start
+    for span_start, span_end in spans:
+        if span_start < start or span_end > end:
+            continue
+        pieces.append(html.escape(text[position:span_start]))
+        pieces.append(HIGHLIGHT_OPEN + html.escape(text[span_start:span_end]) + HIGHLIGHT_CLOSE)
+        position = span_end
+    pieces.append(html.escape(text[position:end]))
+    pieces.append("…" if end < len(text) else "")
+    return "".join(pieces)
+
+
+class SearchIndex:
+    """
+    Incrementally maintained inverted index over non-blocked posts and comments.
+
+    Postings map every term to the positions it occupies in each document.
+    Title tokens come first and are separated from content tokens by a gap,
+    so phrases never span fields. A sorted vocabulary serves prefix queries
+    with binary search. Results are ranked with BM25.
+    """
+
+    def __init__(self):
+        self._reset()
+        self.loaded = False
+        self.watermark: Optional[datetime] = None
+        self.rebuilt_at: Optional[float] = None
+        # Posts removed while a replacement index is being built, re-applied by `replace`
+        self._removed_posts: Optional[Set[str]] = None
+
+    def _reset(self) -> None:
+        self._documents: Dict[DocKey, SearchDocument] = {}
+        self._postings: Dict[str, Dict[DocKey, List[int]]] = {}
+        self._vocabulary: List[str] = []
+        self._comments_by_post: Dict[str, Set[DocKey]] = {}
+        self._total_length = 0
+        # Set while rebuilding: the vocabulary is sorted once at the end instead of per insert
+        self._bulk = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    # Maintenance
+
+    def add(self, kind: str, doc_id: str, post_id: str, title: str, content: str, created_at: datetime) -> None:
+        """
+        Indexes a document, replacing any previous version with the same ID.
+        """
+        key = (kind, doc_id)
+        self.remove(kind, doc_id)
+
+        title_tokens = tokenize(title)
+        content_tokens = tokenize(content)
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(title_tokens):
+            positions.setdefault(token, []).append(position)
+        offset = len(title_tokens) + 1
+        for position, token in enumerate(content_tokens, offset):
+            positions.setdefault(token, []).append(position)
+
+        for token, token_positions in positions.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if not self._bulk:
+                    bisect.insort(self._vocabulary, token)
+            postings[key] = token_positions
+
+        length = TITLE_WEIGHT * len(title_tokens) + len(content_tokens)
+        self._documents[key] = SearchDocument(
+            kind, doc_id, post_id, title or "", content or "", created_at, length, len(title_tokens)
+        )
+        self._total_length += length
+        if kind == COMMENT:
+            self._comments_by_post.setdefault(post_id, set()).add(key)
+
+    def add_post(self, post: dict) -> None:
+        if post.get("blocked"):
+            self.remove(POST, str(post["_id"]))
+            return
+        post_id = str(post["_id"])
+        self.add(POST, post_id, post_id, post.get("title", ""), post.get("content", ""), post["created_at"])
+
+    def add_comment(self, comment: dict) -> None:
+        if comment.get("blocked"):
+            self.remove(COMMENT, str(comment["_id"]))
+            return
+        self.add(COMMENT, str(comment["_id"]), str(comment["post_id"]), "", comment.get("content", ""),
+                 comment["created_at"])
+
+    def remove(self, kind: str, doc_id: str) -> None:
+        key = (kind, doc_id)
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        for token in set(tokenize(document.title)) | set(tokenize(document.content)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                index = bisect.bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    del self._vocabulary[index]
+        if kind == COMMENT:
+            siblings = self._comments_by_post.get(document.post_id)
+            if siblings is not None:
+                siblings.discard(key)
+                if not siblings:
+                    del self._comments_by_post[document.post_id]
+
+    def remove_post(self, post_id: str) -> None:
+        """
+        Removes a post together with its comments.
+        """
+        if self._removed_posts is not None:
+            self._removed_posts.add(post_id)
+        self.remove(POST, post_id)
+        for kind, doc_id in list(self._comments_by_post.get(post_id, ())):
+            self.remove(kind, doc_id)
+
+    def rebuild(self, posts: Iterable[dict], comments: Iterable[dict]) -> None:
+        """
+        Replaces the whole index in one pass; not safe to call while the index is being read.
+
+        The served index is rebuilt by building a new one off the event loop and
+        passing it to `replace`.
+        """
+        self._reset()
+        self._bulk = True
+        for post in posts:
+            self.add_post(post)
+        for comment in comments:
+            self.add_comment(comment)
+        self._vocabulary = sorted(self._postings)
+        self._bulk = False
+        self.loaded = True
+        self.rebuilt_at = time.monotonic()
+
+    def track_removals(self) -> None:
+        """
+        Starts recording removed posts, so that `replace` does not bring them back.
+        """
+        self._removed_posts = set()
+
+    def replace(self, other: "SearchIndex") -> None:
+        """
+        Swaps in the contents of a rebuilt index, then removes the posts removed since `track_removals`.
+
+        Args:
+            other (SearchIndex): Index built from a full read; it must not be used afterwards.
+        """
+        self._documents, self._postings, self._vocabulary = other._documents, other._postings, other._vocabulary
+        self._comments_by_post, self._total_length = other._comments_by_post, other._total_length
+        removed, self._removed_posts = self._removed_posts or set(), None
+        for post_id in removed:
+            self.remove_post(post_id)
+        self.loaded = True
+        self.rebuilt_at = time.monotonic()
+
+    # Querying
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        return self._vocabulary[start:min(end, start + MAX_PREFIX_EXPANSIONS)]
+
+    def _idf(self, term: str) -> float:
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._documents) - frequency + 0.5) / (frequency + 0.5))
+
+    def _term_score(self, term: str, key: DocKey, average_length: float) -> float:
+        positions = self._postings[term].get(key)
+        if not positions:
+            return 0.0
+        document = self._documents[key]
+        frequency = sum(TITLE_WEIGHT if position < document.title_length else 1 for position in positions)
+        norm = K1 * (1 - B + B * document.length / average_length)
+        return self._idf(term) * frequency * (K1 + 1) / (frequency + norm)
+
+    def _has_phrase(self, key: DocKey, phrase: List[str]) -> bool:
+        first = self._postings[phrase[0]][key]
+        following = [set(self._postings[token][key]) for token in phrase[1:]]
+        return any(
+            all(position + offset in positions for offset, positions in enumerate(following, 1))
+            for position in first
+        )
+
+    def search(self, query: str, kinds: Iterable[str] = KINDS, limit: int = 20,
+               cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Ranks documents matching every part of the query.
+
+        Args:
+            query (str): Query with plain terms, `prefix*` terms and `"quoted phrases"`.
+            kinds (Iterable[str]): Document kinds to include.
+            limit (int): Page size.
+            cursor (Optional[str]): Cursor returned with the previous page.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: Hits of the page and the cursor of the next page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        parsed = parse_query(query)
+        after = decode_cursor(cursor) if cursor else None
+
+        # Every part contributes the set of terms that can satisfy it
+        parts: List[List[str]] = [[term] for term in parsed.terms]
+        parts += [self.expand_prefix(prefix) for prefix in parsed.prefixes]
+        for phrase in parsed.phrases:
+            parts += [[token] for token in phrase]
+        if not parts:
+            return [], None
+
+        candidate_sets = []
+        for alternatives in parts:
+            keys: Set[DocKey] = set()
+            for term in alternatives:
+                keys.update(self._postings.get(term, ()))
+            candidate_sets.append(keys)
+        candidate_sets.sort(key=len)
+        candidates = set.intersection(*candidate_sets) if candidate_sets else set()
+        kinds = set(kinds)
+        candidates = {key for key in candidates if key[0] in kinds}
+        candidates = {
+            key for key in candidates
+            if all(self._has_phrase(key, phrase) for phrase in parsed.phrases)
+        }
+
+        average_length = (self._total_length / len(self._documents)) if self._documents else 1.0
+        matched_terms = {term for alternatives in parts for term in alternatives}
+        scored = []
+        for key in candidates:
+            score = sum(
+                max(self._term_score(term, key, average_length) for term in alternatives)
+                for alternatives in parts
+            )
+            if parsed.phrases:
+                score *= PHRASE_BOOST
+            scored.append((round(score, 6), key))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        if after is not None:
+            after_order = (-after[0], after[1])
+            scored = [item for item in scored if (-item[0], item[1]) > after_order]
+
+        page = scored[:limit]
+        hits = []
+        for score, key in page:
+            document = self._documents[key]
+            highlights = {}
+            for field in ("title", "content"):
+                snippet = highlight(getattr(document, field), matched_terms)
+                if snippet:
+                    highlights[field] = snippet
+            hits.append({
+                "kind": document.kind,
+                "id": document.id,
+                "post_id": document.post_id,
+                "score": score,
+                "title": document.title or None,
+                "created_at": document.created_at,
+                "highlights": highlights,
+            })
+        next_cursor = encode_cursor(*page[-1]) if len(scored) > limit else None
+        return hits, next_cursor
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "documents": len(self._documents),
+            "terms": len(self._postings),
+            "posts": sum(1 for kind, _ in self._documents if kind == POST),
+            "comments": sum(1 for kind, _ in self._documents if kind == COMMENT),
+        }
+
+
+# Loading ---------------------------------------------------------------------
+
+_POST_FIELDS = {"title": 1, "content": 1, "created_at": 1, "blocked": 1}
+_COMMENT_FIELDS = {"post_id": 1, "content": 1, "created_at": 1, "blocked": 1}
+
+
+def _build_search_index(posts: List[dict], comments: List[dict]) -> "SearchIndex":
+    index = SearchIndex()
+    index.rebuild(posts, comments)
+    return index
+
+
+async def load_search_index(database, index: Optional["SearchIndex"] = None) -> int:
+    """
+    Rebuilds the index from every non-blocked post and comment.
+
+    The new index is built in a worker thread and swapped in at once, so the
+    event loop keeps serving requests, and searches, from the previous one.
+    Documents written meanwhile are picked up by the next refresh.
+
+    Args:
+        database (Database): Connected database handle.
+        index (Optional[SearchIndex]): Index to rebuild; defaults to the process-wide one.
+
+    Returns:
+        int: Number of indexed documents.
+    """
+    index = index if index is not None else search_index
+    started = datetime.utcnow()
+    index.track_removals()
+    posts = await database.posts_collection.find({"blocked": False}, _POST_FIELDS).to_list(length=None)
+    comments = await comment_store(database).find({"blocked": False}, _COMMENT_FIELDS).to_list(length=None)
+    index.replace(await asyncio.to_thread(_build_search_index, posts, comments))
+    index.watermark = started - REFRESH_OVERLAP
+    return len(index)
+
+
+async def refresh_search_index(database, index: Optional["SearchIndex"] = None) -> int:
+    """
+    Indexes posts and comments created since the last load or refresh.
+
+    Other worker processes write to the same database; this picks up their
+    writes. Documents seen again are re-indexed, which is idempotent.
+
+    Args:
+        database (Database): Connected database handle.
+        index (Optional[SearchIndex]): Index to refresh; defaults to the process-wide one.
+
+    Returns:
+        int: Number of documents read.
+    """
+    index = index if index is not None else search_index
+    started = datetime.utcnow()
+    query = {"blocked": False, "created_at": {"$gt": index.watermark}}
+    posts = await database.posts_collection.find(query, _POST_FIELDS).to_list(length=None)
+    comments = await comment_store(database).find(query, _COMMENT_FIELDS).to_list(length=None)
+    for post in posts:
+        index.add_post(post)
+    for comment in comments:
+        index.add_comment(comment)
+    index.watermark = started - REFRESH_OVERLAP
+    return len(posts) + len(comments)
+
+
+async def run_search_index_sync(refresh_seconds: float, rebuild_seconds: float,
+                                index: Optional["SearchIndex"] = None) -> None:
+    """
+    Keeps the index in sync with writes made by other worker processes.
+
+    Documents created since the watermark are indexed every `refresh_seconds`.
+    Posts and comments are never edited, so only deletions made by other
+    workers need a full rebuild, run every `rebuild_seconds` (0 disables it).
+    Runs until cancelled.
+
+    Args:
+        refresh_seconds (float): Interval between incremental refreshes.
+        rebuild_seconds (float): Interval between full rebuilds.
+        index (Optional[SearchIndex]): Index to maintain; defaults to the process-wide one.
+    """
+    index = index if index is not None else search_index
+
+    async def sync() -> None:
+        rebuild = rebuild_seconds > 0 and time.monotonic() - index.rebuilt_at >= rebuild_seconds
+        # Full loads read from the primary: a lagging secondary would miss documents older than the new watermark
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=None if rebuild else ANALYTICS_READ)
+        if not database:
+            return
+        if rebuild:
+            await load_search_index(database, index)
+        else:
+            await refresh_search_index(database, index)
+
+    await run_periodic("Search index sync", refresh_seconds, sync, lambda: index.loaded)
+
+
+# Process-wide index; each worker process maintains its own copy
+search_index = SearchIndex()
@@ -0,0 +1,18 @@
+import configparser
+import pathlib
+from functools import lru_cache
+
+SETTINGS_FILE = pathlib.Path(__file__).parent.parent / "settings.ini"
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> configparser.ConfigParser:
+    """
+    Parses the application settings file once per process.
+
+    Returns:
+        configparser.ConfigParser: Parsed settings.
+    """
+    config = configparser.ConfigParser()
+    config.read(SETTINGS_FILE)
+    return config
@@ -0,0 +1,113 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from src.utils.settings import get_settings
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WAITERS = 1000
+
+
+class SingleFlightFull(Exception):
+    """
+    Raised when a key already has the maximum number of callers waiting on it.
+    """
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads.
+
+    The first caller for a key starts the fetch; callers arriving while it
+    is in flight await the same fetch and get the same result (or
+    exception), so results must not be modified by the callers. Nothing is
+    kept once the fetch completes.
+
+    The fetch runs in its own task: a caller that is cancelled (e.g. the
+    client disconnected) stops waiting without cancelling the fetch for the
+    others. When every caller has gone, the fetch is cancelled.
+
+    Attributes:
+        name (str): Label of the coalesced read in metrics.
+        max_waiters (int): Maximum number of callers waiting on one key.
+        executed (int): Fetches started.
+        coalesced (int): Calls served by a fetch started by another call.
+        rejected (int): Calls refused because the key had `max_waiters` callers.
+    """
+
+    def __init__(self, name: str, max_waiters: int = DEFAULT_MAX_WAITERS):
+        self.name = name
+        self.max_waiters = max_waiters
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        Returns the result of `fetch`, shared with concurrent calls for the same key.
+
+        Args:
+            key (Hashable): Identifies identical reads.
+            fetch (Callable[[], Awaitable[T]]): Starts the read; only called when no read
+                for the key is in flight.
+
+        Returns:
+            T: Result of the shared fetch.
+
+        Raises:
+            SingleFlightFull: If the key already has `max_waiters` callers.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(fetch(), name=f"singleflight:{self.name}"))
+            flight.task.add_done_callback(lambda task, key=key: self._finished(key, task))
+            self._flights[key] = flight
+            self.executed += 1
+        elif flight.waiters >= self.max_waiters:
+            self.rejected += 1
+            raise SingleFlightFull(f"Too many concurrent requests for {self.name}")
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Every caller was cancelled; nobody needs the result, and later callers start afresh
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Marks a failure as retrieved when every caller had already gone
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+
+def _max_waiters() -> int:
+    return get_settings().getint("singleflight", "max_waiters", fallback=DEFAULT_MAX_WAITERS)
+
+
+# Process-wide coalescing of the hot read routes, keyed by post ID
+post_reads = SingleFlight("get_post", _max_waiters())
+comment_reads = SingleFlight("get_comments", _max_waiters())
@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.ids import ref, to_object_id
+
+# Every path segment is a 24-character comment ID followed by "/"
+PATH_SEPARATOR = "/"
+# "0" sorts right after "/", so [path, path[:-1] + "0") holds exactly the subtree under `path`
+_PATH_END = "0"
+# Bounds the path length, and with it the size of the (post_id, path) index keys
+MAX_REPLY_DEPTH = 32
+
+
+def thread_fields(comment_id: str, parent: Optional[dict] = None) -> dict:
+    """
+    Computes the thread fields stored on a new comment.
+
+    The path lists the IDs from the top-level comment down to the comment
+    itself, so sorting a post's comments by path yields every thread in
+    reading order (each comment followed by its replies, oldest first).
+
+    Args:
+        comment_id (str): ID of the new comment.
+        parent (Optional[dict]): Comment being replied to, or None for a top-level comment.
+
+    Returns:
+        dict: parent_id, path, depth and reply_count fields.
+    """
+    parent_path = parent.get("path", "") if parent else ""
+    return {
+        "parent_id": to_object_id(parent["_id"]) if parent else None,
+        "path": parent_path + str(comment_id) + PATH_SEPARATOR,
+        "depth": parent.get("depth", 0) + 1 if parent else 0,
+        "reply_count": 0,
+    }
+
+
+def subtree_query(post_id: str, path: str = "", after: Optional[str] = None, depth: Optional[int] = None) -> dict:
+    """
+    Builds the range query over the (post_id, path) index selecting a subtree.
+
+    Args:
+        post_id (str): ID of the post.
+        path (str): Path of the comment whose replies are selected; empty for the whole post.
+        after (Optional[str]): ID of a reply of that comment; only later replies (and their
+            subtrees) are selected. Used to page through one level.
+        depth (Optional[int]): Deepest depth to select.
+
+    Returns:
+        dict: MongoDB filter.
+    """
+    path_range = {"$gte": path + after + _PATH_END if after else path}
+    if path:
+        path_range["$lt"] = path[:-1] + _PATH_END
+    query = {"post_id": ref(post_id), "path": path_range, "blocked": False}
+    if depth is not None:
+        query["depth"] = {"$lte": depth}
+    return query
+
+
+def build_thread(comments: List[dict], base_depth: int, max_depth: int, limit: int) -> Tuple[List[dict], bool]:
+    """
+    Assembles comments sorted by path into nested threads.
+
+    Each comment keeps at most `limit` replies; a comment's `more_replies`
+    flag tells whether further replies exist (beyond the limit, beyond the
+    depth limit, or past the end of the fetched range), fetched by paging
+    that level with its ID as parent and the last returned reply as `after`.
+
+    Args:
+        comments (List[dict]): Comment documents sorted by path.
+        base_depth (int): Depth of the first level returned.
+        max_depth (int): Deepest depth returned.
+        limit (int): Maximum number of comments per level.
+
+    Returns:
+        Tuple[List[dict], bool]: First-level nodes, and whether more first-level comments exist.
+    """
+    nodes: Dict[str, dict] = {}
+    roots: List[dict] = []
+    more = False
+    for comment in comments:
+        node = {
+            **comment,
+            "id": str(comment["_id"]),
+            "post_id": str(comment["post_id"]),
+            "author_id": str(comment["author_id"]),
+            "depth": comment.get("depth", 0),
+            "parent_id": str(comment["parent_id"]) if comment.get("parent_id") else None,
+            "reply_count": comment.get("reply_count", 0),
+            "replies": [],
+            "more_replies": comment.get("depth", 0) >= max_depth and comment.get("reply_count", 0) > 0,
+        }
+        if node["depth"] == base_depth:
+            siblings = roots
+        elif node["parent_id"] in nodes:
+            siblings = nodes[node["parent_id"]]["replies"]
+        else:
+            # The parent was cut by the per-level limit, so its whole subtree is skipped
+            continue
+        if len(siblings) >= limit:
+            if node["depth"] == base_depth:
+                more = True
+            else:
+                nodes[node["parent_id"]]["more_replies"] = True
+            continue
+        siblings.append(node)
+        nodes[node["id"]] = node
+
+    # Replies may also lie past the end of the fetched range
+    for node in nodes.values():
+        if node["depth"] < max_depth and len(node["replies"]) < node["reply_count"]:
+            node["more_replies"] = True
+    return roots, more
+
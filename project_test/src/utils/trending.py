@@ -0,0 +1,380 @@
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+
+from src.database.comment_store import comment_store
+from src.database.connect import connect_to_database_mongo, get_mongo_url
+from src.database.profiles import BACKGROUND_WRITE
+from src.utils.background import run_periodic
+from src.utils.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Comments older than this many half-lives weigh less than 0.1% and are not replayed on rebuild
+HISTORY_HALF_LIVES = 10
+# Posts whose decayed score falls below this are forgotten unless they are in the top K
+MIN_SCORE = 0.01
+# Scores are stored relative to an epoch; it is moved forward before 2 ** exponent gets large
+REBASE_HALF_LIVES = 64
+# Comments written by other workers are read again with this overlap and deduplicated by ID
+REFRESH_OVERLAP = timedelta(seconds=5)
+# Only the best-scored posts are persisted; the rest is rebuilt from recent comments if needed
+PERSIST_LIMIT_FACTOR = 10
+SNAPSHOT_ID = "posts"
+
+
+class TrendingPost(NamedTuple):
+    """
+    Ranked post.
+
+    Attributes:
+        id (str): Post ID.
+        title (str): Post title.
+        author_id (str): Author ID.
+        score (float): Comment activity, each comment weighing 1 when new and half as much every half-life.
+    """
+
+    id: str
+    title: str
+    author_id: str
+    score: float
+
+
+class TrendingPosts:
+    """
+    Time-decayed comment activity per post, with the top K kept in a heap.
+
+    A comment made at time t adds 2 ** ((t - epoch) / half_life) to its
+    post's score. Every score decays at the same rate, so the ranking never
+    needs re-scoring as time passes: the decay is applied only when scores
+    are reported. A min-heap holds the top K posts; a post enters it when
+    its score beats the smallest one. Stale heap entries are skipped lazily.
+    """
+
+    def __init__(self, half_life_seconds: float, top_k: int):
+        """
+        Initializes an empty ranking.
+
+        Args:
+            half_life_seconds (float): Time after which a comment counts half as much.
+            top_k (int): Number of posts ranked.
+        """
+        self.half_life = half_life_seconds
+        self.top_k = top_k
+        self.epoch = datetime.utcnow()
+        self._scores: Dict[str, float] = {}
+        self._posts: Dict[str, Tuple[str, str]] = {}
+        self._top: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._ranking: Optional[List[Tuple[str, float]]] = None
+        self._seen: Dict[str, datetime] = {}
+        self.watermark: Optional[datetime] = None
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _weight(self, created_at: datetime) -> float:
+        return 2 ** ((created_at - self.epoch).total_seconds() / self.half_life)
+
+    def _decay(self, now: Optional[datetime] = None) -> float:
+        return 2 ** -(((now or datetime.utcnow()) - self.epoch).total_seconds() / self.half_life)
+
+    def _rebase(self, now: datetime) -> None:
+        factor = self._decay(now)
+        self.epoch = now
+        self._scores = {post_id: score * factor for post_id, score in self._scores.items()}
+        self._top = {post_id: self._scores[post_id] for post_id in self._top}
+        self._heap = [(score, post_id) for post_id, score in self._top.items()]
+        heapq.heapify(self._heap)
+        self._ranking = None
+
+    def _smallest(self) -> Tuple[float, str]:
+        while self._heap[0][0] != self._top.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+        return self._heap[0]
+
+    def _offer(self, post_id: str) -> None:
+        score = self._scores[post_id]
+        if post_id not in self._top:
+            if len(self._top) >= self.top_k:
+                smallest_score, smallest_id = self._smallest()
+                if score <= smallest_score:
+                    return
+                heapq.heappop(self._heap)
+                del self._top[smallest_id]
+        self._top[post_id] = score
+        heapq.heappush(self._heap, (score, post_id))
+        self._ranking = None
+        # Updated scores leave stale entries behind
+        if len(self._heap) > 4 * self.top_k:
+            self._heap = [(score, post_id) for post_id, score in self._top.items()]
+            heapq.heapify(self._heap)
+
+    def record(self, post_id: str, title: str, author_id: str, created_at: datetime,
+               comment_id: Optional[str] = None) -> bool:
+        """
+        Adds one comment to its post's score; comments already counted are ignored.
+
+        Args:
+            post_id (str): ID of the commented post.
+            title (str): Post title.
+            author_id (str): Post author ID.
+            created_at (datetime): Comment creation time.
+            comment_id (Optional[str]): Comment ID, used to skip comments seen twice.
+
+        Returns:
+            bool: False if the comment was already counted.
+        """
+        if comment_id is not None:
+            if comment_id in self._seen:
+                return False
+            self._seen[comment_id] = created_at
+        if (created_at - self.epoch).total_seconds() > REBASE_HALF_LIVES * self.half_life:
+            self._rebase(created_at)
+        self._scores[post_id] = self._scores.get(post_id, 0.0) + self._weight(created_at)
+        self._posts[post_id] = (title, author_id)
+        self._offer(post_id)
+        return True
+
+    def record_comment(self, comment: dict, post: dict) -> bool:
+        """
+        Adds a newly created comment, given its document and its post's.
+        """
+        return self.record(
+            str(post["_id"]), post.get("title", ""), str(post.get("author_id", "")),
+            comment["created_at"], str(comment["_id"]),
+        )
+
+    def remove(self, post_id: str) -> None:
+        """
+        Forgets a deleted post, promoting the next best post into the top K.
+        """
+        self._scores.pop(post_id, None)
+        self._posts.pop(post_id, None)
+        if self._top.pop(post_id, None) is None:
+            return
+        self._ranking = None
+        candidates = ((score, candidate) for candidate, score in self._scores.items() if candidate not in self._top)
+        best = max(candidates, default=None)
+        if best:
+            self._offer(best[1])
+
+    def top(self, limit: int) -> List[TrendingPost]:
+        """
+        Returns the highest-scored posts.
+
+        The sorted ranking is cached until a score changes, so a lookup costs
+        O(limit) regardless of the number of posts and comments.
+
+        Args:
+            limit (int): Maximum number of posts.
+
+        Returns:
+            List[TrendingPost]: Posts by descending decayed score.
+        """
+        if self._ranking is None:
+            self._ranking = sorted(self._top.items(), key=lambda item: (-item[1], item[0]))
+        decay = self._decay()
+        return [
+            TrendingPost(post_id, *self._posts[post_id], round(score * decay, 4))
+            for post_id, score in self._ranking[:limit]
+        ]
+
+    def prune(self, now: Optional[datetime] = None) -> None:
+        """
+        Forgets posts with negligible scores and comment IDs that can no longer be read twice.
+        """
+        threshold = MIN_SCORE / self._decay(now)
+        for post_id in [post_id for post_id, score in self._scores.items()
+                        if score < threshold and post_id not in self._top]:
+            del self._scores[post_id]
+            del self._posts[post_id]
+        if self.watermark:
+            self._seen = {
+                comment_id: created_at for comment_id, created_at in self._seen.items()
+                if created_at > self.watermark - REFRESH_OVERLAP
+            }
+
+    def reset(self, now: datetime) -> None:
+        self.epoch = now
+        self._scores, self._posts, self._top, self._heap, self._seen = {}, {}, {}, [], {}
+        self._ranking = None
+
+    def snapshot(self) -> dict:
+        """
+        Returns the state persisted between restarts: the best-scored posts, the watermark
+        and the comments counted within the refresh overlap.
+        """
+        self.prune()
+        best = heapq.nlargest(
+            self.top_k * PERSIST_LIMIT_FACTOR, self._scores.items(), key=lambda item: item[1]
+        )
+        return {
+            "_id": SNAPSHOT_ID,
+            "epoch": self.epoch,
+            "half_life": self.half_life,
+            "watermark": self.watermark,
+            "posts": [[post_id, score, *self._posts[post_id]] for post_id, score in best],
+            "seen": [[comment_id, created_at] for comment_id, created_at in self._seen.items()],
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        self.reset(snapshot["epoch"])
+        for post_id, score, title, author_id in snapshot["posts"]:
+            self._scores[post_id] = score
+            self._posts[post_id] = (title, author_id)
+            self._offer(post_id)
+        self._seen = {comment_id: created_at for comment_id, created_at in snapshot.get("seen", [])}
+        self.watermark = snapshot["watermark"]
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "posts": len(self._scores), "top": len(self._top)}
+
+
+async def _post_summaries(database, post_ids: List[str]) -> Dict[str, dict]:
+    """
+    Reads title and author of the given posts, leaving out blocked and deleted ones.
+    """
+    ids = [ObjectId(post_id) for post_id in post_ids if ObjectId.is_valid(post_id)]
+    if not ids:
+        return {}
+    posts = await database.posts_collection.find(
+        {"_id": {"$in": ids}, "blocked": False}, {"title": 1, "author_id": 1}
+    ).to_list(length=None)
+    return {str(post["_id"]): post for post in posts}
+
+
+async def _replay(database, trending: "TrendingPosts", since: datetime) -> int:
+    """
+    Counts non-blocked comments created after `since` that were not counted yet.
+    """
+    comments = await comment_store(database).find(
+        {"blocked": False, "created_at": {"$gt": since}}, {"post_id": 1, "created_at": 1}, sort=[("created_at", 1)]
+    ).to_list(length=None)
+    posts = await _post_summaries(database, list({str(comment["post_id"]) for comment in comments}))
+    counted = 0
+    for comment in comments:
+        post = posts.get(str(comment["post_id"]))
+        if post and trending.record_comment(comment, post):
+            counted += 1
+    return counted
+
+
+async def rebuild_trending(database, trending: Optional[TrendingPosts] = None) -> int:
+    """
+    Recomputes the ranking from recent comments.
+
+    Args:
+        database (Database): Connected database handle.
+        trending (Optional[TrendingPosts]): Ranking to rebuild; defaults to the process-wide one.
+
+    Returns:
+        int: Number of replayed comments.
+    """
+    trending = trending if trending is not None else trending_posts
+    started = datetime.utcnow()
+    trending.reset(started)
+    counted = await _replay(database, trending, started - timedelta(seconds=trending.half_life * HISTORY_HALF_LIVES))
+    trending.watermark = started - REFRESH_OVERLAP
+    return counted
+
+
+async def load_trending(database, trending: Optional[TrendingPosts] = None) -> int:
+    """
+    Restores the persisted ranking and catches up on newer comments, or rebuilds it.
+
+    Args:
+        database (Database): Connected database handle.
+        trending (Optional[TrendingPosts]): Ranking to load; defaults to the process-wide one.
+
+    Returns:
+        int: Number of ranked posts.
+    """
+    trending = trending if trending is not None else trending_posts
+    snapshot = await database.trending_collection.find_one({"_id": SNAPSHOT_ID})
+    if snapshot and snapshot.get("half_life") == trending.half_life and snapshot.get("watermark"):
+        trending.restore(snapshot)
+        await refresh_trending(database, trending)
+    else:
+        await rebuild_trending(database, trending)
+    trending.loaded = True
+    return len(trending)
+
+
+async def refresh_trending(database, trending: Optional[TrendingPosts] = None) -> int:
+    """
+    Counts comments created since the last refresh, including those written by other workers.
+
+    Args:
+        database (Database): Connected database handle.
+        trending (Optional[TrendingPosts]): Ranking to refresh; defaults to the process-wide one.
+
+    Returns:
+        int: Number of newly counted comments.
+    """
+    trending = trending if trending is not None else trending_posts
+    started = datetime.utcnow()
+    counted = await _replay(database, trending, trending.watermark)
+    trending.watermark = started - REFRESH_OVERLAP
+    trending.prune(started)
+    return counted
+
+
+async def persist_trending(database, trending: Optional[TrendingPosts] = None) -> None:
+    """
+    Saves the ranking so a restart does not have to replay every recent comment.
+    """
+    trending = trending if trending is not None else trending_posts
+    await database.trending_collection.replace_one({"_id": SNAPSHOT_ID}, trending.snapshot(), upsert=True)
+
+
+async def save_trending(trending: Optional[TrendingPosts] = None) -> None:
+    """
+    Persists a loaded ranking on shutdown; failures are logged, not raised.
+    """
+    trending = trending if trending is not None else trending_posts
+    if not trending.loaded:
+        return
+    try:
+        database = await connect_to_database_mongo(await get_mongo_url(), profile=BACKGROUND_WRITE)
+        if database:
+            await persist_trending(database, trending)
+    except Exception as e:
+        logger.error(f"Failed to persist trending posts: {str(e)}")
+
+
+async def run_trending_sync(refresh_seconds: float, persist_seconds: float,
+                            trending: Optional[TrendingPosts] = None) -> None:
+    """
+    Counts comments written by other worker processes and persists the ranking periodically.
+
+    Args:
+        refresh_seconds (float): Interval between refreshes.
+        persist_seconds (float): Interval between snapshots.
+        trending (Optional[TrendingPosts]): Ranking to maintain; defaults to the process-wide one.
+    """
+    trending = trending if trending is not None else trending_posts
+    persisted_at = time.monotonic()
+
+    async def sync() -> None:
+        nonlocal persisted_at
+        database = await connect_to_database_mongo(await get_mongo_url())
+        if not database:
+            return
+        await refresh_trending(database, trending)
+        if time.monotonic() - persisted_at >= persist_seconds:
+            await persist_trending(database, trending)
+            persisted_at = time.monotonic()
+
+    await run_periodic("Trending sync", refresh_seconds, sync, lambda: trending.loaded)
+
+
+trending_posts = TrendingPosts(
+    get_settings().getfloat("trending", "half_life_hours", fallback=6) * 3600,
+    get_settings().getint("trending", "top_k", fallback=100),
+)
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# Delay before retrying a failed warmup, doubled after every failure up to the maximum
+WARMUP_RETRY_SECONDS = 2.0
+WARMUP_RETRY_MAX_SECONDS = 60.0
+# Header marking synthetic requests so they can be told apart in logs
+WARMUP_HEADER = "x-warmup"
+
+
+class SyntheticRequest(NamedTuple):
+    """
+    Read-only request sent through one router during warmup.
+
+    Attributes:
+        router (str): Router the request exercises.
+        method (str): HTTP method.
+        path (str): Request path.
+        body (Optional[dict]): JSON body.
+        auth (bool): Whether to send a valid bearer token for a non-existent user.
+    """
+
+    router: str
+    method: str
+    path: str
+    body: Optional[dict] = None
+    auth: bool = False
+
+
+def synthetic_requests() -> List[SyntheticRequest]:
+    """
+    Builds one request per router that runs its handler without changing any data.
+
+    Unknown IDs, invalid tokens and invalid input make write endpoints stop
+    before their first write while still loading their code, validation and
+    serialization paths. Any status below 500 counts as a successful warmup.
+
+    Returns:
+        List[SyntheticRequest]: Requests in router registration order.
+    """
+    missing_id = "0" * 24
+    today = date.today().isoformat()
+    return [
+        SyntheticRequest("auth", "POST", "/login/", {"email": "warmup@example.com", "password": "warmup"}),
+        SyntheticRequest("auth", "GET", f"/get_new_pass/warmup-{missing_id}"),
+        SyntheticRequest(
+            "registration", "POST", "/registration/",
+            {"username": "warmup", "email": "warmup@example.com", "password": "warmup"},
+        ),
+        SyntheticRequest("update", "PATCH", "/update_username/", {"new_name": "warmup"}),
+        SyntheticRequest("user_data", "GET", "/api/user_data/", auth=True),
+        SyntheticRequest("delete", "DELETE", "/delete_account/"),
+        SyntheticRequest("journal", "GET", f"/user_logs/{missing_id}", auth=True),
+        SyntheticRequest("journal_username", "GET", f"/username_logs/{missing_id}", auth=True),
+        SyntheticRequest("journal_email", "GET", f"/email_logs/{missing_id}"),
+        SyntheticRequest("journal_password", "GET", f"/password_logs/{missing_id}"),
+        SyntheticRequest("posts", "GET", "/posts/"),
+        SyntheticRequest("posts", "GET", "/posts/trending"),
+        SyntheticRequest("posts", "GET", f"/posts/{missing_id}"),
+        SyntheticRequest("comments", "GET", f"/posts/{missing_id}/comments/"),
+        SyntheticRequest("comments", "GET", f"/posts/{missing_id}/comments/thread"),
+        SyntheticRequest(
+            "comments", "GET", f"/api/comments-daily-breakdown?date_from={today}&date_to={today}"
+        ),
+        SyntheticRequest("comment_stream", "GET", "/posts/invalid/comments/stream"),
+        SyntheticRequest("monitoring", "GET", "/metrics"),
+        SyntheticRequest("search", "GET", '/search?q=warmup+"warm+up"+warm*'),
+        SyntheticRequest("autocomplete", "GET", "/autocomplete?q=wa"),
+        SyntheticRequest("feed", "GET", f"/users/{missing_id}/posts"),
+        SyntheticRequest("feed", "GET", "/feed", auth=True),
+    ]
+
+
+class ReadinessState:
+    """
+    Tracks warmup progress and whether the instance may receive traffic.
+
+    Attributes:
+        ready (bool): True once every warmup step has succeeded.
+        attempts (int): Number of warmup attempts so far.
+        checks (Dict[str, dict]): Outcome and duration of each step of the latest attempt.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.attempts = 0
+        self.checks: Dict[str, dict] = {}
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.ready_at = time.time()
+
+    def reset(self) -> None:
+        self.ready = False
+        self.ready_at = None
+        self.checks = {}
+
+    def stats(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "attempts": self.attempts,
+            "warmup_seconds": None if self.ready_at is None else round(self.ready_at - self.started_at, 3),
+            "checks": self.checks,
+        }
+
+
+async def _run_step(state: ReadinessState, name: str, step: Callable[[], Awaitable[Optional[str]]]) -> bool:
+    start = time.perf_counter()
+    try:
+        detail = await step()
+    except Exception as e:
+        state.checks[name] = {
+            "status": "failed",
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "error": str(e) or type(e).__name__,
+        }
+        logger.warning(f"Warmup step '{name}' failed: {e}")
+        return False
+    state.checks[name] = {"status": "ok", "duration_ms": round((time.perf_counter() - start) * 1000, 3)}
+    if detail:
+        state.checks[name]["detail"] = detail
+    return True
+
+
+async def _warm_settings() -> str:
+    from src.database.connect import get_mongo_url
+    from src.database.profiles import database_profiles
+    from src.database.storage import storage_backend
+    from src.utils.settings import get_settings
+
+    get_settings()
+    await get_mongo_url()
+    # Fails the warmup on a misconfigured profile rather than the first request using it
+    return f"{storage_backend()}, {len(database_profiles())} database profiles"
+
+
+async def _warm_database() -> None:
+    from src.database.connect import connect_to_database_mongo, get_mongo_url
+
+    # Resolves the SRV record, opens the pool and pings the deployment
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+
+
+async def _warm_indexes() -> str:
+    from src.database.connect import connect_to_database_mongo, get_mongo_url
+    from src.database.indexes import ensure_indexes
+    from src.database.partitions import ensure_partition_indexes
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    return f"{len(await ensure_indexes(database)) + len(await ensure_partition_indexes(database))} indexes"
+
+
+async def _warm_search_index() -> str:
+    from src.database.connect import connect_to_database_mongo, get_mongo_url
+    from src.utils.search_index import load_search_index
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    return f"{await load_search_index(database)} documents"
+
+
+async def _warm_autocomplete() -> str:
+    from src.database.connect import connect_to_database_mongo, get_mongo_url
+    from src.utils.autocomplete import load_autocomplete
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    return f"{await load_autocomplete(database)} entries"
+
+
+async def _warm_trending() -> str:
+    from src.database.connect import connect_to_database_mongo, get_mongo_url
+    from src.utils.trending import load_trending
+
+    database = await connect_to_database_mongo(await get_mongo_url())
+    if not database:
+        raise RuntimeError("Failed to connect to the database")
+    return f"{await load_trending(database)} posts"
+
+
+async def _warm_profanity() -> None:
+    from better_profanity import profanity
+
+    # Loading the word list builds the censor set; done off the event loop
+    await asyncio.to_thread(profanity.load_censor_words)
+    profanity.contains_profanity("warmup")
+
+
+async def _warm_jwt() -> None:
+    from src.utils.jwt_utils import create_access_token, decode_access_token
+
+    decode_access_token(create_access_token({"sub": "warmup@example.com", "username": "warmup", "id": "warmup"}))
+
+
+def _warm_schemas(app: FastAPI) -> Callable[[], Awaitable[str]]:
+    async def step() -> str:
+        # Builds the JSON schema of every request and response model
+        schema = app.openapi()
+        return f"{len(schema.get('components', {}).get('schemas', {}))} schemas"
+
+    return step
+
+
+def _warm_routers(app: FastAPI) -> Callable[[], Awaitable[str]]:
+    async def step() -> str:
+        from src.utils.jwt_utils import create_access_token
+
+        token = create_access_token({"sub": "warmup@example.com", "username": "warmup", "id": str(ObjectId())})
+        transport = httpx.ASGITransport(app=app)
+        requests = synthetic_requests()
+        failures = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup", timeout=30) as client:
+            for request in requests:
+                headers = {WARMUP_HEADER: "1", "Authorization": f"Bearer {token if request.auth else 'warmup'}"}
+                response = await client.request(request.method, request.path, json=request.body, headers=headers)
+                if response.status_code >= 500:
+                    failures.append(f"{request.method} {request.path} -> {response.status_code}")
+        if failures:
+            raise RuntimeError("; ".join(failures))
+        return f"{len(requests)} requests"
+
+    return step
+
+
+async def run_warmup_once(app: FastAPI, state: ReadinessState) -> bool:
+    """
+    Runs every warmup step in order, stopping at the first failure.
+
+    Args:
+        app (FastAPI): Application to warm up.
+        state (ReadinessState): Readiness state updated with each step's outcome.
+
+    Returns:
+        bool: True if every step succeeded.
+    """
+    state.reset()
+    state.attempts += 1
+    steps = [
+        ("settings", _warm_settings),
+        ("database", _warm_database),
+        ("indexes", _warm_indexes),
+        ("search_index", _warm_search_index),
+        ("autocomplete", _warm_autocomplete),
+        ("trending", _warm_trending),
+        ("profanity", _warm_profanity),
+        ("jwt", _warm_jwt),
+        ("schemas", _warm_schemas(app)),
+        ("routers", _warm_routers(app)),
+    ]
+    for name, step in steps:
+        if not await _run_step(state, name, step):
+            return False
+    state.mark_ready()
+    return True
+
+
+async def run_warmup(app: FastAPI, state: Optional[ReadinessState] = None) -> None:
+    """
+    Warms the application up, retrying with backoff until it succeeds.
+
+    Args:
+        app (FastAPI): Application to warm up.
+        state (Optional[ReadinessState]): Readiness state; defaults to the process-wide one.
+    """
+    state = state or readiness
+    delay = WARMUP_RETRY_SECONDS
+    while not await run_warmup_once(app, state):
+        logger.warning(f"Warmup attempt {state.attempts} failed, retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+    logger.info(f"Warmup finished after {state.attempts} attempt(s); instance is ready")
+
+
+# Process-wide readiness state reported by /health/ready
+readiness = ReadinessState()
@@ -0,0 +1,100 @@
+"""
+Fixtures running the storage code against the in-memory backend (`[storage] BACKEND=memory`).
+
+Run from the project_test directory:
+
+    python -m pytest
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.database import connect
+from src.database.indexes import ensure_indexes
+from src.database.memory import memory_client
+from src.utils.comment_broker import comment_broker
+from src.utils.front_page import front_page
+from src.utils.post_cache import post_cache
+from src.utils.settings import get_settings
+
+# Seconds to wait for the startup warmup of the application
+READY_TIMEOUT_SECONDS = 10
+PASSWORD = "Secret@pass1"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def settings():
+    """
+    Settings with the memory backend; options changed by a test are restored afterwards.
+    """
+    config = get_settings()
+    saved = {
+        section: {option: config.get(section, option, raw=True) for option in config.options(section)}
+        for section in config.sections()
+    }
+    config.set("storage", "backend", "memory")
+    yield config
+    for section in config.sections():
+        config.remove_section(section)
+    config.read_dict(saved)
+
+
+@pytest.fixture
+async def database(settings):
+    """
+    Connected handle of an empty in-memory database, with the application's indexes.
+    """
+    await connect.close_databases()
+    memory_client._databases.clear()
+    database = await connect.connect_to_database_mongo(await connect.get_mongo_url())
+    await ensure_indexes(database)
+    yield database
+    await connect.close_databases()
+    memory_client._databases.clear()
+
+
+def _reset_state() -> None:
+    # Process-wide state the application keeps between requests
+    connect._databases.clear()
+    memory_client._databases.clear()
+    post_cache.clear()
+    front_page.invalidate()
+    comment_broker.closed = False
+
+
+@pytest.fixture
+def client(settings):
+    """
+    Test client of the application on an empty in-memory database, once warmup has finished.
+    """
+    import main
+
+    _reset_state()
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        while client.get("/health/ready").status_code != 200:
+            assert time.monotonic() < deadline, "warmup did not finish"
+            time.sleep(0.05)
+        yield client
+    _reset_state()
+
+
+@pytest.fixture
+def login(client):
+    """
+    Registers a user and returns `(user_id, headers)` carrying its bearer token.
+    """
+    def login(username: str = "alice"):
+        email = f"{username}@example.com"
+        response = client.post("/registration/", json={"username": username, "email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        token = client.post("/login/", json={"email": email, "password": PASSWORD}).json()
+        return token["user"]["id"], {"Authorization": f"Bearer {token['access_token']}"}
+
+    return login
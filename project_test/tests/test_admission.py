@@ -0,0 +1,33 @@
+import pytest
+
+from src.middleware.admission import AdmissionGroup, GroupLimits, admission_controller, classify_request
+
+
+def test_requests_are_classified_by_route_group():
+    assert classify_request("GET", "/posts/") == "reads"
+    assert classify_request("POST", "/posts/") == "writes"
+    assert classify_request("POST", "/login/") == "auth"
+    assert classify_request("GET", "/api/comments-daily-breakdown") == "analytics"
+    assert classify_request("GET", "/health/ready") is None
+    assert classify_request("GET", "/posts/1/comments/stream") is None
+
+
+@pytest.mark.parametrize("queue_size", [0, 1])
+def test_overloaded_group_answers_503_with_retry_after(client, monkeypatch, queue_size):
+    # queue_size 0 sheds at once; otherwise the request is shed when its deadline passes
+    group = AdmissionGroup("reads", GroupLimits(concurrency=1, queue_size=queue_size, deadline=0.05))
+    monkeypatch.setitem(admission_controller.groups, "reads", group)
+    assert client.portal.call(group.acquire)
+
+    response = client.get("/posts/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"detail": "Server is overloaded, retry later"}
+    assert (group.shed_timeout, group.shed_queue_full) == ((1, 0) if queue_size else (0, 1))
+    # Other groups and exempt routes are not affected
+    assert client.get("/health/live").status_code == 200
+    assert client.post("/login/", data={"username": "nobody", "password": "wrong"}).status_code != 503
+
+    group.release()
+    assert client.get("/posts/").status_code == 200
+    assert group.stats()["active"] == 0
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import BSON, ObjectId
+
+from src.database.comment_store import (
+    BUCKETED_LAYOUT,
+    FLAT_LAYOUT,
+    BucketedCommentStore,
+    comment_store,
+    convert_layout,
+)
+from src.utils.ids import ref
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1)
+
+
+def _comment(post_id, minute, content="comment"):
+    return {
+        "_id": ObjectId(),
+        "post_id": post_id,
+        "author_id": ObjectId(),
+        "content": content,
+        "created_at": START + timedelta(minutes=minute),
+        "parent_id": None,
+        "reply_count": 0,
+    }
+
+
+async def _all(cursor):
+    return await cursor.to_list(length=None)
+
+
+async def test_buckets_hold_at_most_bucket_size_comments(database):
+    store = BucketedCommentStore(database, bucket_size=3)
+    post_id = ObjectId()
+    comments = [_comment(post_id, minute) for minute in range(7)]
+    for comment in comments:
+        await store.insert(comment)
+
+    buckets = await _all(database.comment_buckets_collection.find({}).sort("_id", 1))
+    assert [bucket["count"] for bucket in buckets] == [3, 3, 1]
+    assert buckets[0]["first_at"] == START and buckets[0]["last_at"] == START + timedelta(minutes=2)
+    assert buckets[0]["bytes"] == sum(len(BSON.encode(comment)) for comment in comments[:3])
+    assert [comment["_id"] for comment in await _all(store.find({"post_id": ref(post_id)}))] == [
+        comment["_id"] for comment in comments
+    ]
+
+
+async def test_buckets_stay_under_bucket_bytes(database):
+    post_id = ObjectId()
+    comments = [_comment(post_id, minute, "x" * 1000) for minute in range(5)]
+    size = len(BSON.encode(comments[0]))
+    store = BucketedCommentStore(database, bucket_size=100, bucket_bytes=2 * size + 1)
+    for comment in comments:
+        await store.insert(comment)
+
+    buckets = await _all(database.comment_buckets_collection.find({}).sort("_id", 1))
+    assert [bucket["count"] for bucket in buckets] == [2, 2, 1]
+    assert all(bucket["bytes"] < store.bucket_bytes for bucket in buckets)
+
+
+async def test_bucketed_reads_and_reply_counts(database):
+    store = BucketedCommentStore(database, bucket_size=2)
+    post_id, other = ObjectId(), ObjectId()
+    comments = [_comment(post_id, minute) for minute in range(5)]
+    for comment in comments + [_comment(other, 0)]:
+        await store.insert(comment)
+
+    newest = await _all(store.find({"post_id": ref(post_id)}, {"content": 0}, sort=[("created_at", -1)], limit=2))
+    assert [comment["_id"] for comment in newest] == [comments[4]["_id"], comments[3]["_id"]]
+    assert "content" not in newest[0]
+    assert (await store.find_one({"_id": comments[2]["_id"]}))["post_id"] == post_id
+    later = await _all(store.find({"post_id": ref(post_id), "created_at": {"$gt": START + timedelta(minutes=2)}}))
+    assert len(later) == 2
+
+    await store.add_reply(comments[2])
+    assert (await store.find_one({"_id": comments[2]["_id"]}))["reply_count"] == 1
+    assert (await store.find_one({"_id": comments[3]["_id"]}))["reply_count"] == 0
+
+    counts = await _all(store.aggregate([{"$match": {}}, {"$group": {"_id": "$post_id", "n": {"$sum": 1}}}]))
+    assert {row["_id"]: row["n"] for row in counts} == {post_id: 5, other: 1}
+
+    await store.delete_for_post(post_id)
+    assert await database.comment_buckets_collection.count_documents({}) == 1
+
+
+def test_point_lookups_select_the_bucket_of_the_comment():
+    comment_id, post_id = ObjectId(), ObjectId()
+    assert BucketedCommentStore._bucket_filter({"post_id": post_id, "_id": comment_id}) == {
+        "post_id": post_id, "comments._id": comment_id,
+    }
+    assert BucketedCommentStore._bucket_filter({"_id": {"$in": [comment_id]}}) == {
+        "comments._id": {"$in": [comment_id]},
+    }
+    assert BucketedCommentStore._bucket_filter({"_id": {"$gt": comment_id}}) == {}
+    assert BucketedCommentStore._bucket_filter({"created_at": {"$gte": START, "$lt": START}}) == {
+        "last_at": {"$gte": START},
+    }
+
+
+async def test_convert_layout_moves_every_comment(database):
+    posts = [ObjectId(), ObjectId()]
+    comments = [_comment(posts[minute % 2], minute) for minute in range(6)]
+    flat = comment_store(database, FLAT_LAYOUT)
+    for comment in comments:
+        await flat.insert(comment)
+
+    assert await convert_layout(database, BUCKETED_LAYOUT) == 6
+    assert await database.comments_collection.count_documents({}) == 0
+    bucketed = comment_store(database, BUCKETED_LAYOUT)
+    moved = await _all(bucketed.find({}, sort=[("created_at", 1)]))
+    assert moved == comments
+
+    # Converting again finds nothing left to move
+    assert await convert_layout(database, BUCKETED_LAYOUT) == 0
+    assert await convert_layout(database, FLAT_LAYOUT) == 6
+    assert await _all(flat.find({}, sort=[("created_at", 1)])) == comments
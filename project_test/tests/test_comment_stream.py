@@ -0,0 +1,88 @@
+import json
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from src.utils.comment_broker import comment_broker
+
+
+def _post(client, headers, title="Post"):
+    response = client.post("/posts/", json={"title": title, "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def _comment(client, headers, post_id, content):
+    response = client.post(f"/posts/{post_id}/comments/", json={"content": content}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _wait_for_subscribers(count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while comment_broker.subscriber_count() != count:
+        assert time.monotonic() < deadline, f"{comment_broker.subscriber_count()} subscriber(s), expected {count}"
+        time.sleep(0.01)
+
+
+def test_websocket_resumes_after_the_last_seen_comment(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+    first = _comment(client, headers, post_id, "first")
+    second = _comment(client, headers, post_id, "second")
+
+    with client.websocket_connect(f"/posts/{post_id}/comments/stream?last_id={first}") as websocket:
+        assert websocket.receive_json()["id"] == second
+        _wait_for_subscribers(1)
+        third = _comment(client, headers, post_id, "third")
+        assert websocket.receive_json()["id"] == third
+
+
+def test_websocket_disconnect_releases_the_subscription(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+
+    with client.websocket_connect(f"/posts/{post_id}/comments/stream"):
+        _wait_for_subscribers(1)
+    # No comment is ever published on this post, so only reading notices the disconnect
+    _wait_for_subscribers(0)
+
+
+def test_shutdown_closes_websocket_streams(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+
+    with client.websocket_connect(f"/posts/{post_id}/comments/stream") as websocket:
+        _wait_for_subscribers(1)
+        assert client.portal.call(comment_broker.close) == 1
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+        assert closed.value.code == 1001
+    assert comment_broker.subscriber_count() == 0
+
+
+def test_sse_replays_missed_comments_and_ends_on_shutdown(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+    first = _comment(client, headers, post_id, "first")
+    second = _comment(client, headers, post_id, "second")
+    # Once closed, streams replay their backlog and end instead of waiting for new comments
+    client.portal.call(comment_broker.close)
+
+    response = client.get(f"/posts/{post_id}/comments/stream", headers={"Last-Event-ID": first})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert len(events) == 1
+    lines = dict(line.split(": ", 1) for line in events[0].splitlines())
+    assert lines["id"] == second and lines["event"] == "comment"
+    assert json.loads(lines["data"])["content"] == "second"
+
+
+def test_invalid_post_id_is_rejected(client):
+    assert client.get("/posts/invalid/comments/stream").status_code == 400
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/posts/invalid/comments/stream") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008
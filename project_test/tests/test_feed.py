@@ -0,0 +1,71 @@
+from src.routes import feed
+
+
+def _create_posts(client, headers, count, prefix):
+    return [
+        client.post("/posts/", json={"title": f"{prefix} {index}", "content": "content"}, headers=headers).json()["_id"]
+        for index in range(count)
+    ]
+
+
+def _pages(client, path, headers=None, limit=2):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get(path, params=params, headers=headers).json()
+        assert len(page["posts"]) <= limit
+        ids.extend(post["_id"] for post in page["posts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_author_posts_page_with_cursors(client, login):
+    author_id, headers = login("ann")
+    created = _create_posts(client, headers, 5, "ann")
+
+    assert _pages(client, f"/users/{author_id}/posts") == created[::-1]
+    assert client.get(f"/users/{author_id}/posts", params={"cursor": "bogus"}).status_code == 400
+    assert client.get("/users/invalid/posts").status_code == 400
+
+
+def test_feed_merges_followed_authors_newest_first(client, login):
+    ann_id, ann = login("ann")
+    bob_id, bob = login("bob")
+    _, carol = login("carol")
+    created = []
+    for index in range(3):
+        created += _create_posts(client, ann, 1, f"ann {index}") + _create_posts(client, bob, 1, f"bob {index}")
+    _create_posts(client, carol, 2, "carol")
+
+    for author_id in (ann_id, bob_id):
+        assert client.post(f"/users/{author_id}/follow", headers=carol).status_code == 200
+    # Following twice is not an error
+    assert client.post(f"/users/{ann_id}/follow", headers=carol).status_code == 200
+
+    assert _pages(client, "/feed", carol) == created[::-1]
+    assert _pages(client, "/feed", carol, limit=100) == created[::-1]
+
+    assert client.delete(f"/users/{bob_id}/follow", headers=carol).status_code == 200
+    assert client.delete(f"/users/{bob_id}/follow", headers=carol).status_code == 404
+    assert _pages(client, "/feed", carol) == created[-2::-2]
+
+
+def test_feed_reads_the_most_recently_followed_authors(client, login, monkeypatch):
+    ann_id, ann = login("ann")
+    bob_id, bob = login("bob")
+    _, carol = login("carol")
+    _create_posts(client, ann, 1, "ann")
+    bob_posts = _create_posts(client, bob, 1, "bob")
+    client.post(f"/users/{ann_id}/follow", headers=carol)
+    client.post(f"/users/{bob_id}/follow", headers=carol)
+    monkeypatch.setattr(feed, "MAX_FEED_AUTHORS", 1)
+
+    assert _pages(client, "/feed", carol) == bob_posts
+
+
+def test_follow_rejects_self_and_unknown_users(client, login):
+    user_id, headers = login("ann")
+
+    assert client.post(f"/users/{user_id}/follow", headers=headers).status_code == 400
+    assert client.post(f"/users/{'0' * 24}/follow", headers=headers).status_code == 404
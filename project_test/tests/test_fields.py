@@ -0,0 +1,88 @@
+import pytest
+
+from src.database.memory import MemoryCollection
+from src.models.models import PostInDB
+from src.utils.fields import fields_projection, render_fields, select_fields
+from src.utils.post_cache import post_cache
+
+
+def test_select_fields_validates_names_and_keeps_model_order():
+    assert select_fields(PostInDB, None) is None
+    assert select_fields(PostInDB, " title,_id ,title") == ("_id", "title")
+    assert fields_projection(PostInDB, ("_id", "title"), ["updated_at"]) == {"_id": 1, "title": 1, "updated_at": 1}
+    for fields in ("title,secret", ", ,"):
+        with pytest.raises(ValueError):
+            select_fields(PostInDB, fields)
+
+
+def test_render_fields_keeps_only_selected_fields():
+    document = {"_id": "abc", "title": "Title", "updated_at": None}
+    assert render_fields(PostInDB, ("_id", "title"), document) == {"_id": "abc", "title": "Title"}
+
+
+@pytest.fixture
+def projections(monkeypatch):
+    """
+    Projections of the reads on the posts collection, recorded in order.
+    """
+    recorded = []
+    find, find_one = MemoryCollection.find, MemoryCollection.find_one
+
+    def recording_find(self, filter=None, projection=None, *args, **kwargs):
+        if self.name == "posts":
+            recorded.append(projection)
+        return find(self, filter, projection, *args, **kwargs)
+
+    async def recording_find_one(self, filter=None, projection=None, *args, **kwargs):
+        if self.name == "posts":
+            recorded.append(projection)
+        return await find_one(self, filter, projection, *args, **kwargs)
+
+    monkeypatch.setattr(MemoryCollection, "find", recording_find)
+    monkeypatch.setattr(MemoryCollection, "find_one", recording_find_one)
+    return recorded
+
+
+def _post(client, headers, title="Post"):
+    response = client.post("/posts/", json={"title": title, "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def test_post_fields_are_projected_on_a_miss_and_cut_from_the_cache(client, login, projections):
+    user_id, headers = login()
+    post_id = _post(client, headers)
+    post_cache.clear()
+
+    response = client.get(f"/posts/{post_id}", params={"fields": "title,_id"})
+    assert response.json() == {"_id": post_id, "title": "Post"}
+    assert projections[-1] == {"_id": 1, "title": 1, "updated_at": 1}
+    # The partial read does not fill the cache
+    assert post_cache.get(post_id) is None
+
+    assert set(client.get(f"/posts/{post_id}").json()) == set(PostInDB.model_fields) - {"id"} | {"_id"}
+    reads = len(projections)
+    response = client.get(f"/posts/{post_id}", params={"fields": "author_id"})
+    assert response.json() == {"author_id": user_id} and len(projections) == reads
+
+    assert client.get(f"/posts/{post_id}", params={"fields": "secret"}).status_code == 400
+
+
+def test_listings_return_only_the_selected_fields(client, login, projections):
+    user_id, headers = login()
+    created = [_post(client, headers, f"Post {index}") for index in range(3)]
+    client.post(f"/posts/{created[0]}/comments/", json={"content": "comment"}, headers=headers)
+
+    first = client.get("/posts/", params={"limit": 2, "fields": "_id"})
+    assert first.json() == [{"_id": post_id} for post_id in created[:0:-1]]
+    assert projections[-1] == {"_id": 1, "created_at": 1}
+    second = client.get("/posts/", params={"limit": 2, "fields": "_id", "cursor": first.headers["X-Next-Cursor"]})
+    assert second.json() == [{"_id": created[0]}]
+
+    page = client.get(f"/users/{user_id}/posts", params={"fields": "title"}).json()
+    assert page["posts"] == [{"title": f"Post {index}"} for index in (2, 1, 0)]
+
+    listed = client.get(f"/posts/{created[0]}/comments/", params={"fields": "author_id,content"}).json()
+    assert {"author_id": user_id, "content": "comment"} in listed
+    assert all(set(comment) == {"author_id", "content"} for comment in listed)
+    assert client.get(f"/posts/{created[0]}/comments/", params={"fields": "title"}).status_code == 400
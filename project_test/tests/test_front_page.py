@@ -0,0 +1,50 @@
+from src.utils.front_page import front_page
+
+
+def _create_posts(client, headers, count):
+    return [
+        client.post("/posts/", json={"title": f"Post {index}", "content": "content"}, headers=headers).json()["_id"]
+        for index in range(count)
+    ]
+
+
+def test_spliced_posts_page_like_stored_ones(client, login):
+    _, headers = login()
+    # Load the (empty) snapshot so that new posts are spliced into it
+    assert client.get("/posts/").json() == []
+    loads = front_page.stats()["loads"]
+    created = _create_posts(client, headers, front_page.size + 1)
+
+    first = client.get("/posts/")
+    assert front_page.stats()["loads"] == loads
+    page = first.json()
+    assert [post["_id"] for post in page] == created[::-1][:front_page.size]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/posts/", params={"cursor": cursor})
+    assert [post["_id"] for post in second.json()] == [created[0]]
+    assert "X-Next-Cursor" not in second.headers
+
+    # The spliced page matches the page read back from the database
+    front_page.invalidate()
+    reloaded = client.get("/posts/")
+    assert reloaded.json() == page
+    assert reloaded.headers["ETag"] == first.headers["ETag"]
+    assert reloaded.headers["X-Next-Cursor"] == cursor
+
+
+def test_front_page_is_conditional_and_compressed(client, login):
+    _, headers = login()
+    _create_posts(client, headers, 3)
+
+    response = client.get("/posts/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 3
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    not_modified = client.get("/posts/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    identity = client.get("/posts/", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity.headers
+    assert identity.headers["ETag"] != etag
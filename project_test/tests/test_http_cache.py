@@ -0,0 +1,67 @@
+from bson import ObjectId
+
+from src.utils.post_cache import post_cache
+
+
+def _post(client, headers):
+    response = client.post("/posts/", json={"title": "Post", "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def _comment(client, headers, post_id, content="comment"):
+    response = client.post(f"/posts/{post_id}/comments/", json={"content": content}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_post_answers_matching_validators_with_304(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+
+    response = client.get(f"/posts/{post_id}")
+    assert response.status_code == 200
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    for cached in (True, False):
+        if not cached:
+            # A cache miss revalidates from the same read that fills the cache
+            post_cache.clear()
+        for validators in ({"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'},
+                           {"If-Modified-Since": last_modified}):
+            response = client.get(f"/posts/{post_id}", headers=validators)
+            assert response.status_code == 304 and response.content == b""
+            assert response.headers["ETag"] == etag
+
+    response = client.get(f"/posts/{post_id}", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200 and response.json()["_id"] == post_id
+    # If-None-Match takes precedence over If-Modified-Since
+    stale = {"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+    assert client.get(f"/posts/{post_id}", headers=stale).status_code == 200
+
+    selected = client.get(f"/posts/{post_id}", params={"fields": "_id,title"})
+    assert selected.headers["ETag"] != etag
+    assert client.get(f"/posts/{post_id}", params={"fields": "_id,title"},
+                      headers={"If-None-Match": selected.headers["ETag"]}).status_code == 304
+
+
+def test_comments_etag_changes_with_new_comments(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+    _comment(client, headers, post_id, "first")
+
+    response = client.get(f"/posts/{post_id}/comments/")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    response = client.get(f"/posts/{post_id}/comments/", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+
+    _comment(client, headers, post_id, "second")
+    response = client.get(f"/posts/{post_id}/comments/", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert "second" in [comment["content"] for comment in response.json()]
+
+    unknown = client.get(f"/posts/{ObjectId()}/comments/", headers={"If-None-Match": etag})
+    assert unknown.status_code == 404
@@ -0,0 +1,203 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from src.database.documents import apply_update, matches, project, run_pipeline, sort_documents
+
+pytestmark = pytest.mark.anyio
+
+
+POST = {
+    "_id": 1,
+    "title": "Hello",
+    "tags": ["a", "b"],
+    "author": {"name": "ann", "age": 30},
+    "comments": [{"_id": 10, "votes": 2}, {"_id": 11, "votes": 5}],
+}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"title": "Hello"}, True),
+    ({"author.name": "ann"}, True),
+    ({"tags": "b"}, True),
+    ({"tags": ["a", "b"]}, True),
+    ({"comments._id": 11}, True),
+    ({"comments.votes": {"$gt": 4}}, True),
+    ({"comments": {"$elemMatch": {"_id": 10, "votes": {"$gt": 4}}}}, False),
+    ({"comments": {"$elemMatch": {"_id": 11, "votes": {"$gt": 4}}}}, True),
+    ({"missing": None}, True),
+    ({"missing": {"$exists": False}}, True),
+    ({"title": {"$exists": False}}, False),
+    ({"author.age": {"$in": [29, 30]}}, True),
+    ({"author.age": {"$nin": [29, 30]}}, False),
+    ({"author.age": {"$gte": 30, "$lt": 31}}, True),
+    # Ranges never match across types
+    ({"author.age": {"$gt": "0"}}, False),
+    ({"title": {"$regex": "^hel", "$options": "i"}}, True),
+    ({"$or": [{"title": "x"}, {"tags": {"$size": 2}}]}, True),
+    ({"$and": [{"title": "Hello"}, {"author.age": {"$ne": 30}}]}, False),
+    ({"$nor": [{"title": "x"}]}, True),
+])
+def test_matches(query, expected):
+    assert matches(POST, query) is expected
+
+
+def test_matches_rejects_unknown_operator():
+    with pytest.raises(OperationFailure):
+        matches(POST, {"title": {"$where": "true"}})
+
+
+def test_project():
+    assert project(POST, {"title": 1, "author.name": 1}) == {"_id": 1, "title": "Hello", "author": {"name": "ann"}}
+    assert project(POST, {"_id": 0, "comments": 0, "tags": 0, "author": 0}) == {"title": "Hello"}
+
+
+def test_sort_orders_mixed_types_like_mongodb():
+    oid = ObjectId()
+    documents = [{"v": datetime(2024, 1, 1)}, {"v": oid}, {"v": "s"}, {"v": 2}, {}, {"v": 1.5}]
+    ordered = [document.get("v") for document in sort_documents(documents, [("v", 1)])]
+    assert ordered == [None, 1.5, 2, "s", oid, datetime(2024, 1, 1)]
+
+
+def test_apply_update_operators():
+    document = {"_id": 1, "count": 1, "tags": ["a"], "low": 5, "nested": {"x": 1}}
+    apply_update(document, {
+        "$inc": {"count": 2, "new": 1},
+        "$push": {"tags": {"$each": ["b", "c"], "$slice": -2}},
+        "$addToSet": {"set": "x"},
+        "$min": {"low": 3},
+        "$max": {"high": 7},
+        "$set": {"nested.y": 2},
+        "$unset": {"nested.x": ""},
+        "$setOnInsert": {"ignored": True},
+    })
+    assert document == {
+        "_id": 1, "count": 3, "new": 1, "tags": ["b", "c"], "set": ["x"],
+        "low": 3, "high": 7, "nested": {"y": 2},
+    }
+    apply_update(document, {"$pull": {"tags": "b"}})
+    assert document["tags"] == ["c"]
+
+
+def test_apply_update_pipeline():
+    document = {"_id": ObjectId("0123456789abcdef01234567"), "old": 1}
+    apply_update(document, [
+        {"$set": {"path": {"$concat": [{"$toString": "$_id"}, "/"]}, "depth": 0}},
+        {"$unset": "old"},
+    ])
+    assert document == {"_id": ObjectId("0123456789abcdef01234567"), "path": "0123456789abcdef01234567/", "depth": 0}
+
+
+def test_run_pipeline():
+    documents = [
+        {"_id": 1, "post": "p", "votes": 2, "items": [1, 2]},
+        {"_id": 2, "post": "p", "votes": 4, "items": [3]},
+        {"_id": 3, "post": "q", "votes": 1, "items": []},
+    ]
+    grouped = run_pipeline([dict(document) for document in documents], [
+        {"$group": {"_id": "$post", "total": {"$sum": "$votes"}, "ids": {"$push": "$_id"}, "avg": {"$avg": "$votes"}}},
+        {"$sort": {"total": -1}},
+    ])
+    assert grouped == [
+        {"_id": "p", "total": 6, "ids": [1, 2], "avg": 3.0},
+        {"_id": "q", "total": 1, "ids": [3], "avg": 1.0},
+    ]
+    unwound = run_pipeline([dict(document) for document in documents], [
+        {"$unwind": "$items"},
+        {"$project": {"items": 1, "double": {"$add": ["$items", "$items"]}}},
+        {"$skip": 1},
+        {"$limit": 1},
+    ])
+    assert unwound == [{"_id": 1, "items": 2, "double": 4}]
+    assert run_pipeline(documents, [{"$match": {"votes": {"$gt": 1}}}, {"$count": "n"}]) == [{"n": 2}]
+
+
+async def test_collection_find_sort_skip_limit(database):
+    collection = database.db["items"]
+    await collection.insert_many([{"_id": i, "group": i % 2, "rank": -i} for i in range(10)])
+    found = await collection.find({"group": 0}, {"rank": 1}).sort("rank", 1).skip(1).limit(2).to_list(length=None)
+    assert found == [{"_id": 6, "rank": -6}, {"_id": 4, "rank": -4}]
+    assert await collection.count_documents({"group": 1}) == 5
+    assert sorted(await collection.distinct("group")) == [0, 1]
+
+
+async def test_collection_updates(database):
+    collection = database.db["items"]
+    await collection.insert_one({"_id": 1, "comments": [{"_id": "a", "n": 0}, {"_id": "b", "n": 0}]})
+
+    result = await collection.update_one({"_id": 1, "comments._id": "b"}, {"$inc": {"comments.$.n": 1}})
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    assert (await collection.find_one({"_id": 1}))["comments"] == [{"_id": "a", "n": 0}, {"_id": "b", "n": 1}]
+
+    with pytest.raises(OperationFailure):
+        await collection.update_one({"_id": 1}, {"$inc": {"comments.$.n": 1}})
+
+    result = await collection.update_one(
+        {"key": "k", "count": {"$lt": 2}}, {"$inc": {"count": 1}, "$setOnInsert": {"created": True}}, upsert=True
+    )
+    assert result.upserted_id is not None
+    upserted = await collection.find_one({"_id": result.upserted_id})
+    assert upserted["key"] == "k" and upserted["count"] == 1 and upserted["created"] is True
+
+    after = await collection.find_one_and_update(
+        {"key": "k"}, {"$set": {"flag": 1}}, return_document=ReturnDocument.AFTER
+    )
+    assert after["flag"] == 1
+    assert (await collection.update_many({}, {"$set": {"all": True}})).modified_count == 2
+    assert (await collection.delete_many({"all": True})).deleted_count == 2
+
+
+async def test_unique_index_rejects_duplicates(database):
+    await database.follows_collection.insert_one({"follower_id": "a", "followee_id": "b"})
+    with pytest.raises(DuplicateKeyError):
+        await database.follows_collection.insert_one({"follower_id": "a", "followee_id": "b"})
+    await database.follows_collection.insert_one({"follower_id": "a", "followee_id": "c"})
+    with pytest.raises(DuplicateKeyError):
+        await database.follows_collection.update_one({"followee_id": "c"}, {"$set": {"followee_id": "b"}})
+
+
+async def test_multikey_index_lookup(database):
+    collection = database.comment_buckets_collection
+    await collection.insert_many([
+        {"post_id": "p", "count": 2, "comments": [{"_id": 1}, {"_id": 2}]},
+        {"post_id": "p", "count": 1, "comments": [{"_id": 3}]},
+    ])
+    found = await collection.find({"post_id": "p", "comments._id": {"$in": [1, 2, 3]}}).to_list(length=None)
+    assert len(found) == 2
+    found = await collection.find({"post_id": "p", "comments._id": 3}).to_list(length=None)
+    assert [bucket["count"] for bucket in found] == [1]
+
+
+async def test_in_on_an_index_prefix_reads_only_matching_keys(database):
+    posts = [ObjectId() for _ in range(20)]
+    await database.comments_collection.insert_many([
+        {"post_id": str(post_id) if index % 2 else post_id, "blocked": index % 5 == 0, "path": f"{index:03}/",
+         "created_at": datetime(2024, 1, 1 + index)}
+        for post_id in posts
+        for index in range(10)
+    ])
+    collection = database.db["comments"]
+    post_id = posts[3]
+    dual = {"$in": [post_id, str(post_id)]}
+
+    candidates = list(collection._candidate_ids({"post_id": dual, "blocked": False}, []))
+    assert len(candidates) == 8
+    candidates = list(collection._candidate_ids({"post_id": dual, "path": {"$gte": "005/"}}, []))
+    assert len(candidates) == 5
+    found = await collection.find({"post_id": dual, "blocked": False}).to_list(length=None)
+    assert len(found) == 8
+    assert await collection.count_documents({"post_id": {"$in": []}}) == 0
+
+
+async def test_dates_are_stored_with_millisecond_precision(database):
+    collection = database.db["items"]
+    created_at = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    await collection.insert_one({"_id": 1, "created_at": created_at, "nested": [{"at": created_at}]})
+    await collection.update_one({"_id": 1}, {"$max": {"last_at": created_at}})
+
+    stored = await collection.find_one({"_id": 1})
+    assert stored["created_at"] == datetime(2024, 1, 1, 12, 0, 0, 123000)
+    assert stored["nested"][0]["at"] == stored["last_at"] == stored["created_at"]
@@ -0,0 +1,99 @@
+import pytest
+from bson import ObjectId
+
+from src.database.migrate_ids import MIGRATION_ID, Migration
+from src.utils.ids import normalize_references
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed(database):
+    author, post, comment, parent = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    await database.posts_collection.insert_one({"_id": post, "author_id": str(author), "title": "t"})
+    await database.comments_collection.insert_many([
+        {"_id": str(parent), "post_id": str(post), "author_id": str(author), "parent_id": None},
+        {"_id": str(comment), "post_id": str(post), "author_id": str(author), "parent_id": str(parent)},
+    ])
+    await database.follows_collection.insert_one({"follower_id": str(author), "followee_id": ObjectId()})
+    return author, post, comment, parent
+
+
+async def _migrate(database, batch_size=1, dry_run=False, restart=False):
+    migration = Migration(database, batch_size=batch_size, pause=0, dry_run=dry_run)
+    await migration.load_progress(restart)
+    return await migration.run()
+
+
+async def test_converts_string_references(database):
+    author, post, comment, parent = await _seed(database)
+
+    counts = await _migrate(database)
+
+    assert counts["posts"]["converted"] == 1
+    assert counts["comments"]["converted"] == 2
+    assert counts["follows"]["converted"] == 1
+    assert (await database.posts_collection.find_one({"_id": post}))["author_id"] == author
+    rekeyed = await database.comments_collection.find_one({"_id": comment})
+    assert rekeyed["post_id"] == post and rekeyed["author_id"] == author and rekeyed["parent_id"] == parent
+    assert await database.comments_collection.count_documents({}) == 2
+    assert await database.follows_collection.count_documents({"follower_id": author}) == 1
+
+
+async def test_dry_run_writes_nothing(database):
+    await _seed(database)
+
+    counts = await _migrate(database, dry_run=True)
+
+    assert counts["comments"]["converted"] == 2
+    comments = await database.comments_collection.find({}).to_list(length=None)
+    assert [isinstance(comment["_id"], str) for comment in comments] == [True, True]
+    assert await database.db["migrations"].find_one({"_id": MIGRATION_ID}) is None
+
+
+async def test_rerun_after_completion_only_rechecks(database):
+    await _seed(database)
+    await _migrate(database)
+
+    resumed = await _migrate(database)
+    restarted = await _migrate(database, restart=True)
+
+    assert all(counts["converted"] == 0 for counts in resumed.values())
+    assert all(counts["converted"] == 0 for counts in restarted.values())
+    assert restarted["comments"]["scanned"] == 2
+
+
+async def test_resumes_from_checkpoint(database):
+    await _seed(database)
+    interrupted = Migration(database, batch_size=1, pause=0, dry_run=False)
+    await interrupted.load_progress(restart=False)
+    # Stop once the first batch of the comments rekey phase is checkpointed
+    async for batch in interrupted._batches("comments", "rekey", ""):
+        if "comments" in interrupted.progress:
+            break
+        for document in batch:
+            await interrupted._rekey("comments", document, normalize_references("comments", document))
+    checkpoint = await database.db["migrations"].find_one({"_id": MIGRATION_ID})
+    assert "rekey" in checkpoint["progress"]["comments"]
+
+    counts = await _migrate(database)
+
+    # Only the comment left with a string _id is scanned again by the rekey phase
+    assert counts["comments"]["converted"] == 1
+    comments = await database.comments_collection.find({}).to_list(length=None)
+    assert len(comments) == 2
+    assert all(isinstance(comment[field], ObjectId) for comment in comments for field in ("_id", "post_id"))
+
+
+async def test_duplicate_follow_is_removed(database):
+    follower, followee = ObjectId(), ObjectId()
+    await database.follows_collection.insert_many([
+        {"follower_id": follower, "followee_id": followee},
+        {"follower_id": str(follower), "followee_id": str(followee)},
+    ])
+
+    counts = await _migrate(database)
+
+    assert counts["follows"]["duplicates"] == 1
+    assert await database.follows_collection.find({}, {"_id": 0}).to_list(length=None) == [
+        {"follower_id": follower, "followee_id": followee}
+    ]
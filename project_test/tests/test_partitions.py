@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.database.comment_store import (
+    BUCKETED_LAYOUT,
+    FLAT_LAYOUT,
+    PartitionedCommentStore,
+    comment_store,
+    rebalance_partitions,
+)
+from src.database.partitions import jump_hash, partition_databases, partition_of
+from src.utils.ids import ref
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1)
+
+
+def _comment(post_id, minute):
+    return {
+        "_id": ObjectId(),
+        "post_id": post_id,
+        "author_id": ObjectId(),
+        "content": "comment",
+        "created_at": START + timedelta(minutes=minute),
+        "parent_id": None,
+        "reply_count": 0,
+    }
+
+
+async def _all(cursor):
+    return await cursor.to_list(length=None)
+
+
+def test_jump_hash_moves_keys_only_to_the_new_bucket():
+    keys = range(0, 2 ** 40, 2 ** 28)
+    for buckets in range(1, 6):
+        for key in keys:
+            before, after = jump_hash(key, buckets), jump_hash(key, buckets + 1)
+            assert 0 <= before < buckets
+            assert after in (before, buckets)
+    post_id = ObjectId()
+    assert partition_of(post_id, 4) == partition_of(str(post_id), 4)
+
+
+async def _spread(database, layout, partitions, posts=12, per_post=3):
+    store = comment_store(database, layout, partitions)
+    comments = []
+    for index in range(posts):
+        post_id = ObjectId()
+        for offset in range(per_post):
+            comments.append(_comment(post_id, index * per_post + offset))
+    # Inserted out of order, so merged reads cannot rely on insertion order
+    for comment in reversed(comments):
+        await store.insert(comment)
+    return store, comments
+
+
+@pytest.mark.parametrize("layout", [FLAT_LAYOUT, BUCKETED_LAYOUT])
+async def test_partitions_route_comments_by_post(database, layout):
+    store, comments = await _spread(database, layout, 3)
+    assert isinstance(store, PartitionedCommentStore)
+
+    handles = partition_databases(database, 3)
+    for comment in comments:
+        partition = comment_store(handles[partition_of(comment["post_id"], 3)], layout, 0)
+        assert await partition.find_one({"_id": comment["_id"]}) is not None
+    assert await database.comments_collection.count_documents({}) == 0
+
+    post_id = comments[0]["post_id"]
+    assert len(await _all(store.find({"post_id": ref(post_id)}))) == 3
+    await store.delete_for_posts([post_id, comments[-1]["post_id"]])
+    assert len(await _all(store.find({}))) == len(comments) - 6
+
+
+@pytest.mark.parametrize("layout", [FLAT_LAYOUT, BUCKETED_LAYOUT])
+async def test_partitioned_find_merges_sorted_results(database, layout):
+    store, comments = await _spread(database, layout, 3)
+    newest_first = sorted(comments, key=lambda comment: comment["created_at"], reverse=True)
+
+    found = await _all(store.find({}, {"content": 1}, sort=[("created_at", -1)], limit=5))
+    assert [comment["_id"] for comment in found] == [comment["_id"] for comment in newest_first[:5]]
+    # Sort fields added for the merge are not returned
+    assert set(found[0]) == {"_id", "content"}
+
+    post_ids = [comments[0]["post_id"], comments[-1]["post_id"]]
+    found = await _all(store.find({"post_id": {"$in": post_ids}}, sort=[("created_at", 1)]))
+    expected = [comment for comment in comments if comment["post_id"] in post_ids]
+    assert [comment["_id"] for comment in found] == [comment["_id"] for comment in expected]
+
+
+@pytest.mark.parametrize("layout", [FLAT_LAYOUT, BUCKETED_LAYOUT])
+async def test_partitioned_aggregate(database, layout):
+    store, comments = await _spread(database, layout, 3)
+
+    counts = await _all(store.aggregate([
+        {"$match": {}},
+        {"$group": {"_id": "$post_id", "n": {"$sum": 1}, "last": {"$max": "$created_at"}}},
+        {"$sort": {"last": -1}},
+        {"$limit": 2},
+    ]))
+    assert [row["_id"] for row in counts] == [comments[-1]["post_id"], comments[-4]["post_id"]]
+    assert [row["n"] for row in counts] == [3, 3]
+
+    page = await _all(store.aggregate([
+        {"$match": {"created_at": {"$gte": START}}},
+        {"$sort": {"created_at": 1}},
+        {"$skip": 4},
+        {"$limit": 3},
+        {"$project": {"created_at": 1}},
+    ]))
+    assert [row["_id"] for row in page] == [comment["_id"] for comment in comments[4:7]]
+
+
+async def test_rebalance_moves_only_posts_whose_partition_changes(database, settings):
+    settings.set("storage", "comment_layout", BUCKETED_LAYOUT)
+    _, comments = await _spread(database, BUCKETED_LAYOUT, 2, posts=40, per_post=2)
+    expected = sum(
+        1 for comment in comments if partition_of(comment["post_id"], 2) != partition_of(comment["post_id"], 3)
+    )
+    assert 0 < expected < len(comments)
+
+    assert await rebalance_partitions(database, 2, 3) == expected
+    assert await rebalance_partitions(database, 3, 3) == 0
+
+    handles = partition_databases(database, 3)
+    for comment in comments:
+        partition = comment_store(handles[partition_of(comment["post_id"], 3)], BUCKETED_LAYOUT, 0)
+        assert await partition.find_one({"_id": comment["_id"]}) is not None
+    everything = await _all(comment_store(database, BUCKETED_LAYOUT, 3).find({}, sort=[("created_at", 1)]))
+    assert everything == comments
+
+
+async def test_rebalance_from_and_back_to_the_main_database(database, settings):
+    settings.set("storage", "comment_layout", FLAT_LAYOUT)
+    _, comments = await _spread(database, FLAT_LAYOUT, 0)
+
+    assert await rebalance_partitions(database, 0, 2) == len(comments)
+    assert await database.comments_collection.count_documents({}) == 0
+    assert await rebalance_partitions(database, 2, 0) == len(comments)
+    assert await _all(database.comments_collection.find({}).sort("created_at", 1)) == comments
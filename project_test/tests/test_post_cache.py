@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from src.utils.post_cache import MISSING, CachedPost, PostCache
+
+POST = CachedPost(body=b"{}", etag='"etag"', updated_at=datetime(2024, 1, 1))
+
+
+def test_fill_started_before_an_invalidation_is_dropped():
+    cache = PostCache()
+    generation = cache.generation()
+    # The post is deleted while the fill reads it
+    cache.invalidate("p")
+    cache.set("p", POST, generation)
+    cache.set_missing("q", generation)
+
+    assert cache.get("p") is None
+    assert cache.get("q") is MISSING
+    assert cache.stats()["stale_fills"] == 1
+
+    cache.set("p", POST, cache.generation())
+    assert cache.get("p") is POST
+
+
+def test_fill_is_dropped_once_the_invalidation_is_forgotten():
+    cache = PostCache(max_size=2)
+    generation = cache.generation()
+    for post_id in ("a", "b", "c"):
+        cache.invalidate(post_id)
+
+    # "a" no longer has its own record, so any fill older than it is distrusted
+    cache.set("a", POST, generation)
+    cache.set("z", POST, generation)
+
+    assert cache.get("a") is None and cache.get("z") is None
+    cache.set("z", POST, cache.generation())
+    assert cache.get("z") is POST
+
+
+def test_expired_entries_are_misses():
+    cache = PostCache(ttl=-1, negative_ttl=-1)
+    cache.set("p", POST)
+    cache.set_missing("q")
+
+    assert cache.get("p") is None and cache.get("q") is None
+
+
+def test_deleting_an_account_invalidates_its_cached_posts(client, login):
+    _, headers = login()
+    post_id = client.post("/posts/", json={"title": "Mine", "content": "content"}, headers=headers).json()["_id"]
+    assert client.get(f"/posts/{post_id}").status_code == 200
+    assert client.get("/api/monitoring/post-cache").json()["size"] >= 1
+
+    assert client.delete("/delete_account/", headers=headers).status_code == 200
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
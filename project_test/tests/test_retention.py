@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.journal.retention import (
+    acquire_lease,
+    backfill_created_at,
+    compact_after_days,
+    compact_journal,
+    compact_journals,
+    release_lease,
+)
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def _entry(user, before, after, days_ago):
+    created_at = NOW - timedelta(days=days_ago)
+    return {
+        "_id": ObjectId(),
+        "user": user,
+        "field": "username",
+        "state_before": before,
+        "state_after": after,
+        "timestamp": int((created_at - datetime(1970, 1, 1)).total_seconds()),
+        "created_at": created_at,
+    }
+
+
+async def test_compacts_old_entries_into_one_summary_per_user(database):
+    ann, bob = ObjectId(), ObjectId()
+    await database.journal_username_collection.insert_many([
+        _entry(ann, "a0", "a1", 50),
+        _entry(ann, "a1", "a2", 40),
+        _entry(bob, "b0", "b1", 45),
+        _entry(ann, "a2", "a3", 1),
+    ])
+
+    compacted = await compact_journal(database, "username", NOW - timedelta(days=30), batch_size=2)
+
+    assert compacted == 3
+    summary = await database.journal_username_collection.find_one({"user": ann, "summary": True})
+    assert summary["changes"] == 2
+    assert (summary["state_before"], summary["state_after"]) == ("a0", "a2")
+    assert summary["first_at"] == NOW - timedelta(days=50)
+    assert summary["created_at"] == NOW - timedelta(days=40)
+    assert (await database.journal_username_collection.find_one({"user": bob, "summary": True}))["changes"] == 1
+    # The recent entry is kept as is
+    assert await database.journal_username_collection.count_documents({"user": ann}) == 2
+
+
+async def test_later_runs_extend_the_summary(database):
+    ann = ObjectId()
+    await database.journal_username_collection.insert_one(_entry(ann, "a0", "a1", 50))
+    await compact_journal(database, "username", NOW - timedelta(days=30))
+    await database.journal_username_collection.insert_one(_entry(ann, "a1", "a2", 35))
+
+    assert await compact_journal(database, "username", NOW - timedelta(days=30)) == 1
+    assert await compact_journal(database, "username", NOW - timedelta(days=30)) == 0
+
+    summary = await database.journal_username_collection.find_one({"user": ann, "summary": True})
+    assert summary["changes"] == 2
+    assert (summary["state_before"], summary["state_after"]) == ("a0", "a2")
+    assert await database.journal_username_collection.count_documents({"user": ann}) == 1
+
+
+async def test_interrupted_run_does_not_count_entries_twice(database):
+    ann = ObjectId()
+    entries = [_entry(ann, "a0", "a1", 50), _entry(ann, "a1", "a2", 40)]
+    await database.journal_username_collection.insert_many(entries)
+    await compact_journal(database, "username", NOW - timedelta(days=30))
+    # A run that stopped after updating the summary left its entries behind
+    await database.journal_username_collection.insert_many(entries)
+
+    assert await compact_journal(database, "username", NOW - timedelta(days=30)) == 0
+
+    summary = await database.journal_username_collection.find_one({"user": ann, "summary": True})
+    assert summary["changes"] == 2
+    assert await database.journal_username_collection.count_documents({"user": ann}) == 1
+
+
+async def test_backfills_created_at_from_timestamp(database):
+    await database.journal_email_collection.insert_many([
+        {"user": ObjectId(), "timestamp": 86400},
+        {"user": ObjectId(), "timestamp": "not a number"},
+    ])
+
+    assert await backfill_created_at(database, "journal_email") == 2
+    assert await backfill_created_at(database, "journal_email") == 0
+    assert await database.journal_email_collection.count_documents({"created_at": datetime(1970, 1, 2)}) == 1
+
+
+async def test_lease_excludes_other_processes(database):
+    assert await acquire_lease(database, "one", 60)
+    assert await acquire_lease(database, "one", 60)
+    assert not await acquire_lease(database, "two", 60)
+    assert await compact_journals(database, older_than_days=30) is None
+
+    await release_lease(database, "one")
+    assert await acquire_lease(database, "two", 60)
+    await release_lease(database, "two")
+    # An expired lease is taken over
+    assert await acquire_lease(database, "three", -1)
+    assert await acquire_lease(database, "four", 60)
+    await release_lease(database, "four")
+
+
+async def test_compact_journals_reports_every_journal(database):
+    await database.journal_password_collection.insert_one(_entry(ObjectId(), "***", "***", 90))
+
+    counts = await compact_journals(database, older_than_days=30)
+
+    assert counts["journal_password"] == {"backfilled": 0, "compacted": 1}
+    assert counts["journal_username"] == {"backfilled": 0, "compacted": 0}
+    assert await database.db["locks"].count_documents({}) == 0
+
+
+@pytest.mark.parametrize("days", ["0", "-1"])
+async def test_compact_after_days_must_be_positive(database, settings, days):
+    await database.journal_password_collection.insert_one(_entry(ObjectId(), "***", "***", 1))
+    settings.set("journal", "compact_after_days", days)
+
+    with pytest.raises(ValueError):
+        compact_after_days()
+    with pytest.raises(ValueError):
+        await compact_journals(database)
+    assert await database.journal_password_collection.count_documents({"changes": {"$exists": True}}) == 0
+
+    settings.set("journal", "compact_after_days", "0.5")
+    assert (await compact_journals(database))["journal_password"]["compacted"] == 1
@@ -0,0 +1,124 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from src.routes import comments, posts
+from src.utils.post_cache import post_cache
+from src.utils.singleflight import SingleFlight, SingleFlightFull, comment_reads, post_reads
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_fetch():
+    flight = SingleFlight("test", max_waiters=3)
+    release = asyncio.Event()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return object()
+
+    callers = [asyncio.create_task(flight.do("key", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(SingleFlightFull):
+        await flight.do("key", fetch)
+    # A cancelled caller does not cancel the fetch for the others
+    callers[0].cancel()
+    await asyncio.sleep(0)
+    release.set()
+    first, second = await asyncio.gather(*callers[1:])
+
+    assert first is second and len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 2, "rejected": 1}
+
+
+@pytest.mark.anyio
+async def test_fetch_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight("test")
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def fetch():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.stats()["in_flight"] == 0
+
+
+def _slowed(monkeypatch, module, name):
+    original = getattr(module, name)
+    calls = []
+
+    async def slow(*args):
+        calls.append(args)
+        # Keeps the read in flight until every request has joined it
+        await asyncio.sleep(0.05)
+        return await original(*args)
+
+    monkeypatch.setattr(module, name, slow)
+    return calls
+
+
+def _get_concurrently(client, path, count):
+    async def get_all():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get(path) for _ in range(count)))
+
+    return client.portal.call(get_all)
+
+
+def _post(client, headers):
+    response = client.post("/posts/", json={"title": "Post", "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def test_concurrent_post_reads_are_coalesced(client, login, monkeypatch):
+    _, headers = login()
+    post_id = _post(client, headers)
+    post_cache.clear()
+    calls = _slowed(monkeypatch, posts, "fetch_post")
+    coalesced = post_reads.coalesced
+
+    responses = _get_concurrently(client, f"/posts/{post_id}", 5)
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert {response.json()["_id"] for response in responses} == {post_id}
+    assert len(calls) == 1 and post_reads.coalesced - coalesced == 4
+
+
+def test_concurrent_comment_listings_are_coalesced(client, login, monkeypatch):
+    _, headers = login()
+    post_id = _post(client, headers)
+    client.post(f"/posts/{post_id}/comments/", json={"content": "comment"}, headers=headers)
+    calls = _slowed(monkeypatch, comments, "fetch_comments")
+    coalesced = comment_reads.coalesced
+
+    responses = _get_concurrently(client, f"/posts/{post_id}/comments/", 4)
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.content for response in responses}) == 1
+    assert len(calls) == 1 and comment_reads.coalesced - coalesced == 3
+
+
+def test_too_many_waiters_answer_503(client, login, monkeypatch):
+    _, headers = login()
+    post_id = _post(client, headers)
+    post_cache.clear()
+    _slowed(monkeypatch, posts, "fetch_post")
+    monkeypatch.setattr(post_reads, "max_waiters", 2)
+
+    responses = _get_concurrently(client, f"/posts/{post_id}", 4)
+
+    assert sorted(response.status_code for response in responses) == [200, 200, 503, 503]
+    assert all(response.headers["Retry-After"] == "1" for response in responses if response.status_code == 503)
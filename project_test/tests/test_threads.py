@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.database.comment_store import BUCKETED_LAYOUT, FLAT_LAYOUT, comment_store
+from src.database.migrate_paths import backfill_comment_paths, count_missing_paths
+from src.utils.threads import subtree_query
+
+START = datetime(2024, 1, 1)
+
+
+def _post(client, headers):
+    response = client.post("/posts/", json={"title": "Post", "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def _reply(client, headers, post_id, content, parent_id=None):
+    response = client.post(
+        f"/posts/{post_id}/comments/", json={"content": content, "parent_id": parent_id}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _contents(nodes):
+    return [(node["content"], _contents(node["replies"])) for node in nodes]
+
+
+def test_thread_nests_replies_in_reading_order(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+    first = _reply(client, headers, post_id, "first")
+    second = _reply(client, headers, post_id, "second")
+    answer = _reply(client, headers, post_id, "answer", first)
+    _reply(client, headers, post_id, "deep", answer)
+    _reply(client, headers, post_id, "other", second)
+
+    thread = client.get(f"/posts/{post_id}/comments/thread").json()
+    assert _contents(thread["comments"]) == [
+        ("first", [("answer", [("deep", [])])]),
+        ("second", [("other", [])]),
+    ]
+    assert thread["comments"][0]["reply_count"] == 1 and not thread["more_comments"]
+
+    shallow = client.get(f"/posts/{post_id}/comments/thread", params={"depth": 2}).json()
+    assert _contents(shallow["comments"])[0] == ("first", [("answer", [])])
+    assert shallow["comments"][0]["replies"][0]["more_replies"]
+
+    subtree = client.get(f"/posts/{post_id}/comments/thread", params={"parent_id": first}).json()
+    assert _contents(subtree["comments"]) == [("answer", [("deep", [])])]
+
+
+def test_thread_pages_one_level_with_after(client, login):
+    _, headers = login()
+    post_id = _post(client, headers)
+    parent = _reply(client, headers, post_id, "parent")
+    replies = [_reply(client, headers, post_id, f"reply {index}", parent) for index in range(5)]
+
+    params = {"parent_id": parent, "limit": 2}
+    page = client.get(f"/posts/{post_id}/comments/thread", params=params).json()
+    assert [node["id"] for node in page["comments"]] == replies[:2] and page["more_comments"]
+
+    page = client.get(f"/posts/{post_id}/comments/thread", params={**params, "after": replies[3]}).json()
+    assert [node["id"] for node in page["comments"]] == replies[4:] and not page["more_comments"]
+
+
+def test_thread_rejects_invalid_and_unknown_comments(client):
+    post_id = str(ObjectId())
+
+    assert client.get("/posts/invalid/comments/thread").status_code == 400
+    assert client.get(f"/posts/{post_id}/comments/thread", params={"after": "invalid"}).status_code == 400
+    response = client.get(f"/posts/{post_id}/comments/thread", params={"parent_id": str(ObjectId())})
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("layout", [FLAT_LAYOUT, BUCKETED_LAYOUT])
+@pytest.mark.parametrize("partitions", [0, 2])
+async def test_backfill_gives_old_comments_a_path_on_every_partition(database, settings, layout, partitions):
+    settings.set("storage", "comment_layout", layout)
+    settings.set("comment_partitions", "count", str(partitions))
+    store = comment_store(database)
+    post_ids = [ObjectId() for _ in range(6)]
+    comments = []
+    for index, post_id in enumerate(post_ids):
+        for minute in range(2):
+            comment = {"_id": ObjectId(), "post_id": post_id, "author_id": ObjectId(), "content": "old",
+                       "created_at": START + timedelta(minutes=2 * index + minute), "blocked": False}
+            comments.append(comment)
+            await store.insert(comment)
+
+    assert await count_missing_paths(database) == len(comments)
+    assert await backfill_comment_paths(database) == len(comments)
+    assert await count_missing_paths(database) == 0
+    assert await backfill_comment_paths(database) == 0
+
+    for post_id in post_ids:
+        threaded = await store.find(subtree_query(str(post_id)), sort=[("path", 1)]).to_list(length=None)
+        expected = sorted((c for c in comments if c["post_id"] == post_id), key=lambda c: str(c["_id"]))
+        assert [comment["_id"] for comment in threaded] == [comment["_id"] for comment in expected]
+        assert all(comment["path"] == f"{comment['_id']}/" and comment["depth"] == 0 for comment in threaded)
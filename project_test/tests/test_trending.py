@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.utils.trending import TrendingPosts
+
+HOUR = 3600
+
+
+def _scores(ranking, limit=10):
+    return [(post.id, post.score) for post in ranking.top(limit)]
+
+
+def test_comments_count_half_as_much_every_half_life():
+    ranking = TrendingPosts(HOUR, 10)
+    now = datetime.utcnow()
+    ranking.record("new", "New", "author", now)
+    for _ in range(3):
+        ranking.record("old", "Old", "author", now - timedelta(hours=2))
+
+    (first, first_score), (second, second_score) = _scores(ranking)
+    assert (first, second) == ("new", "old")
+    assert first_score == pytest.approx(1, rel=1e-3)
+    assert second_score == pytest.approx(0.75, rel=1e-3)
+
+
+def test_ranking_keeps_the_top_k_posts():
+    ranking = TrendingPosts(HOUR, 2)
+    now = datetime.utcnow()
+    for post_id, comments in (("a", 1), ("b", 3), ("c", 2)):
+        for index in range(comments):
+            assert ranking.record(post_id, post_id.upper(), "author", now, f"{post_id}{index}")
+    # A comment seen twice is counted once
+    assert not ranking.record("a", "A", "author", now, "a0")
+
+    assert [post_id for post_id, _ in _scores(ranking)] == ["b", "c"]
+    ranking.record("a", "A", "author", now, "a1")
+    ranking.record("a", "A", "author", now, "a2")
+    ranking.record("a", "A", "author", now, "a3")
+    assert [post_id for post_id, _ in _scores(ranking)] == ["a", "b"]
+
+    # Removing a ranked post promotes the best remaining one
+    ranking.remove("a")
+    assert [post_id for post_id, _ in _scores(ranking)] == ["b", "c"]
+    assert ranking.stats() == {"loaded": False, "posts": 2, "top": 2}
+
+
+def test_snapshot_restores_the_ranking():
+    ranking = TrendingPosts(HOUR, 2)
+    now = datetime.utcnow()
+    for post_id, comments in (("a", 1), ("b", 3), ("c", 2)):
+        for index in range(comments):
+            ranking.record(post_id, post_id.upper(), "author", now - timedelta(minutes=index), f"{post_id}{index}")
+    ranking.watermark = now
+
+    restored = TrendingPosts(HOUR, 2)
+    restored.restore(ranking.snapshot())
+    assert _scores(restored) == _scores(ranking)
+    assert not restored.record("b", "B", "author", now, "b0")
+
+
+def _post(client, headers, title):
+    response = client.post("/posts/", json={"title": title, "content": "content"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["_id"]
+
+
+def test_trending_route_ranks_posts_by_comments(client, login):
+    _, headers = login()
+    quiet, busy = _post(client, headers, "Quiet"), _post(client, headers, "Busy")
+    for post_id, comments in ((quiet, 1), (busy, 2)):
+        for _ in range(comments):
+            response = client.post(f"/posts/{post_id}/comments/", json={"content": "comment"}, headers=headers)
+            assert response.status_code == 200, response.text
+
+    ranked = client.get("/posts/trending").json()
+    assert [(post["id"], post["title"]) for post in ranked[:2]] == [(busy, "Busy"), (quiet, "Quiet")]
+    assert ranked[0]["score"] == pytest.approx(2, rel=1e-2)
+    assert [post["id"] for post in client.get("/posts/trending", params={"limit": 1}).json()] == [busy]
+
+    # Deleting the account deletes its posts, which leave the ranking
+    assert client.delete("/delete_account/", headers=headers).status_code == 200
+    assert client.get("/posts/trending").json() == []